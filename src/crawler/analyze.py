@@ -1,56 +1,361 @@
 from __future__ import annotations
 
+import json
 import re
-from urllib.parse import urlparse
+import time
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Optional
+from urllib.parse import unquote, urljoin, urlparse, urlsplit, urlunsplit
 
-from bs4 import BeautifulSoup
 
-
-EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.I)
-PHONE_RE = re.compile(r"(\+?\d[\d\s()./-]{6,}\d)")
+# Contact patterns run on visible text only. Every repetition is bounded, so a failed
+# match at one position costs O(1) and a scan is linear in the input size.
+EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]{1,64}@[A-Z0-9-]{1,63}(?:\.[A-Z0-9-]{1,63}){0,8}\.[A-Z]{2,24}\b", re.I)
+PHONE_RE = re.compile(r"(?<!\d)(\+?\d(?:[\s()./-]{0,3}\d){6,14})(?!\d)")
+# Street suffixes may end a compound word ("Hauptstraße"), so one only counts with a house
+# number after it ("Arbeitsplatz" alone is not an address); a postcode is followed by a town.
 ADDRESS_HINT_RE = re.compile(
-    r"\b(straße|strasse|gasse|platz|weg|allee|\d{4}\s+[A-Za-zÄÖÜäöüß])\b",
+    r"(?:straße|strasse|str\.|gasse|platz|weg|allee),?\s{0,3}\d{1,4}[a-z]?\b"
+    r"|\b\d{4}\s{1,3}[A-Za-zÄÖÜäöüß]",
     re.I,
 )
 
+# Input bounds: contact info lives in the first part of a page, and we never want one
+# giant page to dominate a worker.
+MAX_HTML_CHARS = 1_000_000
+MAX_TEXT_CHARS = 200_000
+MAX_JSON_LD_CHARS = 100_000
+MAX_LINKS = 500
+# html.parser re-scans an unfinished tag on every feed, so a hostile page is parsed in
+# chunks against a wall-clock budget; what was parsed by then is kept. A real 1 MB page
+# takes about 0.6 s.
+PARSE_BUDGET_SECONDS = 1.0
+FEED_CHUNK_CHARS = 64 * 1024
+MAX_LINK_TEXT_CHARS = 100
+
+# Elements whose content is never visible text.
+_HIDDEN_TAGS = {"script", "style", "noscript", "template", "svg"}
+_CONTACT_ITEMPROPS = {
+    "telephone": "phone",
+    "faxnumber": "phone",
+    "email": "email",
+    "address": "address",
+    "streetaddress": "address",
+    "postalcode": "address",
+}
+
+
+@dataclass
+class PageText:
+    """Visible text plus contact signals found in markup (tel:/mailto:, schema.org)."""
+
+    text: str = ""
+    has_email: bool = False
+    has_phone: bool = False
+    has_address: bool = False
+    # (href, link text) of the page's first MAX_LINKS <a> elements
+    links: list[tuple[str, str]] = field(default_factory=list)
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.page = PageText()
+        self._chunks: list[str] = []
+        self._size = 0
+        self._hidden = 0
+        self._json_ld: list[str] | None = None
+        self._link: tuple[str, list[str]] | None = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        a = {k: (v or "") for k, v in attrs}
+
+        raw_href = a.get("href", "").strip()
+        href = raw_href.lower()
+        if href.startswith("mailto:") and len(href) > 7:
+            self.page.has_email = True
+        elif href.startswith("tel:") and len(href) > 4:
+            self.page.has_phone = True
+        elif tag == "a" and raw_href and len(self.page.links) < MAX_LINKS:
+            self._end_link()
+            self._link = (raw_href, [])
+
+        prop = _CONTACT_ITEMPROPS.get(a.get("itemprop", "").lower())
+        if prop:
+            setattr(self.page, f"has_{prop}", True)
+
+        if tag in _HIDDEN_TAGS:
+            self._hidden += 1
+            if tag == "script" and "ld+json" in a.get("type", "").lower():
+                self._json_ld = []
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == "a":
+            self._end_link()
+        if tag in _HIDDEN_TAGS and self._hidden:
+            self._hidden -= 1
+            if tag == "script" and self._json_ld is not None:
+                self._read_json_ld("".join(self._json_ld))
+                self._json_ld = None
+
+    def handle_data(self, data: str) -> None:
+        if self._hidden:
+            if self._json_ld is not None and sum(map(len, self._json_ld)) < MAX_JSON_LD_CHARS:
+                self._json_ld.append(data)
+            return
+        if self._link is not None:
+            self._link[1].append(data)
+        if self._size < MAX_TEXT_CHARS:
+            self._chunks.append(data)
+            self._size += len(data)
+
+    def _end_link(self) -> None:
+        if self._link is not None:
+            href, text = self._link
+            self.page.links.append((href, " ".join("".join(text).split())[:MAX_LINK_TEXT_CHARS]))
+            self._link = None
+
+    def _read_json_ld(self, raw: str) -> None:
+        try:
+            doc = json.loads(raw)
+        except ValueError:
+            return
+        stack = [doc]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for k, v in node.items():
+                    prop = _CONTACT_ITEMPROPS.get(k.lower())
+                    if prop and v:
+                        setattr(self.page, f"has_{prop}", True)
+                    if isinstance(v, (dict, list)):
+                        stack.append(v)
+            elif isinstance(node, list):
+                stack.extend(node)
+
+    def result(self) -> PageText:
+        self._end_link()
+        self.page.text = " ".join(self._chunks)[:MAX_TEXT_CHARS]
+        return self.page
+
+
+def extract_page_text(html: str) -> PageText:
+    """
+    Strip scripts, styles and markup (attribute values such as base64 images never
+    reach the text), keeping structured contact hints from tel:/mailto: links,
+    schema.org microdata and JSON-LD.
+    """
+    parser = _TextExtractor()
+    _parse(parser, html)
+    return parser.result()
+
+
+def _parse(parser: HTMLParser, html: str, budget: float = PARSE_BUDGET_SECONDS) -> None:
+    """Feed `html` (cut at MAX_HTML_CHARS) in chunks; stop at the deadline, else close()."""
+    deadline = time.monotonic() + budget
+    html, _tail = split_markup_tail(html[:MAX_HTML_CHARS])
+    for i in range(0, len(html), FEED_CHUNK_CHARS):
+        parser.feed(html[i : i + FEED_CHUNK_CHARS])
+        if time.monotonic() > deadline:
+            return
+    parser.close()
+
+
+def split_markup_tail(text: str) -> tuple[str, str]:
+    """
+    Split `text` into what can be parsed now and an unterminated tag or comment at its
+    end (from the first "<" after the last ">"). HTMLParser keeps re-scanning such a tail
+    on every feed, and close() does so once per "<" in it (60 KB of "<a " take a
+    minute) before emitting it as text. It is markup, never visible text: hold it back
+    until more input arrives, or drop it at the end.
+    """
+    cut = text.find("<", text.rfind(">") + 1)
+    if cut == -1:
+        return text, ""
+    return text[:cut], text[cut:]
+
+
+@dataclass
+class HeadSignals:
+    """What the `<head>` tells us; `complete` is set once `</head>` (or `<body>`) was seen."""
+
+    title: str | None = None
+    has_viewport: bool = False
+    generator: str | None = None
+    charset: str | None = None
+    complete: bool = False
+
+
+class HeadParser(HTMLParser):
+    """
+    Incremental head scanner: feed() chunks as they arrive and stop feeding once
+    `signals.complete` is True. Pages without `</head>`/`<body>` are scanned to the end.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.signals = HeadSignals()
+        self._title: list[str] | None = None
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if self.signals.complete:
+            return
+        if tag == "body":
+            self._finish()
+        elif tag == "title" and self.signals.title is None:
+            self._title = []
+        elif tag == "meta":
+            a = {k: (v or "") for k, v in attrs}
+            name = a.get("name", "").lower()
+            if name == "viewport" and a.get("content"):
+                self.signals.has_viewport = True
+            elif name == "generator" and a.get("content") and self.signals.generator is None:
+                self.signals.generator = a["content"].strip()[:200]
+            if a.get("charset") and self.signals.charset is None:
+                self.signals.charset = a["charset"].strip().lower()
+
+    def handle_endtag(self, tag: str) -> None:
+        if self.signals.complete:
+            return
+        if tag == "title" and self._title is not None:
+            title = " ".join("".join(self._title).split())
+            self.signals.title = title or None
+            self._title = None
+        elif tag == "head":
+            self._finish()
+
+    def handle_data(self, data: str) -> None:
+        if self._title is not None:
+            self._title.append(data)
+
+    def _finish(self) -> None:
+        self._title = None
+        self.signals.complete = True
+
+
+def parse_head(html: str) -> HeadSignals:
+    parser = HeadParser()
+    _parse(parser, html)
+    return parser.signals
+
 
 def extract_title(html: str) -> str | None:
-    soup = BeautifulSoup(html, "html.parser")
-    if soup.title and soup.title.string:
-        return " ".join(soup.title.string.split()).strip()
-    return None
+    return parse_head(html).title
 
 
 def has_viewport_meta(html: str) -> bool:
-    soup = BeautifulSoup(html, "html.parser")
-    tag = soup.select_one('meta[name="viewport"]')
-    return bool(tag and tag.get("content"))
+    return parse_head(html).has_viewport
 
 
-def extract_contact_presence(html: str) -> tuple[bool, bool, bool]:
-    has_email = bool(EMAIL_RE.search(html))
-    has_phone = bool(PHONE_RE.search(html))
-    has_address = bool(ADDRESS_HINT_RE.search(html))
+def _has_email(text: str, max_candidates: int = 200) -> bool:
+    # Only look around each "@": scanning every position for a local part costs
+    # 64 steps per character on long runs of letters and dots.
+    i = text.find("@")
+    while i != -1 and max_candidates:
+        if EMAIL_RE.search(text[max(0, i - 64) : i + 400]):
+            return True
+        max_candidates -= 1
+        i = text.find("@", i + 1)
+    return False
+
+
+def contact_presence(page: PageText) -> tuple[bool, bool, bool]:
+    has_email = page.has_email or _has_email(page.text)
+    has_phone = page.has_phone or bool(PHONE_RE.search(page.text))
+    has_address = page.has_address or bool(ADDRESS_HINT_RE.search(page.text))
     return has_email, has_phone, has_address
 
 
-def detect_stack_hint(html: str) -> str | None:
-    h = html.lower()
+def extract_contact_presence(html: str) -> tuple[bool, bool, bool]:
+    return contact_presence(extract_page_text(html))
 
-    if "wp-content" in h or "wp-includes" in h or "wordpress" in h:
-        return "wordpress"
 
-    if "joomla" in h:
-        return "joomla"
+# Pages that carry a small business' contact details, in the order worth fetching them:
+# the Impressum is mandatory in Austria (and Germany) and lists email, phone and address.
+# Markers are matched on the lowercased link path and link text.
+CONTACT_PAGE_MARKERS = (
+    ("impressum", ("impressum", "imprint", "offenlegung", "legal-notice", "legal notice")),
+    ("kontakt", ("kontakt", "contact", "anfahrt")),
+    ("about", ("über uns", "über-uns", "ueber-uns", "ueber uns", "uber-uns", "about", "unternehmen", "team")),
+)
+_SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg", ".zip", ".doc", ".docx", ".vcf")
+
+
+def classify_link(href: str, text: str = "") -> Optional[str]:
+    """"impressum", "kontakt" or "about" if the link probably leads to such a page, else None."""
+    path = unquote(urlsplit(href).path).lower()
+    label = text.lower()
+    for kind, markers in CONTACT_PAGE_MARKERS:
+        if any(m in path or m in label for m in markers):
+            return kind
+    return None
+
+
+def _site_host(url: str) -> str:
+    host = (urlsplit(url).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
 
-    if "wix.com" in h or "wixsite" in h:
-        return "wix"
+def contact_page_links(base_url: str, links: list[tuple[str, str]], limit: int) -> list[str]:
+    """
+    Up to `limit` absolute same-site URLs of Impressum / Kontakt / Über uns pages among
+    `links` (PageText.links of the page at `base_url`): the first link of each kind
+    comes first, in CONTACT_PAGE_MARKERS order, then further links of each kind.
+    """
+    rank = {kind: i for i, (kind, _) in enumerate(CONTACT_PAGE_MARKERS)}
+    site = _site_host(base_url)
+    here = urlunsplit(urlsplit(base_url)._replace(fragment=""))
+    seen = {here}
+    firsts: list[tuple[int, str]] = []
+    rest: list[tuple[int, str]] = []
+    kinds: set[str] = set()
+    for href, text in links:
+        kind = classify_link(href, text)
+        if kind is None:
+            continue
+        url = urlunsplit(urlsplit(urljoin(base_url, href))._replace(fragment=""))
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or _site_host(url) != site or url in seen:
+            continue
+        if parts.path.lower().endswith(_SKIP_EXTENSIONS):
+            continue
+        seen.add(url)
+        (rest if kind in kinds else firsts).append((rank[kind], url))
+        kinds.add(kind)
+    ordered = sorted(firsts) + sorted(rest)  # stable by page order within a kind
+    return [url for _, url in ordered[: max(0, limit)]]
 
-    if "squarespace" in h:
-        return "squarespace"
 
-    if "webflow" in h:
-        return "webflow"
+# (hint, markers) checked in order; markers are plain ASCII so they can be matched on bytes.
+STACK_MARKERS = (
+    ("wordpress", ("wp-content", "wp-includes", "wordpress")),
+    ("joomla", ("joomla",)),
+    ("wix", ("wix.com", "wixsite")),
+    ("squarespace", ("squarespace",)),
+    ("webflow", ("webflow",)),
+)
+_STACK_MARKERS_BYTES = tuple(
+    (hint, tuple(m.encode("ascii") for m in markers)) for hint, markers in STACK_MARKERS
+)
+
+
+def detect_stack_hint(html: str | bytes, generator: str | None = None) -> str | None:
+    """
+    Accepts the raw body as bytes as well: lowercasing bytes is ASCII-only and skips
+    decoding entirely, which is all these markers need. A `<meta name="generator">`
+    value is checked first; it is often all a head-only scan has.
+    """
+    if generator:
+        hint = detect_stack_hint(generator)
+        if hint:
+            return hint
+    h = html.lower()
+    table = _STACK_MARKERS_BYTES if isinstance(h, bytes) else STACK_MARKERS
+
+    for hint, markers in table:
+        if any(m in h for m in markers):
+            return hint
 
     return None
 
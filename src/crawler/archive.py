@@ -0,0 +1,253 @@
+"""
+Content-addressed response archive with offline replay.
+
+Layout (WARC-like, but simple):
+
+    <root>/index.sqlite           url -> status, headers, body hash
+    <root>/bodies/ab/abcdef....gz gzip-compressed raw bodies, named by sha256
+
+Recording happens at the httpx transport level, so every hop of a redirect chain is
+archived and replay reproduces redirects exactly. Bodies are stored as received on the
+wire (still content-encoded); httpx decodes them on replay just like a live response.
+
+Responses are archived when their stream is closed. A body the caller stopped reading
+early (a head-only scan) is stored with `complete = 0` and never replaces a complete one.
+Compressing and committing happen on the archive's writer thread, off the event loop;
+`close()` waits for the queued writes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+
+INDEX_SCHEMA = """
+PRAGMA journal_mode=WAL;
+
+CREATE TABLE IF NOT EXISTS responses (
+  url TEXT PRIMARY KEY,
+  status_code INTEGER NOT NULL,
+  headers_json TEXT NOT NULL,
+  body_sha256 TEXT NOT NULL,
+  body_size INTEGER NOT NULL,
+  complete INTEGER NOT NULL DEFAULT 1,
+  fetched_at TEXT DEFAULT (datetime('now'))
+);
+"""
+
+
+class ArchiveMiss(Exception):
+    """Raised in replay mode for a URL that was never archived."""
+
+
+@dataclass(frozen=True)
+class ArchivedResponse:
+    url: str
+    status_code: int
+    headers: list[tuple[str, str]]
+    body_sha256: str
+
+
+class ResponseArchive:
+    def __init__(self, root: str | Path):
+        self.root = Path(root)
+        self.bodies = self.root / "bodies"
+        self.bodies.mkdir(parents=True, exist_ok=True)
+        # Writes run on the writer thread, replay reads on the event loop's; _lock serializes them.
+        self.conn = sqlite3.connect(str(self.root / "index.sqlite"), timeout=30, check_same_thread=False)
+        self.conn.executescript(INDEX_SCHEMA)
+        cols = {r[1] for r in self.conn.execute("PRAGMA table_info(responses)")}
+        if "complete" not in cols:
+            self.conn.execute("ALTER TABLE responses ADD COLUMN complete INTEGER NOT NULL DEFAULT 1")
+        self.conn.commit()
+        self._lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix="archive-writer")
+        self._closed = False
+
+    def _body_path(self, sha: str) -> Path:
+        return self.bodies / sha[:2] / f"{sha}.gz"
+
+    def put(
+        self,
+        url: str,
+        status_code: int,
+        headers: list[tuple[str, str]],
+        body: bytes,
+        complete: bool = True,
+    ) -> str:
+        sha = hashlib.sha256(body).hexdigest()
+        path = self._body_path(sha)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # write-then-rename so concurrent writers never expose a partial body
+            fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(gzip.compress(body, compresslevel=6))
+            os.replace(tmp, path)
+
+        with self._lock:
+            self._upsert(url, status_code, headers, sha, len(body), complete)
+        return sha
+
+    def put_nowait(
+        self,
+        url: str,
+        status_code: int,
+        headers: list[tuple[str, str]],
+        body: bytes,
+        complete: bool = True,
+    ) -> "Future[str]":
+        """Queue `put` on the writer thread; does not wait."""
+        future = self._writer.submit(self.put, url, status_code, headers, body, complete)
+        future.add_done_callback(_report_failure)
+        return future
+
+    def _upsert(
+        self, url: str, status_code: int, headers: list[tuple[str, str]], sha: str, size: int, complete: bool
+    ) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO responses(url, status_code, headers_json, body_sha256, body_size, complete)
+            VALUES(?,?,?,?,?,?)
+            ON CONFLICT(url) DO UPDATE SET
+              status_code=excluded.status_code,
+              headers_json=excluded.headers_json,
+              body_sha256=excluded.body_sha256,
+              body_size=excluded.body_size,
+              complete=excluded.complete,
+              fetched_at=datetime('now')
+            WHERE excluded.complete OR NOT responses.complete
+            """,
+            (url, status_code, json.dumps(headers), sha, size, 1 if complete else 0),
+        )
+        self.conn.commit()
+
+    def get(self, url: str) -> Optional[ArchivedResponse]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT status_code, headers_json, body_sha256 FROM responses WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if not row:
+            return None
+        status_code, headers_json, sha = row
+        headers = [(k, v) for k, v in json.loads(headers_json)]
+        return ArchivedResponse(url=url, status_code=status_code, headers=headers, body_sha256=sha)
+
+    def read_body(self, sha: str) -> bytes:
+        return gzip.decompress(self._body_path(sha).read_bytes())
+
+    def close(self) -> None:
+        """Finish queued writes, then close the index."""
+        if self._closed:
+            return
+        self._closed = True
+        self._writer.shutdown(wait=True)
+        self.conn.close()
+
+    async def aclose(self) -> None:
+        """`close()` without blocking the event loop."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+
+
+def _report_failure(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[archive] write failed: {future.exception()!r}", file=sys.stderr)
+
+
+class _RecordingStream(httpx.AsyncByteStream):
+    """Passes raw chunks through and archives what was read when the stream is closed."""
+
+    def __init__(self, response: httpx.Response, on_close):
+        self._response = response
+        self._on_close = on_close
+        self._chunks: list[bytes] = []
+        self._complete = False
+        self._closed = False
+
+    async def __aiter__(self):
+        async for chunk in self._response.aiter_raw():
+            self._chunks.append(chunk)
+            yield chunk
+        self._complete = True
+
+    async def aclose(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        await self._response.aclose()
+        self._on_close(b"".join(self._chunks), self._complete)
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Passes requests to the network and archives every GET response."""
+
+    def __init__(self, archive: ResponseArchive, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.archive = archive
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        if request.method != "GET":
+            return response
+
+        url = str(request.url)
+        headers = list(response.headers.multi_items())
+
+        def on_close(raw: bytes, complete: bool) -> None:
+            self.archive.put_nowait(url, response.status_code, headers, raw, complete=complete)
+
+        return httpx.Response(
+            response.status_code,
+            headers=headers,
+            stream=_RecordingStream(response, on_close),
+            request=request,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class ReplayTransport(httpx.AsyncBaseTransport):
+    """Serves requests from the archive; never touches the network."""
+
+    def __init__(self, archive: ResponseArchive):
+        self.archive = archive
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        entry = self.archive.get(str(request.url))
+        if entry is None:
+            raise ArchiveMiss(str(request.url))
+        return httpx.Response(
+            entry.status_code,
+            headers=entry.headers,
+            content=self.archive.read_body(entry.body_sha256),
+            request=request,
+        )
+
+
+def archive_transport(
+    archive: Optional[ResponseArchive],
+    replay: bool = False,
+) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for an httpx client: record into / replay from `archive`, or None for plain httpx."""
+    if archive is None:
+        if replay:
+            raise ValueError("replay mode requires an archive")
+        return None
+    return ReplayTransport(archive) if replay else RecordingTransport(archive)
@@ -0,0 +1,274 @@
+"""
+Store access from async code without blocking the event loop.
+
+AsyncStore runs every write on one writer thread that owns the read-write connection:
+callers enqueue an operation and await its result, so commits and fsyncs happen off
+the loop. Writes that queue up while a commit is in flight are committed together in
+one transaction. Reads go to a small pool of query-only connections; under WAL they
+see the last committed state and never wait for the writer.
+
+    async with AsyncStore(db_path) as store:
+        await store.log_fetch(url, 200, url, None)
+        counts = await store.queue_counts()
+        await store.write(store_result, result)   # any fn(store, ...) in one transaction
+
+`store.nowait` queues writes without waiting for them, for bookkeeping that should
+not hold up a fetch (DeadHosts, RobotsCache). Every read is awaited through `read`, so
+SQLite never runs on the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import queue
+import sys
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Optional, TypeVar
+
+from crawler import profiling
+from crawler.store import STALE_AFTER_DAYS, Store
+
+T = TypeVar("T")
+
+# Writes committed in one transaction at most; keeps a single commit short.
+MAX_WRITE_GROUP = 200
+
+
+@dataclass
+class _Write:
+    fn: Callable[..., Any]
+    args: tuple
+    kwargs: dict
+    # False for operations that manage their own transaction (claim_batch)
+    grouped: bool = True
+    future: Future = field(default_factory=Future)
+
+
+class AsyncStore:
+    def __init__(self, db_path: str, readers: int = 4):
+        self.db_path = str(db_path)
+        self._writes: queue.SimpleQueue[Optional[_Write]] = queue.SimpleQueue()
+        ready: Future = Future()
+        self._writer = threading.Thread(
+            target=self._writer_main, args=(ready,), name="store-writer", daemon=True
+        )
+        self._writer.start()
+        # Schema and migrations run on the writer's connection; readers need them in place.
+        ready.result()
+
+        self._readers: queue.SimpleQueue[Store] = queue.SimpleQueue()
+        for _ in range(max(1, readers)):
+            self._readers.put(Store.open_readonly(self.db_path))
+        self._read_pool = ThreadPoolExecutor(max(1, readers), thread_name_prefix="store-reader")
+        self.nowait = _NoWait(self)
+        self._closed = False
+
+    async def __aenter__(self) -> "AsyncStore":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Finish queued writes, then close every connection."""
+        if self._closed:
+            return
+        self._closed = True
+        self._writes.put(None)
+        await asyncio.get_running_loop().run_in_executor(None, self._writer.join)
+        self._read_pool.shutdown(wait=True)
+        while not self._readers.empty():
+            self._readers.get_nowait().close()
+
+    # -------------------------
+    # Generic access
+    # -------------------------
+    def submit(self, fn: Callable[..., T], *args, grouped: bool = True, **kwargs) -> "Future[T]":
+        """Queue `fn(store, *args, **kwargs)` on the writer thread; does not wait."""
+        if self._closed:
+            raise RuntimeError("AsyncStore is closed")
+        op = _Write(fn, args, kwargs, grouped)
+        self._writes.put(op)
+        return op.future
+
+    async def write(self, fn: Callable[..., T], *args, grouped: bool = True, **kwargs) -> T:
+        """Run `fn(store, *args, **kwargs)` on the writer thread and wait until it is committed."""
+        return await asyncio.wrap_future(self.submit(fn, *args, grouped=grouped, **kwargs))
+
+    async def read(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """Run `fn(reader, *args, **kwargs)` on a pooled query-only connection."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._read_pool, lambda: self._read_now(fn, *args, **kwargs))
+
+    def _read_now(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        reader = self._readers.get()
+        try:
+            return fn(reader, *args, **kwargs)
+        finally:
+            # Don't hold a read snapshot open between calls.
+            reader.conn.rollback()
+            self._readers.put(reader)
+
+    # -------------------------
+    # Writer thread
+    # -------------------------
+    def _writer_main(self, ready: Future) -> None:
+        try:
+            store = Store(self.db_path)
+        except BaseException as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+
+        try:
+            while True:
+                ops = [self._next_write()]
+                # Everything queued behind the first op joins its transaction.
+                while ops[-1] is not None and ops[-1].grouped and len(ops) < MAX_WRITE_GROUP:
+                    try:
+                        ops.append(self._writes.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = ops[-1] is None
+                if stop:
+                    ops.pop()
+                tail = ops.pop() if ops and not ops[-1].grouped else None
+                if ops:
+                    self._run_group(store, ops)
+                if tail is not None:
+                    self._run_one(store, tail)
+                if stop:
+                    return
+        finally:
+            store.close()
+
+    def _next_write(self) -> Optional[_Write]:
+        # A separate frame, so the profiler can tell waiting from writing.
+        return self._writes.get()
+
+    def _run_group(self, store: Store, ops: list[_Write]) -> None:
+        if len(ops) == 1:
+            self._run_one(store, ops[0])
+            return
+        try:
+            with store.batch():
+                results = [op.fn(store, *op.args, **op.kwargs) for op in ops]
+        except Exception:
+            # The transaction was rolled back; redo one by one so only the bad op fails.
+            for op in ops:
+                self._run_one(store, op)
+            return
+        for op, result in zip(ops, results):
+            _resolve(op.future, result)
+
+    @staticmethod
+    def _run_one(store: Store, op: _Write) -> None:
+        try:
+            result = op.fn(store, *op.args, **op.kwargs)
+        except Exception as e:
+            if store.conn.in_transaction:
+                store.conn.rollback()
+            _fail(op.future, e)
+        else:
+            _resolve(op.future, result)
+
+    # -------------------------
+    # Awaitable Store methods
+    # -------------------------
+    @asynccontextmanager
+    async def run(self, command: str) -> AsyncIterator[int]:
+        """Record a `runs` row around the block; fetches logged inside carry its id."""
+        run_id = await self.write(Store.start_run, command)
+        profiling.note_run(run_id)
+        status = "failed"
+        try:
+            yield run_id
+            status = "done"
+        except asyncio.CancelledError:
+            status = "interrupted"
+            raise
+        finally:
+            await self.write(Store.finish_run, run_id, status)
+
+    async def log_fetch(self, url, status_code, final_url, error, attempts: int = 1) -> None:
+        await self.write(Store.log_fetch, url, status_code, final_url, error, attempts)
+
+    async def upsert_site_analysis(self, **kwargs) -> None:
+        await self.write(Store.upsert_site_analysis, **kwargs)
+
+    async def bulk_upsert_discovered(self, rows) -> None:
+        # Materialize: the writer thread must not pull from a caller's generator.
+        await self.write(Store.bulk_upsert_discovered, list(rows))
+
+    async def enqueue_discovered(
+        self,
+        requeue_done: bool = False,
+        limit: Optional[int] = None,
+        stale_after_days: float = STALE_AFTER_DAYS,
+    ) -> int:
+        return await self.write(Store.enqueue_discovered, requeue_done, limit, stale_after_days)
+
+    async def claim_batch(
+        self, worker_id: str, batch_size: int, lease_seconds: int = 300, max_attempts: int = 3
+    ) -> list[str]:
+        return await self.write(
+            Store.claim_batch, worker_id, batch_size, lease_seconds, max_attempts, grouped=False
+        )
+
+    async def heartbeat(self, worker_id: str, lease_seconds: int = 300) -> None:
+        await self.write(Store.heartbeat, worker_id, lease_seconds)
+
+    async def complete_work(self, url: str, worker_id: str, ok: bool) -> None:
+        await self.write(Store.complete_work, url, worker_id, ok)
+
+    async def queue_counts(self) -> dict[str, int]:
+        return await self.read(Store.queue_counts)
+
+    async def is_site_analyzed(self, site_key: str) -> bool:
+        return await self.read(Store.is_site_analyzed, site_key)
+
+    async def has_discovered(self, url: str) -> bool:
+        return await self.read(Store.has_discovered, url)
+
+    async def get_dead_hosts(self, include_expired: bool = False) -> set[str]:
+        return await self.read(Store.get_dead_hosts, include_expired)
+
+    async def get_robots(self, origin: str):
+        return await self.read(Store.get_robots, origin)
+
+
+class _NoWait:
+    """Store writes queued on an AsyncStore without waiting (see module docstring)."""
+
+    def __init__(self, store: AsyncStore):
+        self._store = store
+
+    def mark_host_dead(self, host: str, reason: str) -> None:
+        self._background(Store.mark_host_dead, host, reason)
+
+    def clear_dead_host(self, host: str) -> None:
+        self._background(Store.clear_dead_host, host)
+
+    def put_robots(self, origin: str, status_code: int, body: str, ttl_seconds: int) -> None:
+        self._background(Store.put_robots, origin, status_code, body, ttl_seconds)
+
+    def _background(self, fn: Callable[..., Any], *args) -> None:
+        self._store.submit(fn, *args).add_done_callback(_report_failure)
+
+
+def _resolve(future: Future, result: Any) -> None:
+    if future.set_running_or_notify_cancel():
+        future.set_result(result)
+
+
+def _fail(future: Future, exc: BaseException) -> None:
+    if future.set_running_or_notify_cancel():
+        future.set_exception(exc)
+
+
+def _report_failure(future: Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        print(f"[store] background write failed: {future.exception()!r}", file=sys.stderr)
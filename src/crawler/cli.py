@@ -0,0 +1,286 @@
+"""
+`crawler` command line.
+
+    crawler discover | analyze | run | report | export | compact | merge  [--db PATH] [--config PATH] ...
+
+Heavy dependencies (httpx, bs4, tldextract, yaml) are imported inside the subcommand
+handlers that need them, so `crawler report` / `crawler export` / `--help` start fast.
+Keep module-level imports here to the standard library and crawler.settings.
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Optional
+
+from crawler.settings import (
+    default_archive_dir,
+    default_config_path,
+    default_db_path,
+    default_profile_dir,
+    default_shard_dir,
+    new_shard_path,
+)
+
+
+def _target_db(args: argparse.Namespace) -> Path:
+    # --shard: this run writes a database of its own, combined later by `crawler merge`.
+    if not args.shard:
+        return args.db
+    path = new_shard_path(args.command, args.shard_dir)
+    print(f"Writing to shard {path}")
+    return path
+
+
+def _cmd_discover(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from crawler import run_discovery
+
+    asyncio.run(
+        run_discovery.main(
+            db_path=_target_db(args),
+            config_path=args.config,
+            archive_dir=args.archive_dir,
+            use_archive=not args.no_archive,
+            replay=args.replay,
+        )
+    )
+    return 0
+
+
+def _cmd_analyze(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from crawler import run_analyze
+
+    asyncio.run(
+        run_analyze.main(
+            db_path=args.db,
+            archive_dir=args.archive_dir,
+            limit=args.limit or None,
+            attempts=args.attempts,
+            use_archive=not args.no_archive,
+            replay=args.replay,
+            worker_id=args.worker_id,
+            batch_size=args.batch_size,
+            concurrency=args.concurrency,
+            requeue=args.requeue,
+            scan=args.scan,
+            stale_after_days=args.stale_after_days,
+        )
+    )
+    return 0
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    import asyncio
+
+    from crawler import run
+
+    asyncio.run(
+        run.main(
+            db_path=_target_db(args),
+            config_path=args.config,
+            archive_dir=args.archive_dir,
+            workers=args.workers,
+            queue_size=args.queue_size,
+            attempts=args.attempts,
+            use_archive=not args.no_archive,
+            replay=args.replay,
+            skip_analyzed=not args.reanalyze,
+            scan=args.scan,
+        )
+    )
+    return 0
+
+
+def _cmd_report(args: argparse.Namespace) -> int:
+    from crawler import report
+
+    report.main(db_path=args.db)
+    return 0
+
+
+def _cmd_export(args: argparse.Namespace) -> int:
+    from crawler.export import export_discovered
+
+    n = export_discovered(args.db, args.out)
+    print(f"Wrote {n} rows to {args.out}")
+    return 0
+
+
+def _cmd_compact(args: argparse.Namespace) -> int:
+    from crawler.store import Store
+
+    store = Store(str(args.db))
+    try:
+        res = store.compact(keep_days=args.keep_days, keep_runs=args.keep_runs)
+    finally:
+        store.close()
+    print(
+        f"Compacted {res.runs} run(s): {res.rows} crawl_log rows rolled up into "
+        f"{res.urls} URL summaries. Database: {res.bytes_before / 1e6:.1f} MB -> "
+        f"{res.bytes_after / 1e6:.1f} MB"
+    )
+    return 0
+
+
+def _cmd_merge(args: argparse.Namespace) -> int:
+    from crawler.store import Store
+
+    shards = args.shards or sorted(args.shard_dir.glob("*.sqlite"))
+    if not shards:
+        print(f"No shards to merge in {args.shard_dir}")
+        return 0
+    store = Store(str(args.db))
+    try:
+        for shard in shards:
+            if _same_file(Path(shard), args.db):
+                print(f"{shard}: this is --db itself, skipped")
+                continue
+            res = store.merge_shard(str(shard))
+            if res.skipped:
+                print(f"{res.shard}: already merged, skipped")
+            else:
+                rows = " ".join(f"{table}={n}" for table, n in res.rows.items() if n)
+                print(f"{res.shard}: {rows or 'nothing new'}")
+            if not args.delete:
+                continue
+            # Only delete what this database has on record as merged.
+            if not res.recorded:
+                print(f"{res.shard}: not recorded as merged, kept")
+                continue
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{shard}{suffix}").unlink(missing_ok=True)
+    finally:
+        store.close()
+    return 0
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    if a.resolve() == b.resolve():
+        return True
+    try:
+        return a.samefile(b)
+    except OSError:
+        return False
+
+
+def build_parser() -> argparse.ArgumentParser:
+    # Shared options live on a parent parser so they work after the subcommand
+    # (`crawler analyze --db x.sqlite`), which is also how the module entry points call us.
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--db", type=Path, default=default_db_path(), help="SQLite database (env: CRAWLER_DB)")
+    common.add_argument(
+        "--profile",
+        nargs="?",
+        const="full",
+        choices=("full", "cpu"),
+        help="sample stacks per stage (fetch/parse/score/store) into --profile-dir; "
+        "full also traces memory (several times slower), cpu skips that",
+    )
+    common.add_argument(
+        "--profile-dir", type=Path, default=default_profile_dir(), help="profile output (env: CRAWLER_PROFILES)"
+    )
+
+    fetching = argparse.ArgumentParser(add_help=False)
+    fetching.add_argument("--archive-dir", type=Path, default=default_archive_dir(), help="response archive (env: CRAWLER_ARCHIVE)")
+    fetching.add_argument("--replay", action="store_true", help="serve pages from the response archive, no network")
+    fetching.add_argument("--no-archive", action="store_true", help="do not record responses to the archive")
+    fetching.add_argument("--attempts", type=int, default=3, help="fetch attempts per URL")
+
+    # Mirrors crawler.run_analyze.SCAN_PROFILES (not imported: it pulls in httpx).
+    scanning = argparse.ArgumentParser(add_help=False)
+    scanning.add_argument(
+        "--scan",
+        choices=("full", "fast", "deep"),
+        default="full",
+        help="fast = read only up to </head> (title, viewport, stack); contacts stay unknown. "
+        "deep = also read up to 3 Impressum/Kontakt/Über uns pages per site while contacts are missing",
+    )
+
+    sharding = argparse.ArgumentParser(add_help=False)
+    sharding.add_argument(
+        "--shard",
+        action="store_true",
+        help="write to a new database in --shard-dir instead of --db (combine with `crawler merge`)",
+    )
+
+    shard_dir = argparse.ArgumentParser(add_help=False)
+    shard_dir.add_argument("--shard-dir", type=Path, default=default_shard_dir(), help="shard databases (env: CRAWLER_SHARDS)")
+
+    config = argparse.ArgumentParser(add_help=False)
+    config.add_argument("--config", type=Path, default=default_config_path(), help="directory seeds YAML (env: CRAWLER_CONFIG)")
+
+    parser = argparse.ArgumentParser(prog="crawler", description="Local business lead crawler.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("discover", parents=[common, config, fetching, sharding, shard_dir], help="discover business URLs from directories")
+    p.set_defaults(func=_cmd_discover)
+
+    p = sub.add_parser("analyze", parents=[common, fetching, scanning], help="analyze discovered sites (queue worker)")
+    p.add_argument("--limit", type=int, default=500, help="max URLs this worker handles (0 = until the queue is empty)")
+    p.add_argument("--worker-id", default=None, help="defaults to hostname:pid")
+    p.add_argument("--batch-size", type=int, default=25, help="URLs claimed per lease")
+    p.add_argument("--concurrency", type=int, default=4, help="sites analyzed at once per worker")
+    p.add_argument("--requeue", action="store_true", help="re-analyze URLs that were already done/failed")
+    p.add_argument(
+        "--stale-after-days",
+        type=float,
+        default=30.0,
+        help="re-queue analyses older than this (new sites and expired failure backoffs are queued too)",
+    )
+    p.set_defaults(func=_cmd_analyze)
+
+    p = sub.add_parser("run", parents=[common, config, fetching, scanning, sharding, shard_dir], help="discover and analyze in one streaming pipeline")
+    p.add_argument("--workers", type=int, default=8, help="concurrent analysis workers")
+    p.add_argument("--queue-size", type=int, default=100, help="bound of the stage queues")
+    p.add_argument("--reanalyze", action="store_true", help="also analyze sites that already have results")
+    p.set_defaults(func=_cmd_run)
+
+    p = sub.add_parser("report", parents=[common], help="print a summary of the database")
+    p.set_defaults(func=_cmd_report)
+
+    p = sub.add_parser("export", parents=[common], help="export discovered URLs to CSV")
+    p.add_argument("--out", type=Path, default=default_db_path().parent / "discovered.csv")
+    p.set_defaults(func=_cmd_export)
+
+    # Defaults mirror crawler.store.KEEP_LOG_DAYS / KEEP_RUNS.
+    p = sub.add_parser("compact", parents=[common], help="roll old runs' crawl_log up per URL and shrink the database")
+    p.add_argument("--keep-days", type=float, default=30.0, help="keep crawl_log detail of runs newer than this")
+    p.add_argument("--keep-runs", type=int, default=5, help="always keep the detail of the latest N runs")
+    p.set_defaults(func=_cmd_compact)
+
+    p = sub.add_parser("merge", parents=[common, shard_dir], help="merge shard databases into --db")
+    p.add_argument("shards", nargs="*", type=Path, help="shard files (default: every *.sqlite in --shard-dir)")
+    p.add_argument(
+        "--delete",
+        action="store_true",
+        help="delete each shard once --db records it as merged (never --db itself)",
+    )
+    p.set_defaults(func=_cmd_merge)
+
+    return parser
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if not args.profile:
+        return args.func(args)
+
+    from crawler.profiling import Profiler
+
+    profiler = Profiler(args.command, args.profile_dir, memory=args.profile == "full")
+    profiler.start()
+    try:
+        return args.func(args)
+    finally:
+        out = profiler.stop()
+        print(f"Profile written to {out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
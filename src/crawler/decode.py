@@ -0,0 +1,91 @@
+"""
+Decode HTML bodies once, from cheap signals only.
+
+The encoding is taken from (in order) a byte-order mark, the Content-Type charset, or a
+`<meta charset>` / `<meta http-equiv=Content-Type>` in the first few KB. We never run
+statistical detection over the whole body. Undeclared bodies are tried as UTF-8 and
+fall back to windows-1252, which is what most legacy German-language sites actually use.
+"""
+
+from __future__ import annotations
+
+import codecs
+import re
+from typing import Optional
+
+SNIFF_BYTES = 4096
+
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+_HEADER_CHARSET_RE = re.compile(r"charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+# Matches both <meta charset="x"> and <meta http-equiv="Content-Type" content="text/html; charset=x">
+_META_CHARSET_RE = re.compile(rb"<meta[^>]{0,512}?charset\s*=\s*[\"']?\s*([\w.:-]+)", re.I)
+
+# WHATWG: labels that browsers decode as windows-1252.
+_WINDOWS_1252_ALIASES = {"iso-8859-1", "latin-1", "latin1", "l1", "ascii", "us-ascii", "iso8859-1", "cp1252"}
+
+
+def _normalize(label: Optional[str]) -> Optional[str]:
+    if not label:
+        return None
+    label = label.strip().lower()
+    if label in _WINDOWS_1252_ALIASES:
+        return "windows-1252"
+    try:
+        return codecs.lookup(label).name
+    except LookupError:
+        return None
+
+
+def charset_from_content_type(content_type: Optional[str]) -> Optional[str]:
+    if not content_type:
+        return None
+    m = _HEADER_CHARSET_RE.search(content_type)
+    return _normalize(m.group(1)) if m else None
+
+
+def sniff_charset(body: bytes, content_type: Optional[str] = None) -> tuple[Optional[str], int]:
+    """
+    Return (encoding or None if undeclared, number of BOM bytes to skip).
+    """
+    for bom, enc in _BOMS:
+        if body.startswith(bom):
+            return enc, len(bom)
+
+    enc = charset_from_content_type(content_type)
+    if enc:
+        return enc, 0
+
+    m = _META_CHARSET_RE.search(body, 0, SNIFF_BYTES)
+    if m:
+        enc = _normalize(m.group(1).decode("ascii", "ignore"))
+        # A meta tag cannot meaningfully declare UTF-16: we just read it as ASCII.
+        if enc and not enc.startswith("utf-16"):
+            return enc, 0
+    return None, 0
+
+
+def decode_body(body: bytes, content_type: Optional[str] = None, truncated: bool = False) -> str:
+    """
+    `truncated`: the body was cut off at a byte count, so a UTF-8 sequence split at its
+    end is dropped instead of failing the strict UTF-8 check of an undeclared body.
+    """
+    enc, skip = sniff_charset(body, content_type)
+    data = memoryview(body)[skip:] if skip else body
+    if enc is None:
+        try:
+            if truncated:
+                return codecs.getincrementaldecoder("utf-8")().decode(data, final=False)
+            return str(data, "utf-8")
+        except UnicodeDecodeError:
+            return str(data, "windows-1252", errors="replace")
+    return str(data, enc, errors="replace")
+
+
+def decode_response(r) -> str:
+    """Decode an httpx.Response body (use instead of `r.text`)."""
+    return decode_body(r.content, r.headers.get("content-type"))
@@ -1,14 +1,34 @@
 from __future__ import annotations
 
 import asyncio
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 from urllib.parse import urljoin, urlparse
 
 import httpx
-import tldextract
+import soupsieve
 from bs4 import BeautifulSoup
 
+from crawler.archive import ResponseArchive, archive_transport
+from crawler.decode import decode_response
+from crawler.fetch import (
+    CircuitBreaker,
+    ConcurrencyController,
+    Fetcher,
+    FetchError,
+    HostRateLimiter,
+    RetryPolicy,
+)
+from crawler.robots import RobotsCache
+from crawler.seen import SeenUrls
+from crawler.urls import normalize_url
+from crawler.urls import registrable_domain as _registrable_domain
+
+if TYPE_CHECKING:
+    from crawler.async_store import AsyncStore
+    from crawler.dns import DeadHosts
+
 # Registrable junk domains to skip as non-business targets.
 SOCIAL_OR_JUNK_DOMAINS = {
     "facebook.com",
@@ -52,7 +72,11 @@ class DirectoryConfig:
     # Listing pagination
     pagination_selector: Optional[str] = None 
     max_pages: int = 50
-    delay_seconds: float = 0.8
+    # Optional fixed spacing between requests; by default the concurrency controller
+    # adapts to how the directory responds.
+    delay_seconds: float = 0.0
+    # Upper bound for concurrent requests to the directory host.
+    max_concurrency: int = 4
 
 
     include_text_hints: Optional[list[str]] = None
@@ -64,12 +88,8 @@ class DirectoryConfig:
     # Optional: cap detail pages per listing page (politeness + speed)
     max_detail_pages_per_listing: int = 30
 
-
-def _registrable_domain(url: str) -> str:
-    ext = tldextract.extract(url)
-    if not ext.domain:
-        return ""
-    return ".".join(p for p in [ext.domain, ext.suffix] if p)
+    # Fetch attempts per page (transient failures only)
+    retry_attempts: int = 3
 
 
 def _is_http_url(url: str) -> bool:
@@ -107,113 +127,175 @@ def _looks_like_business_site(url: str, directory_domain: str) -> bool:
     return True
 
 
-def _extract_outgoing_links(
-    html: str,
-    base_url: str,
-    directory_domain: str,
-    include_text_hints: Optional[list[str]],
-) -> set[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    links: set[str] = set()
+@dataclass
+class PageLinks:
+    """Everything a directory page yields, from one parse."""
 
-    for a in soup.select("a[href]"):
-        href = (a.get("href") or "").strip()
-        if not href:
-            continue
+    detail: set[str] = field(default_factory=set)
+    external: set[str] = field(default_factory=set)
+    next_page: Optional[str] = None
 
-        abs_url = urljoin(base_url, href)
-
-        # IMPORTANT: This is a soft filter; we only skip when hints exist and anchor text clearly doesn't match.
-        if include_text_hints:
-            anchor_text = " ".join(a.get_text(" ", strip=True).split()).lower()
-            if anchor_text and not any(h.lower() in anchor_text for h in include_text_hints):
-                # Soft skip only if it doesn't look like an external homepage anyway
-                # (e.g., some directories use icons, no text)
-                pass
-
-        if _looks_like_business_site(abs_url, directory_domain):
-            links.add(abs_url)
-
-    return links
 
+class ExtractionProfile:
+    """
+    A DirectoryConfig's selectors, compiled once. `extract` parses a page a single time
+    and walks its elements with an href once, testing each against every selector.
 
-def _extract_next_page(html: str, base_url: str, selector: Optional[str]) -> Optional[str]:
-    if not selector:
-        return None
-    soup = BeautifulSoup(html, "html.parser")
-    a = soup.select_one(selector)
-    if not a:
-        return None
-    href = (a.get("href") or "").strip()
-    if not href:
-        return None
-    return urljoin(base_url, href)
+    external_link_selectors pick business links (any `a[href]` if unset);
+    detail_link_selector picks detail pages; pagination_selector the first next link.
+    """
 
+    def __init__(
+        self,
+        pagination_selector: Optional[str],
+        detail_link_selector: Optional[str],
+        external_link_selectors: tuple[str, ...],
+    ):
+        self.pagination = _compile(pagination_selector)
+        self.detail = _compile(detail_link_selector)
+        self.external = tuple(_compile(sel) for sel in external_link_selectors)
+
+    def extract(self, html: str, base_url: str, directory_domain: str) -> PageLinks:
+        soup = BeautifulSoup(html, "html.parser")
+        out = PageLinks()
+
+        for el in soup.find_all(href=True):
+            href = (el.get("href") or "").strip()
+            if not href:
+                continue
 
-def _select_links(html: str, base_url: str, selector: str) -> set[str]:
-    soup = BeautifulSoup(html, "html.parser")
-    out: set[str] = set()
-    for a in soup.select(selector):
-        href = (a.get("href") or "").strip()
-        if href:
-            out.add(urljoin(base_url, href))
-    return out
+            if out.next_page is None and self.pagination is not None and self.pagination.match(el):
+                out.next_page = urljoin(base_url, href)
 
+            if self.detail is not None and self.detail.match(el):
+                out.detail.add(urljoin(base_url, href))
 
-def _extract_external_from_detail(
-    html: str,
-    base_url: str,
-    directory_domain: str,
-    selectors: list[str] | None,
-) -> set[str]:
-    """
-    Extract external business URLs from a detail page.
-    For Herold, a good selector is: a[target='_blank'][href^='http']
-    """
-    soup = BeautifulSoup(html, "html.parser")
-    links: set[str] = set()
+            if self.external:
+                is_external = any(sel.match(el) for sel in self.external)
+            else:
+                is_external = el.name == "a"
+            if is_external:
+                abs_url = urljoin(base_url, href)
+                # Must be external business site (not the directory, not social, not junk)
+                if _looks_like_business_site(abs_url, directory_domain):
+                    out.external.add(normalize_url(abs_url))
 
-    if selectors:
-        candidates = []
-        for sel in selectors:
-            candidates.extend(soup.select(sel))
-    else:
-        candidates = soup.select("a[href]")
+        return out
 
-    for a in candidates:
-        href = (a.get("href") or "").strip()
-        if not href:
-            continue
 
-        abs_url = urljoin(base_url, href)
+def _compile(selector: Optional[str]):
+    if not selector:
+        return None
+    try:
+        return soupsieve.compile(selector)
+    except soupsieve.SelectorSyntaxError as e:
+        raise ValueError(f"invalid CSS selector {selector!r}: {e}") from None
 
-        # Must be external business site (not herold, not social, not junk)
-        if _looks_like_business_site(abs_url, directory_domain):
-            links.add(abs_url)
 
-    return links
+@lru_cache(maxsize=64)
+def _profile(
+    pagination_selector: Optional[str],
+    detail_link_selector: Optional[str],
+    external_link_selectors: tuple[str, ...],
+) -> ExtractionProfile:
+    return ExtractionProfile(pagination_selector, detail_link_selector, external_link_selectors)
 
 
-async def crawl_directory(cfg: DirectoryConfig) -> list[tuple[str, str]]:
+def extraction_profile(cfg: DirectoryConfig) -> ExtractionProfile:
+    """
+    The compiled profile for `cfg` (cached by selector set). Raises ValueError naming the
+    directory for an invalid selector or an incomplete mode; load_configs calls this.
+    """
+    if cfg.mode not in ("external_from_listing", "detail_then_external"):
+        raise ValueError(f"{cfg.name}: unknown mode {cfg.mode!r}")
+    if cfg.mode == "detail_then_external" and not cfg.detail_link_selector:
+        raise ValueError(f"{cfg.name}: mode=detail_then_external requires detail_link_selector")
+    try:
+        return _profile(
+            cfg.pagination_selector,
+            cfg.detail_link_selector,
+            tuple(cfg.external_link_selectors or ()),
+        )
+    except ValueError as e:
+        raise ValueError(f"{cfg.name}: {e}") from None
+
+
+async def crawl_directory(
+    cfg: DirectoryConfig,
+    dead_hosts: Optional["DeadHosts"] = None,
+    archive: Optional[ResponseArchive] = None,
+    replay: bool = False,
+    store: Optional["AsyncStore"] = None,
+) -> list[tuple[str, str]]:
+    """
+    Returns [(business_url, discovered_from_url), ...]; see iter_directory.
+    Collects everything in memory: large runs should consume iter_directory instead.
     """
-    Returns [(business_url, discovered_from_url), ...]
+    return [
+        pair
+        async for pair in iter_directory(
+            cfg, dead_hosts=dead_hosts, archive=archive, replay=replay, store=store
+        )
+    ]
+
+
+async def iter_directory(
+    cfg: DirectoryConfig,
+    dead_hosts: Optional["DeadHosts"] = None,
+    archive: Optional[ResponseArchive] = None,
+    replay: bool = False,
+    store: Optional["AsyncStore"] = None,
+    seen: Optional[SeenUrls] = None,
+) -> AsyncIterator[tuple[str, str]]:
+    """
+    Yields (business_url, discovered_from_url) as soon as each page is parsed.
     discovered_from_url is:
       - listing page URL in mode=external_from_listing
       - detail page URL in mode=detail_then_external
+    Pages on hosts in `dead_hosts`, whose circuit breaker is open, or that robots.txt
+    disallows are skipped without a request. Detail pages are fetched concurrently,
+    as many at once as the adaptive controller allows (up to cfg.max_concurrency);
+    requests to a host are spaced by max(cfg.delay_seconds, Crawl-delay).
+    robots.txt is cached in `store` if given.
+    Each business URL is yielded once per `seen` set (share one across directories);
+    by default a Bloom filter confirmed against discovered_urls in `store`, so memory
+    stays flat however many links a run finds.
+    With `archive`, every response is recorded; with `replay=True` pages are served
+    from the archive instead of the network, without politeness delays.
     """
-    results: list[tuple[str, str]] = []
+    # Listing pages are bounded by cfg.max_pages, so an exact set is fine here.
     seen_pages: set[str] = set()
-    seen_pairs: set[tuple[str, str]] = set()  # (business_url, discovered_from)
+    if seen is None:
+        seen = SeenUrls(confirm=store.has_discovered if store is not None else None)
 
     async with httpx.AsyncClient(
+        transport=archive_transport(archive, replay),
         timeout=httpx.Timeout(20.0),
         follow_redirects=True,
         headers={
             "User-Agent": "local-biz-lead-crawler/0.1 (+https://github.com/AjayvirS/local-biz-lead-crawler)"
         },
     ) as client:
+        limiter = None if replay else HostRateLimiter(default_delay=cfg.delay_seconds)
+        concurrency = (
+            None
+            if replay
+            else ConcurrencyController(
+                host_initial=1, host_max=cfg.max_concurrency, global_max=cfg.max_concurrency
+            )
+        )
+        fetcher = Fetcher(
+            client,
+            policy=RetryPolicy(attempts=cfg.retry_attempts),
+            breaker=CircuitBreaker(),
+            dead_hosts=None if replay else dead_hosts,
+            robots=RobotsCache(client, store, limiter=limiter, concurrency=concurrency),
+            limiter=limiter,
+            concurrency=concurrency,
+        )
         queue: list[str] = list(cfg.start_urls)
         directory_domain = _registrable_domain(cfg.start_urls[0])
+        profile = extraction_profile(cfg)
 
         while queue and len(seen_pages) < cfg.max_pages:
             url = queue.pop(0)
@@ -222,68 +304,56 @@ async def crawl_directory(cfg: DirectoryConfig) -> list[tuple[str, str]]:
             seen_pages.add(url)
 
             try:
-                r = await client.get(url)
-                html = r.text
-            except Exception:
-                await asyncio.sleep(cfg.delay_seconds)
+                r = (await fetcher.get(url)).response
+                html = decode_response(r)
+            except FetchError as e:
+                print(f"[{cfg.name}] {e.log_error()} after {e.attempts} attempt(s): {url}")
                 continue
 
-            print(f"[{cfg.name}] Listing page: {url}")
+            limits = f" ({fetcher.concurrency.summary()})" if fetcher.concurrency else ""
+            print(f"[{cfg.name}] Listing page: {url}{limits}")
+            links = profile.extract(html, url, directory_domain)
+
             # MODE 1: listing already contains external business sites
             if cfg.mode == "external_from_listing":
-                outgoing = _extract_outgoing_links(
-                    html=html,
-                    base_url=url,
-                    directory_domain=directory_domain,
-                    include_text_hints=cfg.include_text_hints,
-                )
-                for u in outgoing:
-                    pair = (u, url)
-                    if pair not in seen_pairs:
-                        seen_pairs.add(pair)
-                        results.append(pair)
+                for u in links.external:
+                    if not await seen.check_and_add(u):
+                        yield u, url
 
             elif cfg.mode == "detail_then_external":
-                if not cfg.detail_link_selector:
-                    raise ValueError(
-                        f"{cfg.name}: mode=detail_then_external requires detail_link_selector"
-                    )
-
-                detail_urls = _select_links(html, url, cfg.detail_link_selector)
-
-                detail_urls = {d for d in detail_urls if _registrable_domain(d) == directory_domain}
+                detail_urls = {d for d in links.detail if _registrable_domain(d) == directory_domain}
 
-                for durl in list(detail_urls)[: cfg.max_detail_pages_per_listing]:
-                    print(f"  → detail: {durl}")
+                async def fetch_detail(durl: str) -> tuple[str, Optional[str]]:
                     try:
-                        dr = await client.get(durl)
-                        dhtml = dr.text
-                    except Exception:
-                        await asyncio.sleep(cfg.delay_seconds)
-                        continue
-
-                    external_links = _extract_external_from_detail(
-                        html=dhtml,
-                        base_url=durl,
-                        directory_domain=directory_domain,
-                        selectors=cfg.external_link_selectors,
-                    )
-
-                    for ext in external_links:
-                        pair = (ext, durl)
-                        if pair not in seen_pairs:
-                            seen_pairs.add(pair)
-                            results.append(pair)
-
-                    await asyncio.sleep(cfg.delay_seconds)
+                        dr = (await fetcher.get(durl)).response
+                    except FetchError as e:
+                        print(f"  → detail: {durl}: {e.log_error()} after {e.attempts} attempt(s)")
+                        return durl, None
+                    print(f"  → detail: {durl}")
+                    return durl, decode_response(dr)
+
+                # The controller decides how many of these actually run at once.
+                tasks = [
+                    asyncio.ensure_future(fetch_detail(d))
+                    for d in list(detail_urls)[: cfg.max_detail_pages_per_listing]
+                ]
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        durl, dhtml = await next_done
+                        if dhtml is None:
+                            continue
+
+                        detail_links = profile.extract(dhtml, durl, directory_domain)
+                        for ext in detail_links.external:
+                            if not await seen.check_and_add(ext):
+                                yield ext, durl
+                finally:
+                    for t in tasks:
+                        t.cancel()
 
             else:
                 raise ValueError(f"Unknown cfg.mode: {cfg.mode}")
 
-            next_url = _extract_next_page(html, url, cfg.pagination_selector)
+            next_url = links.next_page
             if next_url and next_url not in seen_pages:
                 queue.append(next_url)
-
-            await asyncio.sleep(cfg.delay_seconds)
-
-    return results
@@ -0,0 +1,169 @@
+"""
+DNS caching and dead-host bookkeeping.
+
+Small-business domains are often expired or misconfigured. DnsCache is a pre-flight
+check: it tells us a name does not exist before we spend a robots.txt fetch and a
+connection attempt on it. httpx still resolves the name itself when it connects, so a
+live host costs one extra (cached) lookup per TTL. Hosts that failed hard (NXDOMAIN,
+connection refused, connect or resolver timeouts that outlasted every retry) are
+persisted in the `dead_hosts` table, so later runs can skip them without touching the
+network until their backoff expires.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import errno
+import socket
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from crawler.async_store import AsyncStore
+
+
+POSITIVE_TTL = 300.0
+NEGATIVE_TTL = 60.0
+RESOLVE_TIMEOUT = 10.0
+
+# getaddrinfo errors that mean "this name does not exist" (as opposed to a flaky resolver)
+_NXDOMAIN_CODES = {
+    getattr(socket, "EAI_NONAME", None),
+    getattr(socket, "EAI_NODATA", None),
+} - {None}
+
+
+class HostUnresolvable(Exception):
+    def __init__(self, host: str, reason: str):
+        super().__init__(f"{host}: {reason}")
+        self.host = host
+        self.reason = reason
+
+
+@dataclass
+class _Entry:
+    addrs: Optional[list[str]]
+    reason: Optional[str]
+    expires_at: float
+
+
+class DnsCache:
+    """
+    In-process cache of getaddrinfo results.
+
+    Concurrent lookups for the same host share one resolution. NXDOMAIN is cached for
+    `negative_ttl`; timeouts and other resolver errors are not cached, so a retry asks
+    the resolver again. Failures are raised as HostUnresolvable.
+    """
+
+    def __init__(
+        self,
+        positive_ttl: float = POSITIVE_TTL,
+        negative_ttl: float = NEGATIVE_TTL,
+        timeout: float = RESOLVE_TIMEOUT,
+    ):
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.timeout = timeout
+        self._entries: dict[str, _Entry] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def resolve(self, host: str, port: int = 443) -> list[str]:
+        entry = self._entries.get(host)
+        if entry and entry.expires_at > time.monotonic():
+            if entry.reason:
+                raise HostUnresolvable(host, entry.reason)
+            return entry.addrs or []
+
+        task = self._inflight.get(host)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(host, port))
+            self._inflight[host] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(host, None))
+
+        entry = await asyncio.shield(task)
+        if entry.reason:
+            raise HostUnresolvable(host, entry.reason)
+        return entry.addrs or []
+
+    async def _lookup(self, host: str, port: int) -> _Entry:
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(
+                loop.getaddrinfo(host, port, type=socket.SOCK_STREAM),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            entry = _Entry(None, "timeout", time.monotonic() + self.negative_ttl)
+        except Exception as e:
+            entry = _Entry(None, classify_failure(e) or "dns_error", time.monotonic() + self.negative_ttl)
+        else:
+            addrs = sorted({info[4][0] for info in infos})
+            entry = _Entry(addrs, None, time.monotonic() + self.positive_ttl)
+        if entry.reason in (None, "nxdomain"):
+            self._entries[host] = entry
+        return entry
+
+
+def classify_failure(exc: BaseException) -> Optional[str]:
+    """
+    Map a fetch exception to a dead-host reason ("nxdomain", "refused", "timeout"),
+    or None if the failure says nothing about the host being dead.
+    httpx/httpcore wrap the socket error, so we walk the cause chain.
+
+    Only connect and resolver timeouts count: on 3.11 every other timeout (a slow
+    read from a live host included) is the same builtin TimeoutError, so a bare
+    TimeoutError in the chain says nothing about the host.
+    """
+    seen: set[int] = set()
+    e: Optional[BaseException] = exc
+    while e is not None and id(e) not in seen:
+        seen.add(id(e))
+
+        if isinstance(e, HostUnresolvable):
+            return e.reason if e.reason in ("nxdomain", "timeout") else None
+        if isinstance(e, socket.gaierror):
+            return "nxdomain" if e.errno in _NXDOMAIN_CODES else None
+        if isinstance(e, ConnectionRefusedError):
+            return "refused"
+        if isinstance(e, OSError) and e.errno == errno.ECONNREFUSED:
+            return "refused"
+        if type(e).__name__ == "ConnectTimeout":  # httpx's or httpcore's
+            return "timeout"
+
+        e = e.__cause__ or e.__context__
+    return None
+
+
+class DeadHosts:
+    """
+    Persistent negative cache backed by Store.dead_hosts, loaded once per run
+    (`await DeadHosts.load(store)`); changes are written without waiting.
+    """
+
+    def __init__(self, store: "AsyncStore", dead: set[str], known: set[str]):
+        self.store = store
+        self._dead = dead
+        self._known = known
+
+    @classmethod
+    async def load(cls, store: "AsyncStore") -> "DeadHosts":
+        return cls(store, await store.get_dead_hosts(), await store.get_dead_hosts(include_expired=True))
+
+    def is_dead(self, host: str) -> bool:
+        return bool(host) and host in self._dead
+
+    def mark(self, host: str, reason: str) -> None:
+        if not host:
+            return
+        self.store.nowait.mark_host_dead(host, reason)
+        self._dead.add(host)
+        self._known.add(host)
+
+    def clear(self, host: str) -> None:
+        # Only touch the DB for hosts that were recorded at some point.
+        if host in self._known:
+            self.store.nowait.clear_dead_host(host)
+            self._dead.discard(host)
+            self._known.discard(host)
@@ -0,0 +1,26 @@
+"""
+CSV export of discovered URLs (sqlite only, no crawler dependencies).
+"""
+
+from __future__ import annotations
+
+import csv
+import sqlite3
+from pathlib import Path
+
+
+def export_discovered(db_path: Path, out_path: Path) -> int:
+    Path(out_path).parent.mkdir(parents=True, exist_ok=True)
+
+    con = sqlite3.connect(db_path)
+    rows = con.execute(
+        "select url, discovered_from, discovered_at from discovered_urls order by discovered_at desc"
+    ).fetchall()
+    con.close()
+
+    with open(out_path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["url", "discovered_from", "discovered_at"])
+        w.writerows(rows)
+
+    return len(rows)
@@ -0,0 +1,539 @@
+"""
+Fetching with retries, a per-host circuit breaker and per-host politeness.
+
+Only idempotent requests are retried, and only on transient failures (timeouts, resets,
+408/425/429/5xx). Backoff is exponential with full jitter and honours `Retry-After`.
+Hosts that keep failing trip a circuit breaker so the rest of the run stops hitting them.
+URLs disallowed by robots.txt are skipped, and requests to one host are spaced by the
+larger of our configured delay and the site's `Crawl-delay`.
+
+How many requests run at once is tuned by ConcurrencyController (AIMD, like TCP
+congestion control): limits grow by one per window of healthy responses and are halved
+on 429, 5xx or timeouts.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, AsyncIterator, Optional
+from urllib.parse import urlparse
+
+import httpx
+
+from crawler.dns import DeadHosts, DnsCache, HostUnresolvable, classify_failure
+
+if TYPE_CHECKING:
+    from crawler.robots import RobotsCache
+
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+RETRY_STATUSES = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 20.0
+    # Longest Retry-After we are willing to wait for; beyond that we give up on the URL.
+    max_retry_after: float = 60.0
+    retry_statuses: frozenset[int] = field(default=RETRY_STATUSES)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff for the given (1-based) attempt."""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def should_retry_exception(self, exc: BaseException) -> bool:
+        if classify_failure(exc) in ("nxdomain", "refused"):
+            return False
+        if isinstance(exc, HostUnresolvable):
+            # A resolver timeout or SERVFAIL is as transient as a connect timeout.
+            return True
+        return isinstance(exc, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError))
+
+    def delay_for_response(self, r: httpx.Response, attempt: int) -> Optional[float]:
+        """Seconds to wait before retrying `r`, or None if it should not be retried."""
+        retry_after = parse_retry_after(r.headers.get("retry-after"))
+        if retry_after is None:
+            return self.backoff(attempt)
+        if retry_after > self.max_retry_after:
+            return None
+        return retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt is None:
+        return None
+    return max(0.0, dt.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """
+    Per-host breaker: opens after `failure_threshold` consecutive failures, then lets a
+    single probe through every `reset_after` seconds until one succeeds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_after: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._failures: dict[str, int] = {}
+        self._opened_at: dict[str, float] = {}
+        self._probing: set[str] = set()
+
+    def allow(self, host: str) -> bool:
+        opened = self._opened_at.get(host)
+        if opened is None:
+            return True
+        if host in self._probing or time.monotonic() - opened < self.reset_after:
+            return False
+        self._probing.add(host)
+        return True
+
+    def is_open(self, host: str) -> bool:
+        return host in self._opened_at
+
+    def record_success(self, host: str) -> None:
+        self._failures.pop(host, None)
+        self._opened_at.pop(host, None)
+        self._probing.discard(host)
+
+    def record_failure(self, host: str) -> None:
+        self._probing.discard(host)
+        n = self._failures.get(host, 0) + 1
+        self._failures[host] = n
+        if n >= self.failure_threshold:
+            self._opened_at[host] = time.monotonic()
+
+
+class HostRateLimiter:
+    """
+    Spaces requests to the same host by at least its delay. Slots are reserved up front,
+    so concurrent callers for one host queue up instead of firing together.
+    """
+
+    def __init__(self, default_delay: float = 0.0, max_delay: float = 60.0):
+        self.default_delay = default_delay
+        self.max_delay = max_delay
+        self._delays: dict[str, float] = {}
+        self._next_slot: dict[str, float] = {}
+
+    def set_delay(self, host: str, seconds: Optional[float]) -> None:
+        """Raise the delay for `host` (e.g. from Crawl-delay); never below the default."""
+        if seconds is None:
+            return
+        self._delays[host] = min(self.max_delay, max(self.default_delay, seconds))
+
+    def delay_for(self, host: str) -> float:
+        return self._delays.get(host, self.default_delay)
+
+    async def wait(self, host: str) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(host, 0.0))
+        self._next_slot[host] = slot + self.delay_for(host)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+@dataclass
+class _Window:
+    """One AIMD limit (a host, or the global one) and the signals that drive it."""
+
+    limit: float
+    floor: float
+    ceiling: float
+    in_flight: int = 0
+    latency: Optional[float] = None  # EWMA, seconds
+    baseline: Optional[float] = None  # fastest response seen
+    errors: float = 0.0  # EWMA of overload outcomes
+    cut_at: float = 0.0
+
+    def observe(self, latency: Optional[float], overload: bool) -> None:
+        self.errors = 0.9 * self.errors + (0.1 if overload else 0.0)
+        if latency is not None:
+            self.latency = latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            self.baseline = latency if self.baseline is None else min(self.baseline, latency)
+
+    def slow(self, latency_factor: float) -> bool:
+        if self.latency is None or self.baseline is None:
+            return False
+        return self.latency > latency_factor * max(self.baseline, 0.05)
+
+    def increase(self) -> None:
+        # +1 per `limit` healthy responses, i.e. roughly one step per round trip.
+        self.limit = min(self.ceiling, self.limit + 1.0 / self.limit)
+
+    def decrease(self, factor: float) -> bool:
+        # At most one cut per round trip: the requests already in flight were sent
+        # under the old limit and will report the same overload.
+        now = time.monotonic()
+        if now - self.cut_at < (self.latency or 0.0):
+            return False
+        self.limit = max(self.floor, self.limit * factor)
+        self.cut_at = now
+        return True
+
+
+class ConcurrencyController:
+    """
+    Adaptive in-flight limits per host and for the whole client (AIMD).
+
+    A host's limit grows additively while its responses stay fast and healthy, holds
+    while latency is above `latency_factor` x the fastest response seen, and is cut by
+    `decrease` on 429, 5xx or a timeout. The global limit follows overall latency and the
+    timeout rate (cut above `error_threshold`): timeouts across many hosts point at our
+    own link, whereas one site's 429/5xx says nothing about the others.
+    """
+
+    def __init__(
+        self,
+        *,
+        host_initial: float = 2,
+        host_max: float = 8,
+        global_initial: float = 8,
+        global_max: float = 64,
+        decrease: float = 0.5,
+        latency_factor: float = 3.0,
+        error_threshold: float = 0.2,
+    ):
+        self.host_initial = host_initial
+        self.host_max = host_max
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.error_threshold = error_threshold
+        self._global = _Window(limit=min(global_initial, global_max), floor=1, ceiling=global_max)
+        self._hosts: dict[str, _Window] = {}
+        self._waiters: list[asyncio.Future] = []
+
+    def _host(self, host: str) -> _Window:
+        w = self._hosts.get(host)
+        if w is None:
+            w = _Window(limit=min(self.host_initial, self.host_max), floor=1, ceiling=self.host_max)
+            self._hosts[host] = w
+        return w
+
+    def _free(self, w: _Window) -> bool:
+        return w.in_flight < int(w.limit) and self._global.in_flight < int(self._global.limit)
+
+    def _wake(self) -> None:
+        waiters, self._waiters = self._waiters, []
+        for fut in waiters:
+            if not fut.done():
+                fut.set_result(None)
+
+    async def acquire(self, host: str) -> None:
+        """Wait for a free slot for `host`; pair with release(), or use slot()."""
+        w = self._host(host)
+        while not self._free(w):
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            await fut
+        w.in_flight += 1
+        self._global.in_flight += 1
+
+    def release(self, host: str) -> None:
+        self._host(host).in_flight -= 1
+        self._global.in_flight -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, host: str) -> AsyncIterator[None]:
+        await self.acquire(host)
+        try:
+            yield
+        finally:
+            self.release(host)
+
+    def record(
+        self,
+        host: str,
+        latency: Optional[float] = None,
+        *,
+        overload: bool = False,
+        timeout: bool = False,
+    ) -> None:
+        """Report one response (`latency` in seconds), an overload (429/5xx) or a timeout."""
+        w = self._host(host)
+        g = self._global
+        w.observe(latency, overload or timeout)
+        g.observe(latency, timeout)
+        if timeout and g.errors > self.error_threshold:
+            g.decrease(self.decrease)
+        if overload or timeout:
+            w.decrease(self.decrease)
+            return
+        if not w.slow(self.latency_factor):
+            w.increase()
+        if g.errors <= self.error_threshold and not g.slow(self.latency_factor):
+            g.increase()
+        self._wake()
+
+    def host_limit(self, host: str) -> int:
+        return int(self._host(host).limit)
+
+    @property
+    def global_limit(self) -> int:
+        return int(self._global.limit)
+
+    def snapshot(self) -> dict:
+        """Current limits, for progress output and run stats."""
+        throttled = sum(1 for w in self._hosts.values() if w.limit < self.host_initial)
+        return {
+            "global_limit": int(self._global.limit),
+            "in_flight": self._global.in_flight,
+            "hosts": len(self._hosts),
+            "hosts_throttled": throttled,
+            "host_limits": {h: int(w.limit) for h, w in self._hosts.items()},
+        }
+
+    def summary(self) -> str:
+        snap = self.snapshot()
+        return (
+            f"limit={snap['global_limit']} in_flight={snap['in_flight']} "
+            f"hosts={snap['hosts']} throttled={snap['hosts_throttled']}"
+        )
+
+
+class FetchError(Exception):
+    """A fetch that produced no usable response. `attempts` is the number of requests sent."""
+
+    reason = "fetch_failed"
+
+    def __init__(self, url: str, attempts: int):
+        super().__init__(url)
+        self.url = url
+        self.attempts = attempts
+
+    def log_error(self) -> str:
+        cause = self.__cause__
+        if cause is None:
+            return self.reason
+        return f"{self.reason}:{type(cause).__name__}:{cause}"
+
+
+class HostSkipped(FetchError):
+    reason = "skipped:dead_host"
+
+
+class CircuitOpen(FetchError):
+    reason = "skipped:circuit_open"
+
+
+class RobotsDisallowed(FetchError):
+    reason = "skipped:robots"
+
+
+@dataclass
+class FetchResult:
+    response: httpx.Response
+    attempts: int
+
+
+class _SlotStream(httpx.AsyncByteStream):
+    """A streamed response body that holds its concurrency slot until it is closed."""
+
+    def __init__(
+        self,
+        stream: httpx.AsyncByteStream,
+        concurrency: ConcurrencyController,
+        host: str,
+        started: float,
+        overload: bool,
+    ):
+        self._stream = stream
+        self._concurrency = concurrency
+        self._host = host
+        self._started = started
+        self._overload = overload
+        self._timed_out = False
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except httpx.TimeoutException:
+            self._timed_out = True
+            raise
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                if self._timed_out:
+                    self._concurrency.record(self._host, timeout=True)
+                else:
+                    latency = time.monotonic() - self._started
+                    self._concurrency.record(self._host, latency, overload=self._overload)
+                self._concurrency.release(self._host)
+
+
+class Fetcher:
+    """
+    Wraps an httpx.AsyncClient with the DNS cache, dead-host skipping, robots.txt,
+    the per-host rate limiter, adaptive concurrency, retries and the circuit breaker.
+    Every component is optional.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        policy: Optional[RetryPolicy] = None,
+        breaker: Optional[CircuitBreaker] = None,
+        dns: Optional[DnsCache] = None,
+        dead_hosts: Optional[DeadHosts] = None,
+        robots: Optional["RobotsCache"] = None,
+        limiter: Optional[HostRateLimiter] = None,
+        concurrency: Optional[ConcurrencyController] = None,
+    ):
+        self.client = client
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker
+        self.dns = dns
+        self.dead_hosts = dead_hosts
+        self.robots = robots
+        self.limiter = limiter
+        self.concurrency = concurrency
+
+    async def get(self, url: str, **kwargs) -> FetchResult:
+        return await self.request("GET", url, **kwargs)
+
+    async def request(self, method: str, url: str, *, stream: bool = False, **kwargs) -> FetchResult:
+        """
+        With `stream=True` the response body is not read: the caller iterates it and
+        must close the response (`await result.response.aclose()`), which also frees
+        its concurrency slot.
+        """
+        host = urlparse(url).hostname or ""
+        if self.dead_hosts is not None and self.dead_hosts.is_dead(host):
+            raise HostSkipped(url, 0)
+
+        if self.robots is not None:
+            if self.dns is not None and host:
+                # Resolve first so a dead name does not also cost a robots.txt attempt.
+                await self._preflight(url, host)
+            rules = await self.robots.rules_for(url)
+            if not rules.allowed(url):
+                raise RobotsDisallowed(url, 0)
+            if self.limiter is not None:
+                self.limiter.set_delay(host, rules.crawl_delay)
+
+        max_attempts = self.policy.attempts if method.upper() in IDEMPOTENT_METHODS else 1
+        attempts = 0
+        last_exc: Optional[BaseException] = None
+        while True:
+            if self.breaker is not None and not self.breaker.allow(host):
+                if last_exc is not None:
+                    # The breaker opened during our own retries: report the real failure.
+                    raise FetchError(url, attempts) from last_exc
+                raise CircuitOpen(url, attempts)
+
+            attempts += 1
+            if self.limiter is not None:
+                await self.limiter.wait(host)
+            try:
+                if self.dns is not None and host:
+                    await self.dns.resolve(host)
+                r = await self._send(method, url, stream, kwargs)
+            except Exception as e:
+                self._record_failure(host)
+                if attempts < max_attempts and self.policy.should_retry_exception(e):
+                    last_exc = e
+                    await asyncio.sleep(self.policy.backoff(attempts))
+                    continue
+                reason = classify_failure(e)
+                if reason and self.dead_hosts is not None:
+                    self.dead_hosts.mark(host, reason)
+                raise FetchError(url, attempts) from e
+
+            if r.status_code in self.policy.retry_statuses:
+                self._record_failure(host)
+                delay = self.policy.delay_for_response(r, attempts)
+                breaker_open = self.breaker is not None and self.breaker.is_open(host)
+                if attempts < max_attempts and delay is not None and not breaker_open:
+                    await r.aclose()
+                    await asyncio.sleep(delay)
+                    continue
+                return FetchResult(r, attempts)
+
+            if self.breaker is not None:
+                self.breaker.record_success(host)
+            if self.dead_hosts is not None:
+                self.dead_hosts.clear(host)
+            return FetchResult(r, attempts)
+
+    async def _preflight(self, url: str, host: str) -> None:
+        """Resolve `host`, retrying resolver hiccups; mark it dead once retries run out."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self.dns.resolve(host)
+                return
+            except HostUnresolvable as e:
+                if attempt < self.policy.attempts and self.policy.should_retry_exception(e):
+                    await asyncio.sleep(self.policy.backoff(attempt))
+                    continue
+                reason = classify_failure(e)
+                if reason and self.dead_hosts is not None:
+                    self.dead_hosts.mark(host, reason)
+                raise FetchError(url, 0) from e
+
+    async def _send(self, method: str, url: str, stream: bool, kwargs: dict) -> httpx.Response:
+        if self.concurrency is None:
+            return await self._send_raw(method, url, stream, kwargs)
+        host = urlparse(url).hostname or ""
+        if not stream:
+            async with self.concurrency.slot(host):
+                started = time.monotonic()
+                try:
+                    r = await self._send_raw(method, url, stream, kwargs)
+                except httpx.TimeoutException:
+                    self.concurrency.record(host, timeout=True)
+                    raise
+                overload = r.status_code == 429 or r.status_code >= 500
+                self.concurrency.record(host, time.monotonic() - started, overload=overload)
+                return r
+
+        # A streamed body is read after we return, so the slot is held until the caller
+        # closes the response; the body read counts towards latency and timeouts.
+        await self.concurrency.acquire(host)
+        started = time.monotonic()
+        try:
+            r = await self._send_raw(method, url, stream, kwargs)
+        except BaseException as e:
+            if isinstance(e, httpx.TimeoutException):
+                self.concurrency.record(host, timeout=True)
+            self.concurrency.release(host)
+            raise
+        overload = r.status_code == 429 or r.status_code >= 500
+        r.stream = _SlotStream(r.stream, self.concurrency, host, started, overload)
+        return r
+
+    async def _send_raw(self, method: str, url: str, stream: bool, kwargs: dict) -> httpx.Response:
+        if not stream:
+            return await self.client.request(method, url, **kwargs)
+        kwargs = dict(kwargs)
+        follow_redirects = kwargs.pop("follow_redirects", httpx.USE_CLIENT_DEFAULT)
+        request = self.client.build_request(method, url, **kwargs)
+        return await self.client.send(request, stream=True, follow_redirects=follow_redirects)
+
+    def _record_failure(self, host: str) -> None:
+        if self.breaker is not None:
+            self.breaker.record_failure(host)
@@ -0,0 +1,122 @@
+"""
+Streamed page reads for site analysis.
+
+The body is pulled chunk by chunk into a HeadParser, so head signals (title, viewport,
+generator, charset) are known as soon as `</head>` arrives. A head-only read closes the
+connection right there; a full read keeps going up to `max_bytes`. Either way the bytes
+are decoded once, with the same rules as crawler.decode.
+"""
+
+from __future__ import annotations
+
+import codecs
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import httpx
+
+from crawler.analyze import PARSE_BUDGET_SECONDS, HeadParser, HeadSignals, split_markup_tail
+from crawler.decode import SNIFF_BYTES, decode_body, sniff_charset
+
+MAX_PAGE_BYTES = 2_000_000
+# Give up on finding </head> after this much; the body read (if any) continues.
+MAX_HEAD_BYTES = 256 * 1024
+
+
+@dataclass
+class PageRead:
+    head: HeadSignals = field(default_factory=HeadSignals)
+    body: bytes = b""
+    # True if we stopped before the end of the document (head-only or byte cap)
+    truncated: bool = False
+
+    def text(self, content_type: Optional[str]) -> str:
+        return decode_body(self.body, content_type, truncated=self.truncated)
+
+
+class _HeadScan:
+    """Decodes incoming bytes and feeds them to a HeadParser until the head is done."""
+
+    def __init__(self, content_type: Optional[str]):
+        self.content_type = content_type
+        self.parser = HeadParser()
+        self._decoder = None
+        self._undeclared = False
+        self._fed = 0
+        # Unterminated markup at the end of the decoded text, fed once it is complete.
+        self._tail = ""
+        # Time spent in the parser; small network chunks each re-scan an unfinished tag.
+        self._parse_seconds = 0.0
+
+    @property
+    def done(self) -> bool:
+        return self.parser.signals.complete
+
+    def feed(self, buf: bytearray, final: bool = False, truncated: bool = False) -> None:
+        """`final`: no more bytes follow; `truncated`: because the read stopped early."""
+        if self.done:
+            return
+        if self._decoder is None:
+            if len(buf) < SNIFF_BYTES and not final:
+                return
+            enc, skip = sniff_charset(bytes(buf[:SNIFF_BYTES]), self.content_type)
+            self._undeclared = enc is None
+            # Undeclared bodies: strict UTF-8, falling back to windows-1252 like decode_body.
+            self._decoder = codecs.getincrementaldecoder(enc or "utf-8")(
+                errors="strict" if enc is None else "replace"
+            )
+            self._fed = skip
+
+        chunk = bytes(buf[self._fed :])
+        self._fed = len(buf)
+        try:
+            # A cut-off body may end inside a multi-byte character; that is not an error.
+            text = self._decoder.decode(chunk, final and not truncated)
+        except UnicodeDecodeError:
+            if not self._undeclared:
+                raise
+            # Start over in windows-1252 with a fresh parser.
+            self.parser = HeadParser()
+            self._decoder = codecs.getincrementaldecoder("windows-1252")(errors="replace")
+            self._undeclared = False
+            self._tail = ""
+            text = self._decoder.decode(bytes(buf), final)
+        text, self._tail = split_markup_tail(self._tail + text)
+        started = time.monotonic()
+        self.parser.feed(text)
+        self._parse_seconds += time.monotonic() - started
+        if final or len(buf) >= MAX_HEAD_BYTES or self._parse_seconds > PARSE_BUDGET_SECONDS:
+            # Whatever is still held back never got its ">": drop it.
+            self.parser.close()
+            self.parser.signals.complete = True
+
+
+async def read_page(
+    response: httpx.Response,
+    *,
+    head_only: bool = False,
+    max_bytes: int = MAX_PAGE_BYTES,
+) -> PageRead:
+    """
+    Read a streamed response (`Fetcher.get(..., stream=True)`). The caller closes it.
+    """
+    content_type = response.headers.get("content-type")
+    scan = _HeadScan(content_type)
+    buf = bytearray()
+    truncated = False
+
+    async for chunk in response.aiter_bytes():
+        buf += chunk
+        scan.feed(buf)
+        if head_only and scan.done:
+            truncated = True
+            break
+        if len(buf) >= max_bytes:
+            del buf[max_bytes:]
+            truncated = True
+            break
+
+    if not scan.done:
+        scan.feed(buf, final=True, truncated=truncated)
+    return PageRead(head=scan.parser.signals, body=bytes(buf), truncated=truncated)
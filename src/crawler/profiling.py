@@ -0,0 +1,248 @@
+"""
+`--profile` support: a sampling profiler split by pipeline stage, plus tracemalloc.
+
+A background thread samples every thread's Python stack (default every 5 ms) and files
+each sample under the stage of the innermost frame it recognizes:
+
+    fetch  crawler.fetch / dns / robots / archive, httpx, httpcore, ssl, socket
+    parse  crawler.analyze / page / decode / discover / urls, bs4, soupsieve, html.parser
+    score  crawler.score
+    store  crawler.store / async_store, sqlite3
+    idle   event loop waiting in select(), pool threads waiting for work
+
+Sampling stacks (instead of switching cProfile on and off) keeps the attribution right
+while hundreds of coroutines interleave, and sees the store's writer thread too.
+
+Output goes to `<profile dir>/<command>-run<id>/` (or a timestamp when the command has
+no run): `stacks.folded` (one `stage;frame;...;frame count` line per stack, for
+flamegraph.pl or speedscope) and `summary.txt` (time per stage, hottest functions per
+stage, peak memory and the top allocators from tracemalloc snapshots).
+
+Tracing memory makes every allocation slower (parsing several times over), which also
+inflates allocation-heavy stages; use `--profile cpu` for realistic timings.
+"""
+
+from __future__ import annotations
+
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+STAGES = ("fetch", "parse", "score", "store", "other")
+
+# Module-name prefixes per stage, checked from the innermost frame outwards.
+_STAGE_PREFIXES = (
+    ("score", ("crawler.score",)),
+    ("store", ("crawler.store", "crawler.async_store", "sqlite3")),
+    (
+        "parse",
+        (
+            "crawler.analyze",
+            "crawler.page",
+            "crawler.decode",
+            "crawler.discover",
+            "crawler.urls",
+            "crawler.seen",
+            "bs4",
+            "soupsieve",
+            "html.parser",
+            "_markupbase",
+            "tldextract",
+        ),
+    ),
+    (
+        "fetch",
+        (
+            "crawler.fetch",
+            "crawler.dns",
+            "crawler.robots",
+            "crawler.archive",
+            "httpx",
+            "httpcore",
+            "h11",
+            "anyio",
+            "ssl",
+            "socket",
+        ),
+    ),
+)
+
+# Frames where a thread sits waiting rather than working.
+_IDLE = {
+    ("selectors", None),
+    ("concurrent.futures.thread", "_worker"),
+    ("threading", "wait"),
+    ("queue", "get"),
+    ("crawler.async_store", "_next_write"),
+}
+
+TOP_FUNCTIONS = 12
+TOP_ALLOCATORS = 20
+
+
+def _module(frame) -> str:
+    return frame.f_globals.get("__name__", "?")
+
+
+def _label(frame) -> str:
+    code = frame.f_code
+    return f"{_module(frame)}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _stage(frames: list) -> str:
+    """`frames` innermost first."""
+    for frame in frames:
+        module = _module(frame)
+        for stage, prefixes in _STAGE_PREFIXES:
+            if module.startswith(prefixes):
+                return stage
+    return "other"
+
+
+def _is_idle(leaf) -> bool:
+    module = _module(leaf)
+    return (module, None) in _IDLE or (module, leaf.f_code.co_name) in _IDLE
+
+
+class Profiler:
+    def __init__(
+        self,
+        command: str,
+        out_root: Path,
+        interval: float = 0.005,
+        memory: bool = True,
+    ):
+        self.command = command
+        self.out_root = Path(out_root)
+        self.interval = interval
+        self.memory = memory
+        self.run_id: Optional[int] = None
+        self.out_dir: Optional[Path] = None
+        self.samples = 0
+        self._stacks: Counter[tuple[str, ...]] = Counter()
+        self._stage_samples: Counter[str] = Counter()
+        self._self_samples: dict[str, Counter[str]] = {s: Counter() for s in STAGES}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._baseline: Optional[tracemalloc.Snapshot] = None
+        self._started_at = 0.0
+        self._wall = 0.0
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        global _active
+        _active = self
+        if self.memory:
+            tracemalloc.start()
+            self._baseline = tracemalloc.take_snapshot()
+        self._started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Path:
+        global _active
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._wall = time.perf_counter() - self._started_at
+        final = tracemalloc.take_snapshot() if self.memory else None
+        peak = tracemalloc.get_traced_memory()[1] if self.memory else 0
+        if self.memory:
+            tracemalloc.stop()
+        _active = None
+        return self._write(final, peak)
+
+    # -------------------------
+    # Sampling
+    # -------------------------
+    def _sample_loop(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, leaf in sys._current_frames().items():
+                if ident != me:
+                    self._record(leaf)
+
+    def _record(self, leaf) -> None:
+        frames = []
+        frame = leaf
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        stage = "idle" if _is_idle(leaf) else _stage(frames)
+        self.samples += 1
+        self._stage_samples[stage] += 1
+        self._stacks[(stage, *(_label(f) for f in reversed(frames)))] += 1
+        if stage != "idle":
+            self._self_samples[stage][_label(leaf)] += 1
+
+    # -------------------------
+    # Output
+    # -------------------------
+    def _write(self, final: Optional[tracemalloc.Snapshot], peak: int) -> Path:
+        tag = f"run{self.run_id}" if self.run_id is not None else time.strftime("%Y%m%d-%H%M%S")
+        self.out_dir = self.out_root / f"{self.command}-{tag}"
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+
+        with open(self.out_dir / "stacks.folded", "w", encoding="utf-8") as f:
+            for stack, n in self._stacks.most_common():
+                f.write(f"{';'.join(stack)} {n}\n")
+
+        lines = [
+            f"command: {self.command}",
+            f"run id:  {self.run_id if self.run_id is not None else '-'}",
+            f"wall:    {self._wall:.1f}s, {self.samples} samples every {self.interval * 1000:.0f} ms (all threads)"
+            + (", tracemalloc on (slows allocation-heavy code)" if self.memory else ""),
+            "",
+            "Samples per stage (busy stages as a share of busy samples):",
+        ]
+        busy = sum(n for s, n in self._stage_samples.items() if s != "idle") or 1
+        for stage in STAGES:
+            n = self._stage_samples[stage]
+            lines.append(f"  {stage:<6} {n:8d}  {100 * n / busy:5.1f}%")
+        lines.append(f"  {'idle':<6} {self._stage_samples['idle']:8d}")
+
+        for stage in STAGES:
+            top = self._self_samples[stage].most_common(TOP_FUNCTIONS)
+            if not top:
+                continue
+            lines += ["", f"Hottest functions in {stage} (self samples):"]
+            lines += [f"  {n:8d}  {label}" for label, n in top]
+
+        if final is not None:
+            final = final.filter_traces(_MEMORY_FILTERS)
+            lines += ["", f"Peak traced memory: {peak / 1e6:.1f} MB", "", "Top allocators at exit:"]
+            for stat in final.statistics("lineno")[:TOP_ALLOCATORS]:
+                lines.append(f"  {stat.size / 1e6:8.2f} MB {stat.count:9d} blocks  {stat.traceback[0]}")
+            if self._baseline is not None:
+                lines += ["", "Largest growth since start:"]
+                growth = final.compare_to(self._baseline.filter_traces(_MEMORY_FILTERS), "lineno")
+                for stat in growth[:TOP_ALLOCATORS]:
+                    lines.append(f"  {stat.size_diff / 1e6:+8.2f} MB {stat.count_diff:+9d} blocks  {stat.traceback[0]}")
+
+        (self.out_dir / "summary.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return self.out_dir
+
+
+_MEMORY_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+_active: Optional[Profiler] = None
+
+
+def note_run(run_id: int) -> None:
+    """Tag the active profile (if any) with the run id, for its directory name."""
+    if _active is not None and _active.run_id is None:
+        _active.run_id = run_id
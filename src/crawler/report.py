@@ -0,0 +1,124 @@
+"""
+Plain-text summary of the leads database (sqlite only, no crawler dependencies).
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from crawler.settings import default_db_path
+
+
+def pick_db(root: Path) -> Path:
+    """
+    The database the crawler writes to (CRAWLER_DB, else src/data/leads.sqlite), falling
+    back to data/leads.sqlite. Shards are never picked; merge them first.
+    """
+    candidates = [default_db_path(), root / "data" / "leads.sqlite"]
+    for p in candidates:
+        if p.exists():
+            return p
+    raise FileNotFoundError("No leads.sqlite found in src/data or data")
+
+
+def table_exists(conn: sqlite3.Connection, name: str) -> bool:
+    return (
+        conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=? LIMIT 1",
+            (name,),
+        ).fetchone()
+        is not None
+    )
+
+
+def main(db_path: Optional[Path] = None) -> None:
+    root = Path(__file__).resolve().parents[2]
+    db_path = Path(db_path) if db_path else pick_db(root)
+
+    print("=" * 60)
+    print("LEAD ANALYSIS REPORT")
+    print("=" * 60)
+    print(f"Repo root: {root}")
+    print(f"Using DB:  {db_path}  ({db_path.stat().st_size} bytes)")
+    print("-" * 60)
+
+    conn = sqlite3.connect(db_path)
+
+    for t in ["discovered_urls", "site_analysis", "crawl_log"]:
+        print(f"Table {t}: {'YES' if table_exists(conn, t) else 'NO'}")
+
+    if table_exists(conn, "discovered_urls"):
+        discovered = conn.execute("SELECT COUNT(*) FROM discovered_urls").fetchone()[0]
+        print(f"Discovered URLs: {discovered}")
+    else:
+        print("Discovered URLs: (table missing)")
+
+    if table_exists(conn, "site_analysis"):
+        analyzed = conn.execute("SELECT COUNT(*) FROM site_analysis").fetchone()[0]
+        print(f"Analyzed URLs:   {analyzed}")
+    else:
+        print("Analyzed URLs:   (table missing)")
+
+    print("-" * 60)
+
+    # Show worst 10 if any
+    if table_exists(conn, "leads"):
+        rows = conn.execute(
+            """
+            SELECT d.url, l.score, l.stack_hint
+            FROM leads l
+            JOIN discovered_urls d ON d.id = l.id
+            WHERE l.score IS NOT NULL
+            ORDER BY l.score ASC
+            LIMIT 10
+            """
+        ).fetchall()
+
+        if rows:
+            print("Worst 10 leads (lowest score = best opportunity):\n")
+            for i, (url, score, stack) in enumerate(rows, 1):
+                print(f"{i:2d}. Score: {score:3d} | Stack: {stack or '-'}")
+                print(f"    {url}")
+        else:
+            print("No analyzed leads yet.")
+
+    # If analysis is empty, show crawl errors to diagnose
+    if table_exists(conn, "crawl_log"):
+        err_rows = conn.execute(
+            """
+            SELECT error, COUNT(*) cnt
+            FROM crawl_log
+            WHERE error IS NOT NULL AND error != ''
+            GROUP BY error
+            ORDER BY cnt DESC
+            LIMIT 10
+            """
+        ).fetchall()
+        if err_rows:
+            print("\nTop crawl_log errors:")
+            for err, cnt in err_rows:
+                print(f"  {cnt:4d}  {err}")
+
+    if table_exists(conn, "runs"):
+        runs = conn.execute(
+            """
+            SELECT id, command, status, started_at, fetches, errors, compacted_at
+            FROM runs
+            ORDER BY id DESC
+            LIMIT 5
+            """
+        ).fetchall()
+        if runs:
+            print("\nRecent runs:")
+            for run_id, command, status, started, fetches, errors, compacted in runs:
+                counts = f"fetches={fetches} errors={errors}" if fetches is not None else ""
+                note = " (compacted)" if compacted else ""
+                print(f"  #{run_id:<4d} {command or '-':<9} {status:<11} {started}  {counts}{note}")
+
+    print("\n" + "=" * 60)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+robots.txt support.
+
+Each origin's robots.txt is fetched once, compiled into a matcher and cached in memory
+and in the `robots_cache` table, so listing/detail pages and site analysis never pay an
+extra request per URL. `Crawl-delay` is handed to the per-host rate limiter. The
+robots.txt fetch itself waits for the rate limiter and a concurrency slot like any
+other request to that host, and stops reading after MAX_ROBOTS_BYTES.
+
+Status handling follows RFC 9309: 2xx is parsed, 4xx means "no restrictions", 5xx means
+"disallow everything" (cached briefly). A network error is not cached in SQLite and is
+treated as "no restrictions" so the real fetch can surface the actual error.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+if TYPE_CHECKING:
+    from crawler.async_store import AsyncStore
+    from crawler.fetch import ConcurrencyController, HostRateLimiter
+
+
+USER_AGENT_TOKEN = "local-biz-lead-crawler"
+ROBOTS_TTL = 24 * 3600
+ROBOTS_ERROR_TTL = 3600
+ROBOTS_NETWORK_ERROR_TTL = 300
+MAX_ROBOTS_BYTES = 500 * 1024
+
+
+@dataclass(frozen=True)
+class _Rule:
+    pattern: re.Pattern
+    length: int
+    allow: bool
+
+
+@dataclass
+class RobotsRules:
+    rules: list[_Rule] = field(default_factory=list)
+    crawl_delay: Optional[float] = None
+    disallow_all: bool = False
+
+    def allowed(self, url: str) -> bool:
+        if self.disallow_all:
+            return False
+        p = urlsplit(url)
+        path = (p.path or "/") + (f"?{p.query}" if p.query else "")
+        if path == "/robots.txt":
+            return True
+
+        best: Optional[_Rule] = None
+        for rule in self.rules:
+            if rule.pattern.match(path) and (
+                best is None
+                or rule.length > best.length
+                or (rule.length == best.length and rule.allow)
+            ):
+                best = rule
+        return best is None or best.allow
+
+
+ALLOW_ALL = RobotsRules()
+DISALLOW_ALL = RobotsRules(disallow_all=True)
+
+
+def _compile_path(value: str) -> re.Pattern:
+    anchored = value.endswith("$")
+    if anchored:
+        value = value[:-1]
+    regex = ".*".join(re.escape(part) for part in value.split("*"))
+    return re.compile(regex + ("$" if anchored else ""))
+
+
+def parse_robots(text: str, user_agent: str = USER_AGENT_TOKEN) -> RobotsRules:
+    """
+    Compile the groups that apply to `user_agent` (falling back to `*`) into RobotsRules.
+    Groups naming the same agent are merged, as the RFC requires.
+    """
+    groups: list[tuple[list[str], list[tuple[str, str]], Optional[float]]] = []
+    agents: list[str] = []
+    lines: list[tuple[str, str]] = []
+    delay: Optional[float] = None
+    in_rules = False
+
+    def flush() -> None:
+        if agents:
+            groups.append((agents, lines, delay))
+
+    for raw in text.splitlines():
+        line = raw.split("#", 1)[0].strip()
+        if ":" not in line:
+            continue
+        key, value = (x.strip() for x in line.split(":", 1))
+        key = key.lower()
+
+        if key == "user-agent":
+            if in_rules:
+                flush()
+                agents, lines, delay, in_rules = [], [], None, False
+            if value:  # an empty "User-agent:" names no crawler
+                agents.append(value.lower())
+        elif key in ("allow", "disallow"):
+            in_rules = True
+            lines.append((key, value))
+        elif key == "crawl-delay":
+            in_rules = True
+            try:
+                delay = float(value)
+            except ValueError:
+                pass
+    flush()
+
+    ua = user_agent.lower()
+    matching = [g for g in groups if any(a != "*" and a in ua for a in g[0])]
+    if not matching:
+        matching = [g for g in groups if "*" in g[0]]
+
+    out = RobotsRules()
+    for _agents, group_lines, group_delay in matching:
+        for key, value in group_lines:
+            if key == "disallow" and not value:
+                continue  # "Disallow:" with no path allows everything
+            out.rules.append(_Rule(_compile_path(value), len(value), key == "allow"))
+        if group_delay is not None:
+            out.crawl_delay = max(out.crawl_delay or 0.0, group_delay)
+    return out
+
+
+def _origin(url: str) -> str:
+    p = urlsplit(url)
+    return f"{p.scheme.lower()}://{p.netloc.lower()}"
+
+
+class RobotsCache:
+    """
+    Origin -> RobotsRules, backed by memory and (optionally) Store.robots_cache.
+    Concurrent lookups for one origin share a single robots.txt fetch.
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        store: Optional["AsyncStore"] = None,
+        user_agent: str = USER_AGENT_TOKEN,
+        ttl: int = ROBOTS_TTL,
+        limiter: Optional["HostRateLimiter"] = None,
+        concurrency: Optional["ConcurrencyController"] = None,
+    ):
+        self.client = client
+        self.store = store
+        self.limiter = limiter
+        self.concurrency = concurrency
+        self.user_agent = user_agent
+        self.ttl = ttl
+        self._rules: dict[str, tuple[RobotsRules, float]] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    async def rules_for(self, url: str) -> RobotsRules:
+        origin = _origin(url)
+        cached = self._rules.get(origin)
+        if cached and cached[1] > time.monotonic():
+            return cached[0]
+
+        lock = self._locks.setdefault(origin, asyncio.Lock())
+        async with lock:
+            cached = self._rules.get(origin)
+            if cached and cached[1] > time.monotonic():
+                return cached[0]
+            rules, ttl = await self._load(origin)
+            self._rules[origin] = (rules, time.monotonic() + ttl)
+            return rules
+
+    async def _load(self, origin: str) -> tuple[RobotsRules, float]:
+        if self.store is not None:
+            row = await self.store.get_robots(origin)
+            if row is not None:
+                status_code, body, remaining = row
+                return self._rules_from(status_code, body), remaining
+
+        try:
+            status_code, body = await self._fetch(origin)
+        except Exception:
+            return ALLOW_ALL, ROBOTS_NETWORK_ERROR_TTL
+
+        ttl = ROBOTS_ERROR_TTL if status_code >= 500 else self.ttl
+        if self.store is not None:
+            self.store.nowait.put_robots(origin, status_code, body, ttl)
+        return self._rules_from(status_code, body), ttl
+
+    async def _fetch(self, origin: str) -> tuple[int, str]:
+        host = urlsplit(origin).hostname or ""
+        if self.limiter is not None:
+            await self.limiter.wait(host)
+        if self.concurrency is None:
+            return await self._get(origin)
+        async with self.concurrency.slot(host):
+            started = time.monotonic()
+            try:
+                status_code, body = await self._get(origin)
+            except httpx.TimeoutException:
+                self.concurrency.record(host, timeout=True)
+                raise
+            overload = status_code == 429 or status_code >= 500
+            self.concurrency.record(host, time.monotonic() - started, overload=overload)
+            return status_code, body
+
+    async def _get(self, origin: str) -> tuple[int, str]:
+        buf = bytearray()
+        async with self.client.stream("GET", f"{origin}/robots.txt", follow_redirects=True) as r:
+            async for chunk in r.aiter_bytes():
+                buf += chunk
+                if len(buf) >= MAX_ROBOTS_BYTES:
+                    break
+        return r.status_code, bytes(buf[:MAX_ROBOTS_BYTES]).decode("utf-8", errors="replace")
+
+    def _rules_from(self, status_code: int, body: str) -> RobotsRules:
+        if 200 <= status_code < 300:
+            return parse_robots(body, self.user_agent)
+        if status_code >= 500:
+            return DISALLOW_ALL
+        return ALLOW_ALL
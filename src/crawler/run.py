@@ -1,15 +1,279 @@
 """
 Main entry point for the crawler.
 
-Orchestrates the crawling, parsing, scoring, and storing of leads.
+Runs discovery and analysis as one streaming pipeline:
+
+    directories --(url_q)--> analysis workers --(write_q)--> batched store writer
+         \\____________________(write_q)_____________________/
+
+Discovered URLs are analyzed while discovery is still paging through listings, so the
+first leads show up within seconds. Both queues are bounded: a slow stage makes the
+stage before it wait instead of buffering without limit. On Ctrl-C / SIGTERM discovery
+stops, queued and in-flight analyses finish, and the writer flushes before exit. If any
+stage fails, the others are cancelled and the writer still flushes what it has buffered
+before the error is re-raised.
 """
 
+from __future__ import annotations
+
+import asyncio
+import signal
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from crawler.archive import ResponseArchive
+from crawler.async_store import AsyncStore
+from crawler.discover.directory import DirectoryConfig, iter_directory
+from crawler.dns import DeadHosts
+from crawler.fetch import ConcurrencyController
+from crawler.run_analyze import SiteResult, analysis_client, analysis_fetcher, analyze_url, store_result
+from crawler.run_discovery import load_configs
+from crawler.seen import SeenUrls
+from crawler.settings import default_archive_dir, default_config_path, default_db_path
+from crawler.store import Store
+from crawler.urls import site_key
+
+
+@dataclass
+class PipelineStats:
+    started_at: float = field(default_factory=time.monotonic)
+    discovered: int = 0
+    queued: int = 0
+    analyzed: int = 0
+    failed: int = 0
+    first_lead_after: Optional[float] = None
+    # analysis fetcher's adaptive limits, reported with every summary
+    concurrency: Optional[ConcurrencyController] = None
+
+    def summary(self) -> str:
+        wall = time.monotonic() - self.started_at
+        first = f"{self.first_lead_after:.1f}s" if self.first_lead_after is not None else "-"
+        limits = f" {self.concurrency.summary()}" if self.concurrency else ""
+        return (
+            f"discovered={self.discovered} queued={self.queued} analyzed={self.analyzed} "
+            f"failed={self.failed} first_lead={first} wall={wall:.1f}s{limits}"
+        )
+
+
+async def run_pipeline(
+    cfgs: list[DirectoryConfig],
+    store: AsyncStore,
+    *,
+    workers: int = 8,
+    queue_size: int = 100,
+    write_batch: int = 50,
+    flush_interval: float = 2.0,
+    attempts: int = 3,
+    archive: Optional[ResponseArchive] = None,
+    replay: bool = False,
+    skip_analyzed: bool = True,
+    scan: str = "full",
+    stop: Optional[asyncio.Event] = None,
+) -> PipelineStats:
+    stats = PipelineStats()
+    stop = stop or asyncio.Event()
+    url_q: asyncio.Queue[Optional[str]] = asyncio.Queue(maxsize=queue_size)
+    write_q: asyncio.Queue = asyncio.Queue(maxsize=queue_size * 2)
+    seen_sites: set[str] = set()
+    dead_hosts = None if replay else await DeadHosts.load(store)
+    seen = SeenUrls(confirm=store.has_discovered)
+
+    async def discover(cfg: DirectoryConfig) -> None:
+        pages = iter_directory(
+            cfg, dead_hosts=dead_hosts, archive=archive, replay=replay, store=store, seen=seen
+        )
+        try:
+            async for business_url, source in pages:
+                if stop.is_set():
+                    return
+                stats.discovered += 1
+                await write_q.put(("discovered", (business_url, source)))
+
+                key = site_key(business_url) or business_url
+                if key in seen_sites:
+                    continue
+                seen_sites.add(key)
+                if skip_analyzed and await store.is_site_analyzed(key):
+                    continue
+                stats.queued += 1
+                await url_q.put(business_url)
+        finally:
+            await pages.aclose()
+
+    async def analyze(fetcher) -> None:
+        while True:
+            url = await url_q.get()
+            if url is None:
+                return
+            try:
+                result = await analyze_url(fetcher, url, scan)
+            except Exception as e:
+                # A parser bug on one page must not take the whole pipeline down.
+                result = SiteResult(url, error=f"analyze_failed:{type(e).__name__}:{e}")
+            await write_q.put(("result", result))
+
+    async def write() -> None:
+        pairs: list[tuple[str, str]] = []
+        results: list[SiteResult] = []
+        last_flush = time.monotonic()
 
-def main():
+        def write_pending(db: Store) -> list[bool]:
+            # Runs on the store's writer thread, as one transaction.
+            with db.batch():
+                if pairs:
+                    db.bulk_upsert_discovered(pairs)
+                return [store_result(db, result) for result in results]
+
+        async def flush() -> None:
+            nonlocal last_flush
+            for analyzed in await store.write(write_pending):
+                if analyzed:
+                    stats.analyzed += 1
+                    if stats.first_lead_after is None:
+                        stats.first_lead_after = time.monotonic() - stats.started_at
+                else:
+                    stats.failed += 1
+            pairs.clear()
+            results.clear()
+            last_flush = time.monotonic()
+
+        while True:
+            timeout = max(0.0, flush_interval - (time.monotonic() - last_flush))
+            try:
+                item = await asyncio.wait_for(write_q.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                item = ()
+            if item is None:
+                await flush()
+                return
+            if item:
+                kind, payload = item
+                (pairs if kind == "discovered" else results).append(payload)
+            if len(pairs) + len(results) >= write_batch or time.monotonic() - last_flush >= flush_interval:
+                if pairs or results:
+                    await flush()
+                    print(f"[pipeline] {stats.summary()}")
+                else:
+                    last_flush = time.monotonic()
+
+    writer = asyncio.create_task(write())
+
+    async def guarded(aw):
+        # Nothing drains write_q once the writer dies, so every stage would block on it:
+        # fail as soon as the writer stops instead of waiting forever.
+        fut = asyncio.ensure_future(aw)
+        try:
+            await asyncio.wait({fut, writer}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not fut.done():
+                fut.cancel()
+        if not fut.done():
+            writer.result()
+            raise RuntimeError("pipeline writer stopped early")
+        return fut.result()
+
+    stages: list[asyncio.Future] = []
+    try:
+        async with analysis_client(archive, replay) as client:
+            fetcher = await analysis_fetcher(
+                client,
+                store,
+                attempts=attempts,
+                replay=replay,
+                dead_hosts=dead_hosts,
+                max_concurrency=workers,
+            )
+            stats.concurrency = fetcher.concurrency
+            analyzers = [asyncio.create_task(analyze(fetcher)) for _ in range(workers)]
+            producers = asyncio.ensure_future(asyncio.gather(*(discover(c) for c in cfgs)))
+            stages = [producers, *analyzers]
+
+            stopper = asyncio.ensure_future(stop.wait())
+            try:
+                await guarded(
+                    asyncio.wait({producers, stopper, *analyzers}, return_when=asyncio.FIRST_COMPLETED)
+                )
+            finally:
+                stopper.cancel()
+            for task in analyzers:
+                if task.done():
+                    task.result()  # an analyzer only returns on its sentinel, so this raises
+            if not producers.done():
+                print("[pipeline] Stopping discovery; draining queued analyses...")
+                producers.cancel()
+            try:
+                await guarded(producers)
+            except asyncio.CancelledError:
+                pass
+
+            # Sentinels go behind everything already queued, so queued work is drained.
+            for _ in analyzers:
+                await guarded(url_q.put(None))
+            await guarded(asyncio.gather(*analyzers))
+    finally:
+        # On failure, stop the other stages but still write what has been buffered.
+        for task in stages:
+            task.cancel()
+        await asyncio.gather(*stages, return_exceptions=True)
+        if not writer.done():
+            await write_q.put(None)
+        await writer
+    return stats
+
+
+async def main(
+    db_path: Optional[Path] = None,
+    config_path: Optional[Path] = None,
+    archive_dir: Optional[Path] = None,
+    workers: int = 8,
+    queue_size: int = 100,
+    attempts: int = 3,
+    use_archive: bool = True,
+    replay: bool = False,
+    skip_analyzed: bool = True,
+    scan: str = "full",
+) -> None:
     """Run the crawler."""
+    db_path = db_path or default_db_path()
+    config_path = config_path or default_config_path()
+    archive_dir = archive_dir or default_archive_dir()
+
+    cfgs = load_configs(config_path)
+    archive = ResponseArchive(archive_dir) if (use_archive or replay) else None
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # e.g. Windows; Ctrl-C then aborts without draining
+
     print("Starting local business lead crawler...")
-    # TODO: Implement crawler orchestration
+    try:
+        async with AsyncStore(str(db_path)) as store, store.run("run"):
+            stats = await run_pipeline(
+                cfgs,
+                store,
+                workers=workers,
+                queue_size=queue_size,
+                attempts=attempts,
+                archive=archive,
+                replay=replay,
+                skip_analyzed=skip_analyzed,
+                scan=scan,
+                stop=stop,
+            )
+    finally:
+        if archive is not None:
+            await archive.aclose()
+    print(f"Done. {stats.summary()}")
 
 
 if __name__ == "__main__":
-    main()
+    from crawler.cli import main as cli_main
+
+    sys.exit(cli_main(["run", *sys.argv[1:]]))
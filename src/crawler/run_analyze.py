@@ -1,39 +1,113 @@
 from __future__ import annotations
 
 import asyncio
+import os
+import socket
+import sys
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Optional
 
 import httpx
 
-from crawler.store import Store
+from crawler.archive import ResponseArchive, archive_transport
+from crawler.async_store import AsyncStore
+from crawler.dns import DeadHosts, DnsCache
+from crawler.fetch import (
+    CircuitBreaker,
+    ConcurrencyController,
+    Fetcher,
+    FetchError,
+    HostRateLimiter,
+    RetryPolicy,
+)
+from crawler.page import MAX_PAGE_BYTES, read_page
+from crawler.robots import RobotsCache
+from crawler.settings import default_archive_dir, default_db_path
+from crawler.store import STALE_AFTER_DAYS, Store
 from crawler.analyze import (
-    extract_title,
-    has_viewport_meta,
-    extract_contact_presence,
+    contact_page_links,
+    contact_presence,
+    extract_page_text,
     detect_stack_hint,
     is_https,
 )
 from crawler.score import score_site
 
+# "full" reads the page (up to MAX_PAGE_BYTES) for every signal; "fast" stops after
+# </head>: title, viewport and stack hint only, contact signals are left unknown (NULL).
+# "deep" is "full", plus the site's Impressum / Kontakt / Über uns pages (within a
+# SiteBudget) while a contact signal is still missing.
+SCAN_PROFILES = ("full", "fast", "deep")
+
+# Contact pages are short; a larger one is cut off here.
+SUBPAGE_MAX_BYTES = 512 * 1024
+
+
+@dataclass(frozen=True)
+class SiteBudget:
+    """Per-site limits of a deep scan; all of them include the landing page."""
+
+    pages: int = 4
+    seconds: float = 20.0
+    bytes: int = 3_000_000
+
+
+@dataclass
+class SiteResult:
+    """Outcome of fetching and analyzing one URL, ready to be written by store_result."""
 
-async def analyze_site(client: httpx.AsyncClient, store: Store, url: str) -> None:
+    url: str
+    status_code: Optional[int] = None
+    final_url: Optional[str] = None
+    error: Optional[str] = None
+    attempts: int = 0
+    # keyword arguments for Store.upsert_site_analysis; None if nothing was analyzed
+    analysis: Optional[dict] = None
+
+
+async def analyze_url(
+    fetcher: Fetcher, url: str, scan: str = "full", budget: SiteBudget = SiteBudget()
+) -> SiteResult:
+    """Fetch and analyze one site without touching the store."""
+    started = time.monotonic()
     try:
-        r = await client.get(url, follow_redirects=True)
-        status = r.status_code
-        final_url = str(r.url)
-        html = r.text
-        if "text/html" not in ct and "application/xhtml" not in ct:
-            ct = (r.headers.get("content-type") or "").lower()
-            store.log_fetch(url, r.status_code, str(r.url), f"non_html:{ct}")
+        res = await fetcher.get(url, follow_redirects=True, stream=True)
+    except FetchError as e:
+        return SiteResult(url, error=e.log_error(), attempts=e.attempts)
 
-    except Exception as e:
-        store.log_fetch(url, None, None, f"fetch_failed:{type(e).__name__}:{e}")
-        return
+    r = res.response
+    status = r.status_code
+    final_url = str(r.url)
 
-    title = extract_title(html)
-    viewport = has_viewport_meta(html)
-    has_email, has_phone, has_address = extract_contact_presence(html)
-    stack_hint = detect_stack_hint(html)
+    try:
+        ct = (r.headers.get("content-type") or "").lower()
+        if "text/html" not in ct and "application/xhtml" not in ct:
+            return SiteResult(url, status, final_url, f"non_html:{ct}", res.attempts)
+        page = await read_page(r, head_only=scan == "fast", max_bytes=MAX_PAGE_BYTES)
+    except httpx.HTTPError as e:
+        return SiteResult(url, status, final_url, f"fetch_failed:{type(e).__name__}:{e}", res.attempts)
+    finally:
+        await r.aclose()
+
+    title = page.head.title
+    viewport = page.head.has_viewport
+    if scan == "fast":
+        has_email = has_phone = has_address = None
+    else:
+        text = extract_page_text(page.text(ct))
+        has_email, has_phone, has_address = contact_presence(text)
+        if scan == "deep" and not (has_email and has_phone and has_address):
+            urls = contact_page_links(final_url, text.links, budget.pages - 1)
+            has_email, has_phone, has_address = await scan_contact_pages(
+                fetcher,
+                urls,
+                (has_email, has_phone, has_address),
+                deadline=started + budget.seconds,
+                max_bytes=budget.bytes - len(page.body),
+            )
+    stack_hint = detect_stack_hint(page.body, generator=page.head.generator)
     https_flag = is_https(final_url)
 
     score, reasons = score_site(
@@ -46,44 +120,246 @@ async def analyze_site(client: httpx.AsyncClient, store: Store, url: str) -> Non
         stack_hint=stack_hint,
     )
 
-    store.upsert_site_analysis(
-        url=url,
-        final_url=final_url,
-        status_code=status,
-        https=https_flag,
-        title=title,
-        has_viewport=viewport,
-        has_email=has_email,
-        has_phone=has_phone,
-        has_address=has_address,
-        stack_hint=stack_hint,
-        score=score,
-        reasons=reasons,
+    return SiteResult(
+        url,
+        status,
+        final_url,
+        None,
+        res.attempts,
+        analysis=dict(
+            url=url,
+            final_url=final_url,
+            status_code=status,
+            https=https_flag,
+            title=title,
+            has_viewport=viewport,
+            has_email=has_email,
+            has_phone=has_phone,
+            has_address=has_address,
+            stack_hint=stack_hint,
+            score=score,
+            reasons=reasons,
+        ),
     )
 
 
-async def main(limit: int = 500) -> None:
-    root = Path(__file__).resolve().parents[2]
-    db_path = root / "src" / "data" / "leads.sqlite"
+async def scan_contact_pages(
+    fetcher: Fetcher,
+    urls: list[str],
+    found: tuple[bool, bool, bool],
+    *,
+    deadline: float,
+    max_bytes: int,
+) -> tuple[bool, bool, bool]:
+    """
+    OR the contact signals of `urls` into `found` (email, phone, address), reading the
+    pages one after another until every signal is found or the deadline or byte budget
+    runs out. The pages go through the same fetcher as the landing page, so they reuse
+    its kept-alive connection and honour robots.txt and the per-host rate limit. Failed
+    pages are skipped and not logged: the site's crawl_log row is its landing page.
+    """
+    for url in urls:
+        remaining = deadline - time.monotonic()
+        if all(found) or remaining <= 0 or max_bytes <= 0:
+            break
+        try:
+            body = await asyncio.wait_for(
+                _read_subpage(fetcher, url, min(max_bytes, SUBPAGE_MAX_BYTES)), remaining
+            )
+        except (FetchError, httpx.HTTPError, asyncio.TimeoutError):
+            continue
+        if body is None:
+            continue
+        html, size = body
+        max_bytes -= size
+        found = tuple(a or b for a, b in zip(found, contact_presence(extract_page_text(html))))
+    return found
+
+
+async def _read_subpage(fetcher: Fetcher, url: str, max_bytes: int) -> Optional[tuple[str, int]]:
+    """(decoded HTML, bytes read), or None unless the page is an HTML 2xx/3xx response."""
+    res = await fetcher.get(url, follow_redirects=True, stream=True)
+    r = res.response
+    try:
+        ct = (r.headers.get("content-type") or "").lower()
+        if r.status_code >= 400 or ("text/html" not in ct and "application/xhtml" not in ct):
+            return None
+        page = await read_page(r, max_bytes=max_bytes)
+    finally:
+        await r.aclose()
+    return page.text(ct), len(page.body)
+
+
+def store_result(store: Store, result: SiteResult) -> bool:
+    """Write the crawl_log row and (if any) the analysis. Returns True if analyzed."""
+    with store.batch():
+        store.log_fetch(
+            result.url, result.status_code, result.final_url, result.error, attempts=result.attempts
+        )
+        if result.analysis is None:
+            return False
+        store.upsert_site_analysis(**result.analysis)
+        return True
+
 
-    store = Store(str(db_path))
-    urls = store.get_discovered_urls(limit=limit)
+async def analyze_site(fetcher: Fetcher, store: AsyncStore, url: str, scan: str = "full") -> bool:
+    """Fetch, analyze and store one site. Returns False if nothing could be analyzed."""
+    try:
+        result = await analyze_url(fetcher, url, scan)
+    except Exception as e:
+        # A parser bug on one page must not take the whole worker (and its lease heartbeat) down.
+        print(f"[analyze] {url}: {type(e).__name__}: {e}", file=sys.stderr)
+        result = SiteResult(url, error=f"analyze_failed:{type(e).__name__}:{e}")
+    # Both rows in one transaction, committed on the store's writer thread.
+    return await store.write(store_result, result)
 
-    if not urls:
-        raise RuntimeError("No discovered URLs found. Run discovery first.")
 
-    async with httpx.AsyncClient(
+def analysis_client(archive: Optional[ResponseArchive], replay: bool = False) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        transport=archive_transport(archive, replay),
         timeout=httpx.Timeout(20.0),
         headers={"User-Agent": "local-biz-lead-crawler/0.1"},
-    ) as client:
-        for i, url in enumerate(urls, 1):
-            await analyze_site(client, store, url)
+    )
+
+
+async def analysis_fetcher(
+    client: httpx.AsyncClient,
+    store: AsyncStore,
+    attempts: int = 3,
+    replay: bool = False,
+    dead_hosts: Optional[DeadHosts] = None,
+    max_concurrency: int = 8,
+) -> Fetcher:
+    """
+    `max_concurrency` caps the adaptive in-flight limit; the controller starts below it
+    and backs off per host on 429/5xx/timeouts.
+    """
+    # Replay must not touch the network, so no DNS pre-flight and no dead-host bookkeeping.
+    if not replay and dead_hosts is None:
+        dead_hosts = await DeadHosts.load(store)
+    concurrency = None
+    if not replay:
+        concurrency = ConcurrencyController(
+            host_initial=1,
+            host_max=4,
+            global_initial=max(1, max_concurrency // 2),
+            global_max=max_concurrency,
+        )
+    limiter = None if replay else HostRateLimiter()
+    return Fetcher(
+        client,
+        policy=RetryPolicy(attempts=attempts),
+        breaker=CircuitBreaker(),
+        dns=None if replay else DnsCache(),
+        dead_hosts=None if replay else dead_hosts,
+        robots=RobotsCache(client, store, limiter=limiter, concurrency=concurrency),
+        limiter=limiter,
+        concurrency=concurrency,
+    )
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def _heartbeat(store: AsyncStore, worker_id: str, lease_seconds: int) -> None:
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        await store.heartbeat(worker_id, lease_seconds)
+
 
-            if i % 25 == 0:
-                print(f"Analyzed {i}/{len(urls)}")
+async def run_worker(
+    fetcher: Fetcher,
+    store: AsyncStore,
+    worker_id: str,
+    *,
+    limit: Optional[int] = None,
+    batch_size: int = 25,
+    concurrency: int = 4,
+    lease_seconds: int = 300,
+    scan: str = "full",
+) -> int:
+    """
+    Claim batches from the work queue until it is empty (or `limit` URLs were handled),
+    analyzing up to `concurrency` sites at once (fewer while the fetcher's adaptive
+    controller is backing off). Returns the number of URLs handled.
+    """
+    done = 0
+    sem = asyncio.Semaphore(concurrency)
 
-    print("Analysis complete.")
+    async def one(url: str) -> None:
+        async with sem:
+            ok = await analyze_site(fetcher, store, url, scan)
+        await store.complete_work(url, worker_id, ok)
+
+    while limit is None or done < limit:
+        n = batch_size if limit is None else min(batch_size, limit - done)
+        urls = await store.claim_batch(worker_id, n, lease_seconds)
+        if not urls:
+            break
+
+        hb = asyncio.create_task(_heartbeat(store, worker_id, lease_seconds))
+        try:
+            await asyncio.gather(*(one(u) for u in urls))
+        finally:
+            hb.cancel()
+
+        done += len(urls)
+        limits = f" ({fetcher.concurrency.summary()})" if fetcher.concurrency else ""
+        print(f"[{worker_id}] Analyzed {done} (queue: {await store.queue_counts()}){limits}")
+
+    return done
+
+
+async def main(
+    db_path: Optional[Path] = None,
+    archive_dir: Optional[Path] = None,
+    limit: Optional[int] = 500,
+    attempts: int = 3,
+    use_archive: bool = True,
+    replay: bool = False,
+    worker_id: Optional[str] = None,
+    batch_size: int = 25,
+    concurrency: int = 4,
+    requeue: bool = False,
+    scan: str = "full",
+    stale_after_days: float = STALE_AFTER_DAYS,
+) -> None:
+    db_path = db_path or default_db_path()
+    archive_dir = archive_dir or default_archive_dir()
+
+    worker_id = worker_id or default_worker_id()
+    archive = ResponseArchive(archive_dir) if (use_archive or replay) else None
+
+    try:
+        async with AsyncStore(str(db_path)) as store, store.run("analyze"):
+            added = await store.enqueue_discovered(requeue_done=requeue, stale_after_days=stale_after_days)
+            counts = await store.queue_counts()
+            if not counts:
+                raise RuntimeError("No discovered URLs found. Run discovery first.")
+            print(f"[{worker_id}] Queued {added} URL(s) (new, stale or retry); queue: {counts}")
+
+            async with analysis_client(archive, replay) as client:
+                fetcher = await analysis_fetcher(
+                    client, store, attempts=attempts, replay=replay, max_concurrency=concurrency
+                )
+                done = await run_worker(
+                    fetcher,
+                    store,
+                    worker_id,
+                    limit=limit,
+                    batch_size=batch_size,
+                    concurrency=concurrency,
+                    scan=scan,
+                )
+    finally:
+        if archive is not None:
+            await archive.aclose()
+
+    print(f"Analysis complete. {done} URL(s) handled by {worker_id}.")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    from crawler.cli import main as cli_main
+
+    sys.exit(cli_main(["analyze", *sys.argv[1:]]))
@@ -1,23 +1,27 @@
 from __future__ import annotations
 
-import asyncio
+import sys
 from pathlib import Path
+from typing import Optional
 
-import yaml
+from crawler.archive import ResponseArchive
+from crawler.async_store import AsyncStore
+from crawler.discover.directory import DirectoryConfig, extraction_profile, iter_directory
+from crawler.dns import DeadHosts
+from crawler.seen import SeenUrls
+from crawler.settings import default_archive_dir, default_config_path, default_db_path
 
-from crawler.discover.directory import DirectoryConfig, crawl_directory
-from crawler.store import Store
-
-
-def _repo_root() -> Path:
-    # .../local-biz-lead-crawler/src/crawler/run_discovery.py
-    # parents[0] = crawler
-    # parents[1] = src
-    # parents[2] = repo root
-    return Path(__file__).resolve().parents[2]
+# Discoveries are written in batches as they stream in.
+WRITE_BATCH = 500
 
 
 def load_configs(path: str | Path) -> list[DirectoryConfig]:
+    """
+    Parse seeds.yaml. Selectors and modes are validated here (ValueError naming the
+    directory), so a typo fails before any request is sent.
+    """
+    import yaml
+
     path = Path(path)
     data = yaml.safe_load(path.read_text(encoding="utf-8"))
 
@@ -26,38 +30,66 @@ def load_configs(path: str | Path) -> list[DirectoryConfig]:
         pagination = d.get("pagination", {}) or {}
         rules = d.get("rules", {}) or {}
 
-        cfgs.append(
-            DirectoryConfig(
-                name=d["name"],
-                start_urls=d["start_urls"],
-                pagination_selector=pagination.get("selector"),
-                include_text_hints=rules.get("include_text_hints"),
-                max_pages=int(d.get("max_pages", 50)),
-                delay_seconds=float(d.get("delay_seconds", 0.8)),
-                mode=d.get("mode", "external_from_listing"),
-                detail_link_selector=d.get("detail_link_selector"),
-                external_link_selectors=d.get("external_link_selectors"),
-                max_detail_pages_per_listing=int(d.get("max_detail_pages_per_listing", 30)),
-            )
+        cfg = DirectoryConfig(
+            name=d["name"],
+            start_urls=d["start_urls"],
+            pagination_selector=pagination.get("selector"),
+            include_text_hints=rules.get("include_text_hints"),
+            max_pages=int(d.get("max_pages", 50)),
+            delay_seconds=float(d.get("delay_seconds", 0.0)),
+            max_concurrency=int(d.get("max_concurrency", 4)),
+            mode=d.get("mode", "external_from_listing"),
+            detail_link_selector=d.get("detail_link_selector"),
+            external_link_selectors=d.get("external_link_selectors"),
+            max_detail_pages_per_listing=int(d.get("max_detail_pages_per_listing", 30)),
+            retry_attempts=int(d.get("retry_attempts", 3)),
         )
+        extraction_profile(cfg)
+        cfgs.append(cfg)
     return cfgs
 
 
-async def main() -> None:
-    root = _repo_root()
-    config_path = root / "src" / "configs" / "seeds.yaml"
-    db_path = root / "src" / "data" / "leads.sqlite"
+async def main(
+    db_path: Optional[Path] = None,
+    config_path: Optional[Path] = None,
+    archive_dir: Optional[Path] = None,
+    use_archive: bool = True,
+    replay: bool = False,
+) -> None:
+    db_path = db_path or default_db_path()
+    config_path = config_path or default_config_path()
+    archive_dir = archive_dir or default_archive_dir()
 
-    store = Store(str(db_path))
     cfgs = load_configs(config_path)
-
-    for cfg in cfgs:
-        pairs = await crawl_directory(cfg)
-        # pairs are (business_url, discovered_from_url)
-        store.bulk_upsert_discovered(pairs)
-
-    print(f"Done. Stored discoveries in {db_path}")
+    archive = ResponseArchive(archive_dir) if (use_archive or replay) else None
+    total = 0
+
+    try:
+        async with AsyncStore(str(db_path)) as store, store.run("discover"):
+            dead_hosts = await DeadHosts.load(store)
+            seen = SeenUrls(confirm=store.has_discovered)
+
+            for cfg in cfgs:
+                # pairs are (business_url, discovered_from_url)
+                pairs: list[tuple[str, str]] = []
+                async for pair in iter_directory(
+                    cfg, dead_hosts=dead_hosts, archive=archive, replay=replay, store=store, seen=seen
+                ):
+                    pairs.append(pair)
+                    if len(pairs) >= WRITE_BATCH:
+                        await store.bulk_upsert_discovered(pairs)
+                        total += len(pairs)
+                        pairs.clear()
+                await store.bulk_upsert_discovered(pairs)
+                total += len(pairs)
+    finally:
+        if archive is not None:
+            await archive.aclose()
+
+    print(f"Done. Stored {total} discoveries in {db_path}")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    from crawler.cli import main as cli_main
+
+    sys.exit(cli_main(["discover", *sys.argv[1:]]))
@@ -14,14 +14,16 @@ def score_site(
     https: bool,
     has_viewport: bool,
     title: str | None,
-    has_email: bool,
-    has_phone: bool,
-    has_address: bool,
+    has_email: bool | None,
+    has_phone: bool | None,
+    has_address: bool | None,
     stack_hint: str | None,
 ) -> tuple[int, list[str]]:
     """
     Returns (score 0-100, reasons list)
     Lower score = worse site = better lead candidate.
+    Contact signals are None when they were not checked (fast scan); the contact
+    check is skipped then.
     """
     score = 100
     reasons: list[str] = []
@@ -43,11 +45,11 @@ def score_site(
 
     # Contact discoverability (rough but practical)
     missing = []
-    if not has_phone:
+    if has_phone is False:
         missing.append("phone")
-    if not has_email:
+    if has_email is False:
         missing.append("email")
-    if not has_address:
+    if has_address is False:
         missing.append("address")
     if len(missing) >= 2:
         score -= 10
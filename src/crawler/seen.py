@@ -0,0 +1,86 @@
+"""
+Compact "have we seen this URL?" sets for long discovery runs.
+
+BloomFilter keeps a fixed-size bit array (about 2.4 MB per million keys at a 1e-4 false
+positive rate) instead of every URL string. SeenUrls puts it in front of an exact
+check, typically `AsyncStore.has_discovered`, so a false positive costs one indexed
+lookup (on the store's read pool) and never drops a URL that was not actually seen.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import math
+from typing import Awaitable, Callable, Optional
+
+from crawler.urls import canonical_key
+
+
+class BloomFilter:
+    def __init__(self, capacity: int = 1_000_000, error_rate: float = 1e-4):
+        if capacity <= 0 or not 0 < error_rate < 1:
+            raise ValueError("capacity must be > 0 and 0 < error_rate < 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> list[int]:
+        # Two 64-bit halves of one digest, combined by double hashing (Kirsch-Mitzenmacher).
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        m = self.num_bits
+        return [(h1 + i * h2) % m for i in range(self.num_hashes)]
+
+    def __contains__(self, key: str) -> bool:
+        bits = self._bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key: str) -> bool:
+        """Add `key`; returns True if it was (probably) present already."""
+        bits = self._bits
+        present = True
+        for p in self._positions(key):
+            byte, mask = p >> 3, 1 << (p & 7)
+            if not bits[byte] & mask:
+                present = False
+                bits[byte] |= mask
+        if not present:
+            self.count += 1
+        return present
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+class SeenUrls:
+    """
+    Seen-set keyed by canonical URL. `confirm(url)` is asked only when the filter says
+    "probably seen"; if it says no, the hit was a false positive (or the URL was seen but
+    not written yet) and the URL is reported as new.
+    """
+
+    def __init__(
+        self,
+        confirm: Optional[Callable[[str], Awaitable[bool]]] = None,
+        capacity: int = 1_000_000,
+        error_rate: float = 1e-4,
+    ):
+        self.filter = BloomFilter(capacity, error_rate)
+        self.confirm = confirm
+        self.hits = 0
+        self.false_positives = 0
+
+    async def check_and_add(self, url: str) -> bool:
+        """True if `url` was seen before; marks it seen either way."""
+        if not self.filter.add(canonical_key(url)):
+            return False
+        self.hits += 1
+        if self.confirm is None or await self.confirm(url):
+            return True
+        self.false_positives += 1
+        return False
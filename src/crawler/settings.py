@@ -0,0 +1,50 @@
+"""
+Default locations shared by every entry point.
+
+Kept import-light on purpose: the CLI imports this before knowing which subcommand runs.
+`CRAWLER_DB`, `CRAWLER_CONFIG`, `CRAWLER_ARCHIVE`, `CRAWLER_SHARDS` and `CRAWLER_PROFILES`
+override the defaults.
+"""
+
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+
+def repo_root() -> Path:
+    # .../local-biz-lead-crawler/src/crawler/settings.py
+    # parents[0] = crawler
+    # parents[1] = src
+    # parents[2] = repo root
+    return Path(__file__).resolve().parents[2]
+
+
+def default_db_path() -> Path:
+    return Path(os.environ.get("CRAWLER_DB") or repo_root() / "src" / "data" / "leads.sqlite")
+
+
+def default_config_path() -> Path:
+    return Path(os.environ.get("CRAWLER_CONFIG") or repo_root() / "src" / "configs" / "seeds.yaml")
+
+
+def default_archive_dir() -> Path:
+    return Path(os.environ.get("CRAWLER_ARCHIVE") or repo_root() / "src" / "data" / "archive")
+
+
+def default_profile_dir() -> Path:
+    return Path(os.environ.get("CRAWLER_PROFILES") or repo_root() / "src" / "data" / "profiles")
+
+
+def default_shard_dir() -> Path:
+    return Path(os.environ.get("CRAWLER_SHARDS") or default_db_path().parent / "shards")
+
+
+def new_shard_path(command: str, shard_dir: Path | None = None) -> Path:
+    """A fresh shard file name, unique per machine, process and second."""
+    import socket
+    import time
+
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    host = socket.gethostname().split(".")[0] or "host"
+    return (shard_dir or default_shard_dir()) / f"{command}-{stamp}-{host}-{os.getpid()}.sqlite"
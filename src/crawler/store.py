@@ -1,28 +1,102 @@
 from __future__ import annotations
 
 import json
+import re
 import sqlite3
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterable, Optional, Tuple
+from typing import Iterable, Iterator, Optional, Tuple
+
+from crawler.urls import canonical_key, normalize_url, site_key
 
 
 SCHEMA = """
+-- Takes effect on new databases; existing ones switch on their first compaction.
+PRAGMA auto_vacuum=INCREMENTAL;
 PRAGMA journal_mode=WAL;
 
+-- One row per crawler invocation; crawl_log rows carry its id.
+-- status: running -> done | failed | interrupted
+CREATE TABLE IF NOT EXISTS runs (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  command TEXT,
+  status TEXT NOT NULL DEFAULT 'running',
+  started_at TEXT DEFAULT (datetime('now')),
+  finished_at TEXT,
+  fetches INTEGER,
+  errors INTEGER,
+  compacted_at TEXT,
+  -- shard database file name, for runs brought in by `crawler merge`
+  merged_from TEXT
+);
+
+-- Facts about this database file. db_id: random, set when it is created (or first
+-- opened by a Store that knows about it); copies and renamed shards keep it.
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+
+-- Shard databases merged into this one, by their db_id; `crawler merge` skips them.
+CREATE TABLE IF NOT EXISTS merged_shards (
+  shard_id TEXT PRIMARY KEY,
+  name TEXT,
+  merged_at TEXT DEFAULT (datetime('now'))
+);
+
 CREATE TABLE IF NOT EXISTS discovered_urls (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   url TEXT NOT NULL UNIQUE,
   discovered_from TEXT,
-  discovered_at TEXT DEFAULT (datetime('now'))
+  discovered_at TEXT DEFAULT (datetime('now')),
+  canonical_key TEXT,
+  site_key TEXT,
+  -- set once the site was queued or fetched; unset rows are the "new" selection tier
+  selected_at TEXT
 );
 
+-- One row per fetch. `error` is the error class (see split_error); the free-text
+-- message is interned in error_messages.
 CREATE TABLE IF NOT EXISTS crawl_log (
   id INTEGER PRIMARY KEY AUTOINCREMENT,
   url TEXT NOT NULL,
   status_code INTEGER,
   final_url TEXT,
   error TEXT,
-  fetched_at TEXT DEFAULT (datetime('now'))
+  attempts INTEGER,
+  fetched_at TEXT DEFAULT (datetime('now')),
+  run_id INTEGER,
+  message_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS error_messages (
+  id INTEGER PRIMARY KEY,
+  message TEXT NOT NULL UNIQUE
+);
+
+-- crawl_log rows of compacted runs, rolled up per URL.
+CREATE TABLE IF NOT EXISTS crawl_summary (
+  url TEXT PRIMARY KEY,
+  fetches INTEGER NOT NULL DEFAULT 0,
+  errors INTEGER NOT NULL DEFAULT 0,
+  first_fetched_at TEXT,
+  last_fetched_at TEXT,
+  last_status_code INTEGER,
+  last_error TEXT
+);
+
+-- Latest fetch outcome per URL (crawl_log keeps the history); drives retry backoff.
+-- last_error is the error class, its message is interned like crawl_log's.
+CREATE TABLE IF NOT EXISTS url_fetch_state (
+  url TEXT PRIMARY KEY,
+  failures INTEGER NOT NULL DEFAULT 0,
+  last_status_code INTEGER,
+  last_error TEXT,
+  last_fetched_at TEXT DEFAULT (datetime('now')),
+  retry_after TEXT,
+  last_message_id INTEGER
 );
 
 CREATE TABLE IF NOT EXISTS site_analysis (
@@ -49,49 +123,562 @@ CREATE TABLE IF NOT EXISTS llm_insights (
   model TEXT,
   generated_at TEXT DEFAULT (datetime('now'))
 );
+
+CREATE TABLE IF NOT EXISTS dead_hosts (
+  host TEXT PRIMARY KEY,
+  reason TEXT,
+  failures INTEGER NOT NULL DEFAULT 1,
+  first_failed_at TEXT DEFAULT (datetime('now')),
+  last_failed_at TEXT DEFAULT (datetime('now')),
+  retry_after TEXT
+);
+
+-- robots.txt per origin (scheme://host[:port]), reused until expires_at.
+CREATE TABLE IF NOT EXISTS robots_cache (
+  origin TEXT PRIMARY KEY,
+  status_code INTEGER,
+  body TEXT,
+  fetched_at TEXT DEFAULT (datetime('now')),
+  expires_at TEXT
+);
+
+-- Analysis work queue. state: pending -> leased -> done | failed.
+-- A lease whose lease_expires_at has passed is claimable again (worker died).
+-- One row per site (site_key), so each site is analyzed once.
+CREATE TABLE IF NOT EXISTS work_queue (
+  url TEXT PRIMARY KEY,
+  site_key TEXT,
+  state TEXT NOT NULL DEFAULT 'pending',
+  worker_id TEXT,
+  lease_expires_at TEXT,
+  attempts INTEGER NOT NULL DEFAULT 0,
+  enqueued_at TEXT DEFAULT (datetime('now')),
+  updated_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_work_queue_claim ON work_queue(state, lease_expires_at);
+
+-- One row per discovered URL (same id) with the list/filter columns of its analysis and
+-- integer ids of its site_analysis / llm_insights rows. The UI, report and export read
+-- this instead of joining the three tables on url. Kept in step by the triggers below,
+-- whoever writes (Store, merge, an LLM script); Store.rebuild_leads() recomputes it.
+CREATE TABLE IF NOT EXISTS leads (
+  id INTEGER PRIMARY KEY,
+  analysis_id INTEGER,
+  llm_id INTEGER,
+  score INTEGER,
+  https INTEGER,
+  has_viewport_meta INTEGER,
+  stack_hint TEXT,
+  discovered_at TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS leads_discovered_insert AFTER INSERT ON discovered_urls BEGIN
+  INSERT OR REPLACE INTO leads(id, analysis_id, llm_id, score, https, has_viewport_meta, stack_hint, discovered_at)
+  SELECT NEW.id, a.id, (SELECT rowid FROM llm_insights WHERE url = NEW.url),
+         a.score, a.https, a.has_viewport_meta, a.stack_hint, NEW.discovered_at
+  FROM (SELECT 1) LEFT JOIN site_analysis a ON a.url = NEW.url;
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_discovered_update AFTER UPDATE OF discovered_at ON discovered_urls BEGIN
+  UPDATE leads SET discovered_at = NEW.discovered_at WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_discovered_delete AFTER DELETE ON discovered_urls BEGIN
+  DELETE FROM leads WHERE id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_analysis_insert AFTER INSERT ON site_analysis BEGIN
+  UPDATE leads SET analysis_id = NEW.id, score = NEW.score, https = NEW.https,
+                   has_viewport_meta = NEW.has_viewport_meta, stack_hint = NEW.stack_hint
+  WHERE id = (SELECT id FROM discovered_urls WHERE url = NEW.url);
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_analysis_update AFTER UPDATE ON site_analysis BEGIN
+  UPDATE leads SET analysis_id = NEW.id, score = NEW.score, https = NEW.https,
+                   has_viewport_meta = NEW.has_viewport_meta, stack_hint = NEW.stack_hint
+  WHERE id = (SELECT id FROM discovered_urls WHERE url = NEW.url);
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_analysis_delete AFTER DELETE ON site_analysis BEGIN
+  UPDATE leads SET analysis_id = NULL, score = NULL, https = NULL,
+                   has_viewport_meta = NULL, stack_hint = NULL
+  WHERE id = (SELECT id FROM discovered_urls WHERE url = OLD.url) AND analysis_id = OLD.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_llm_insert AFTER INSERT ON llm_insights BEGIN
+  UPDATE leads SET llm_id = NEW.rowid WHERE id = (SELECT id FROM discovered_urls WHERE url = NEW.url);
+END;
+
+CREATE TRIGGER IF NOT EXISTS leads_llm_delete AFTER DELETE ON llm_insights BEGIN
+  UPDATE leads SET llm_id = NULL
+  WHERE id = (SELECT id FROM discovered_urls WHERE url = OLD.url) AND llm_id = OLD.rowid;
+END;
 """
 
+# Dead-host backoff: first failure parks a host for 6h, doubling per failure up to 30 days.
+DEAD_HOST_BACKOFF_SECONDS = 6 * 3600
+DEAD_HOST_MAX_BACKOFF_SECONDS = 30 * 24 * 3600
+
+# Failed URLs: retried after 1h, doubling per consecutive failure up to 7 days.
+FETCH_RETRY_BACKOFF_SECONDS = 3600
+FETCH_RETRY_MAX_BACKOFF_SECONDS = 7 * 24 * 3600
+
+# Analyses older than this are selected for a refresh.
+STALE_AFTER_DAYS = 30.0
+
+# crawl_log compaction: detail rows of runs older than this are rolled up, but the
+# latest KEEP_RUNS runs always keep theirs.
+KEEP_LOG_DAYS = 30.0
+KEEP_RUNS = 5
+
+MAX_ERROR_MESSAGE_CHARS = 500
+
+_RETRY_AFTER_SQL = "datetime({ts}, '+' || min(?, ? * (1 << min({n} - 1, 20))) || ' seconds')"
+
+
+@dataclass(frozen=True)
+class AnalysisCandidate:
+    url: str
+    site_key: Optional[str]
+    reason: str  # "new" | "stale" | "retry"
+
+
+@dataclass(frozen=True)
+class MergeResult:
+    shard: str
+    # rows inserted or updated per table; empty if the shard was merged before
+    rows: dict[str, int]
+    skipped: bool = False
+    # the shard's db_id is in merged_shards (merged now or before): safe to delete
+    recorded: bool = False
+
+
+@dataclass(frozen=True)
+class CompactionResult:
+    runs: int
+    rows: int
+    urls: int
+    bytes_before: int
+    bytes_after: int
+
+
+def _flag(value: Optional[bool]) -> Optional[int]:
+    """bool -> 0/1 for SQLite; None (not checked) stays NULL."""
+    return None if value is None else int(bool(value))
+
+
+_EXC_TYPE_RE = re.compile(r"([A-Z]\w*):")
+
+
+def split_error(error: str) -> Tuple[str, Optional[str]]:
+    """
+    Split a fetch error into (class, message):
+
+        "fetch_failed:ConnectError:[Errno 11001] getaddrinfo failed"
+            -> ("fetch_failed:ConnectError", "[Errno 11001] getaddrinfo failed")
+        "skipped:robots" -> ("skipped:robots", None)
+        "non_html:image/png" -> ("non_html", "image/png")
+
+    Classes are a small vocabulary to group and filter by; messages are free text.
+    """
+    head, _, rest = error.partition(":")
+    if head == "skipped" and rest:
+        sub, _, rest = rest.partition(":")
+        head = f"{head}:{sub}"
+    m = _EXC_TYPE_RE.match(rest)
+    if m:
+        head = f"{head}:{m.group(1)}"
+        rest = rest[m.end() :]
+    return head, (rest[:MAX_ERROR_MESSAGE_CHARS] or None)
+
+
+def _db_id(db_path: str) -> Optional[str]:
+    """The database's meta db_id, or None if it has none yet (read-only, no migration)."""
+    con = sqlite3.connect(Path(db_path).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        row = con.execute("SELECT value FROM meta WHERE key = 'db_id'").fetchone()
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        con.close()
+    return row[0] if row else None
+
 
 class Store:
     def __init__(self, db_path: str = "src/data/leads.sqlite"):
         Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-        self.conn = sqlite3.connect(db_path)
+        # Several analysis workers may share the file; wait on locks instead of failing.
+        self.conn = sqlite3.connect(db_path, timeout=30)
         self.conn.execute("PRAGMA foreign_keys=ON;")
+        self._autocommit = True
+        # Set by start_run; stamped on every crawl_log row written through this Store.
+        self.run_id: Optional[int] = None
         self.conn.executescript(SCHEMA)
+        self._migrate()
         self.conn.commit()
 
+    @classmethod
+    def open_readonly(cls, db_path: str) -> "Store":
+        """
+        Query-only handle on an existing database: no schema or migrations, writes fail.
+        Under WAL it reads the last committed state without waiting for the writer.
+        The connection may be used from any thread, one at a time.
+        """
+        store = cls.__new__(cls)
+        store.conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+        store.conn.execute("PRAGMA query_only=ON;")
+        store._autocommit = True
+        store.run_id = None
+        return store
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _migrate(self) -> None:
+        # Columns added after the first release; CREATE TABLE IF NOT EXISTS won't add them.
+        self._ensure_column("crawl_log", "attempts", "INTEGER")
+        self._ensure_column("discovered_urls", "canonical_key", "TEXT")
+        self._ensure_column("discovered_urls", "site_key", "TEXT")
+        self._ensure_column("work_queue", "site_key", "TEXT")
+        backfill_selected = self._ensure_column("discovered_urls", "selected_at", "TEXT")
+        self._ensure_column("crawl_log", "run_id", "INTEGER")
+        self._ensure_column("runs", "merged_from", "TEXT")
+        split_errors = self._ensure_column("crawl_log", "message_id", "INTEGER")
+        split_state_errors = self._ensure_column("url_fetch_state", "last_message_id", "INTEGER")
+        self.conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('db_id', ?)", (uuid.uuid4().hex,))
+        self.conn.executescript(
+            """
+            CREATE INDEX IF NOT EXISTS idx_discovered_canonical ON discovered_urls(canonical_key);
+            CREATE INDEX IF NOT EXISTS idx_discovered_site ON discovered_urls(site_key);
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_work_queue_site ON work_queue(site_key);
+            CREATE INDEX IF NOT EXISTS idx_discovered_unselected
+              ON discovered_urls(discovered_at) WHERE selected_at IS NULL;
+            CREATE INDEX IF NOT EXISTS idx_crawl_log_url ON crawl_log(url, id);
+            CREATE INDEX IF NOT EXISTS idx_crawl_log_run ON crawl_log(run_id);
+            CREATE INDEX IF NOT EXISTS idx_site_analysis_score ON site_analysis(score, analyzed_at);
+            CREATE INDEX IF NOT EXISTS idx_url_fetch_retry
+              ON url_fetch_state(retry_after) WHERE failures > 0;
+            -- Covering for the UI's filters (score range, HTTPS, stack) and both sort orders.
+            CREATE INDEX IF NOT EXISTS idx_leads_score ON leads(score, https, stack_hint);
+            CREATE INDEX IF NOT EXISTS idx_leads_discovered
+              ON leads(discovered_at, score, https, stack_hint);
+            """
+        )
+        self._backfill_url_keys()
+        if split_errors:
+            self._backfill_error_classes()
+        if split_state_errors:
+            self._backfill_fetch_state_errors()
+        self._backfill_fetch_state()
+        # Databases from before the leads table.
+        if not self.conn.execute("SELECT 1 FROM leads LIMIT 1").fetchone() and self.conn.execute(
+            "SELECT 1 FROM discovered_urls LIMIT 1"
+        ).fetchone():
+            self.rebuild_leads()
+        if backfill_selected:
+            self.conn.execute(
+                """
+                UPDATE discovered_urls SET selected_at = datetime('now')
+                WHERE site_key IN (SELECT site_key FROM work_queue)
+                   OR url IN (SELECT url FROM work_queue)
+                   OR url IN (SELECT url FROM url_fetch_state)
+                   OR url IN (SELECT url FROM site_analysis)
+                """
+            )
+
+    def _backfill_url_keys(self) -> None:
+        # Rows discovered before canonicalization existed.
+        rows = self.conn.execute(
+            "SELECT id, url FROM discovered_urls WHERE canonical_key IS NULL"
+        ).fetchall()
+        if rows:
+            self.conn.executemany(
+                "UPDATE discovered_urls SET canonical_key=?, site_key=? WHERE id=?",
+                [(canonical_key(url), site_key(url), id_) for id_, url in rows],
+            )
+
+    def _backfill_fetch_state(self) -> None:
+        # Databases from before url_fetch_state: derive it once from crawl_log.
+        if self.conn.execute("SELECT 1 FROM url_fetch_state LIMIT 1").fetchone():
+            return
+        self.conn.execute(
+            """
+            INSERT INTO url_fetch_state(
+              url, failures, last_status_code, last_error, last_message_id, last_fetched_at)
+            SELECT c.url,
+                   (SELECT COUNT(*) FROM crawl_log e
+                    WHERE e.url = c.url AND e.error IS NOT NULL
+                      AND e.id > COALESCE(
+                        (SELECT MAX(id) FROM crawl_log s WHERE s.url = c.url AND s.error IS NULL), 0)),
+                   c.status_code, c.error, c.message_id, c.fetched_at
+            FROM crawl_log c
+            WHERE c.id IN (SELECT MAX(id) FROM crawl_log GROUP BY url)
+            """
+        )
+        self.conn.execute(
+            f"""
+            UPDATE url_fetch_state
+            SET retry_after = {_RETRY_AFTER_SQL.format(ts="last_fetched_at", n="failures")}
+            WHERE failures > 0
+            """,
+            (FETCH_RETRY_MAX_BACKOFF_SECONDS, FETCH_RETRY_BACKOFF_SECONDS),
+        )
+
+    def _backfill_error_classes(self) -> None:
+        # crawl_log.error used to hold the whole "reason:Type:message" string.
+        rows = self.conn.execute(
+            "SELECT id, error FROM crawl_log WHERE error IS NOT NULL AND message_id IS NULL"
+        ).fetchall()
+        updates = []
+        for id_, error in rows:
+            error_class, message = split_error(error)
+            updates.append((error_class, self._message_id(message), id_))
+        self.conn.executemany("UPDATE crawl_log SET error=?, message_id=? WHERE id=?", updates)
+
+    def _backfill_fetch_state_errors(self) -> None:
+        # url_fetch_state.last_error used to hold the whole error string as well.
+        rows = self.conn.execute(
+            "SELECT url, last_error FROM url_fetch_state WHERE last_error IS NOT NULL"
+        ).fetchall()
+        updates = []
+        for url, error in rows:
+            error_class, message = split_error(error)
+            updates.append((error_class, self._message_id(message), url))
+        self.conn.executemany(
+            "UPDATE url_fetch_state SET last_error=?, last_message_id=? WHERE url=?", updates
+        )
+
+    def _ensure_column(self, table: str, column: str, decl: str) -> bool:
+        """Add the column if missing; True if it was added."""
+        cols = {r[1] for r in self.conn.execute(f"PRAGMA table_info({table})").fetchall()}
+        if column not in cols:
+            self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+            return True
+        return False
+
+    def _commit(self) -> None:
+        if self._autocommit:
+            self.conn.commit()
+
+    @contextmanager
+    def batch(self) -> Iterator["Store"]:
+        """
+        Group several writes into one transaction (one commit/fsync instead of many).
+        A nested batch joins the outer one, which commits or rolls back.
+        """
+        prev = self._autocommit
+        if not prev:
+            yield self
+            return
+        self._autocommit = False
+        try:
+            yield self
+        except Exception:
+            self.conn.rollback()
+            raise
+        else:
+            self.conn.commit()
+        finally:
+            self._autocommit = prev
+
+    # -------------------------
+    # Runs
+    # -------------------------
+    def start_run(self, command: str) -> int:
+        """Open a `runs` row; later log_fetch calls on this Store are tagged with it."""
+        cur = self.conn.execute("INSERT INTO runs(command) VALUES(?)", (command,))
+        self._commit()
+        self.run_id = cur.lastrowid
+        return self.run_id
+
+    def finish_run(self, run_id: int, status: str = "done") -> None:
+        self.conn.execute(
+            """
+            UPDATE runs SET
+              status=?,
+              finished_at=datetime('now'),
+              fetches=(SELECT COUNT(*) FROM crawl_log WHERE run_id = runs.id),
+              errors=(SELECT COUNT(*) FROM crawl_log WHERE run_id = runs.id AND error IS NOT NULL)
+            WHERE id=?
+            """,
+            (status, run_id),
+        )
+        if self.run_id == run_id:
+            self.run_id = None
+        self._commit()
+
     # -------------------------
     # Logging
     # -------------------------
+    def _message_id(self, message: Optional[str]) -> Optional[int]:
+        if message is None:
+            return None
+        self.conn.execute("INSERT OR IGNORE INTO error_messages(message) VALUES(?)", (message,))
+        return self.conn.execute(
+            "SELECT id FROM error_messages WHERE message = ?", (message,)
+        ).fetchone()[0]
+
     def log_fetch(
         self,
         url: str,
         status_code: Optional[int],
         final_url: Optional[str],
         error: Optional[str],
+        attempts: int = 1,
     ) -> None:
+        error_class, message = split_error(error) if error is not None else (None, None)
+        message_id = self._message_id(message)
         self.conn.execute(
-            "INSERT INTO crawl_log(url, status_code, final_url, error) VALUES (?,?,?,?)",
-            (url, status_code, final_url, error),
+            """
+            INSERT INTO crawl_log(url, status_code, final_url, error, message_id, attempts, run_id)
+            VALUES (?,?,?,?,?,?,?)
+            """,
+            (url, status_code, final_url, error_class, message_id, attempts, self.run_id),
         )
-        self.conn.commit()
+        self._mark_selected(url)
+        if error is None:
+            self.conn.execute(
+                """
+                INSERT INTO url_fetch_state(url, failures, last_status_code) VALUES(?, 0, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                  failures=0,
+                  last_status_code=excluded.last_status_code,
+                  last_error=NULL,
+                  last_message_id=NULL,
+                  last_fetched_at=datetime('now'),
+                  retry_after=NULL
+                """,
+                (url, status_code),
+            )
+        else:
+            self.conn.execute(
+                f"""
+                INSERT INTO url_fetch_state(
+                  url, failures, last_status_code, last_error, last_message_id, retry_after)
+                VALUES(?, 1, ?, ?, ?, datetime('now', ?))
+                ON CONFLICT(url) DO UPDATE SET
+                  failures=failures + 1,
+                  last_status_code=excluded.last_status_code,
+                  last_error=excluded.last_error,
+                  last_message_id=excluded.last_message_id,
+                  last_fetched_at=datetime('now'),
+                  retry_after={_RETRY_AFTER_SQL.format(ts="'now'", n="failures + 1")}
+                """,
+                (
+                    url,
+                    status_code,
+                    error_class,
+                    message_id,
+                    f"+{FETCH_RETRY_BACKOFF_SECONDS} seconds",
+                    FETCH_RETRY_MAX_BACKOFF_SECONDS,
+                    FETCH_RETRY_BACKOFF_SECONDS,
+                ),
+            )
+        self._commit()
 
     # -------------------------
-    # Discovery persistence
+    # Dead hosts (negative cache)
     # -------------------------
-    def upsert_discovered(self, url: str, discovered_from: Optional[str]) -> None:
+    def mark_host_dead(self, host: str, reason: str) -> None:
         self.conn.execute(
-            "INSERT OR IGNORE INTO discovered_urls(url, discovered_from) VALUES (?,?)",
-            (url, discovered_from),
+            """
+            INSERT INTO dead_hosts(host, reason, failures, retry_after)
+            VALUES(?, ?, 1, datetime('now', ?))
+            ON CONFLICT(host) DO UPDATE SET
+              reason=excluded.reason,
+              failures=failures + 1,
+              last_failed_at=datetime('now'),
+              retry_after=datetime('now', '+' || min(?, ? * (1 << min(failures, 20))) || ' seconds')
+            """,
+            (
+                host,
+                reason,
+                f"+{DEAD_HOST_BACKOFF_SECONDS} seconds",
+                DEAD_HOST_MAX_BACKOFF_SECONDS,
+                DEAD_HOST_BACKOFF_SECONDS,
+            ),
         )
-        self.conn.commit()
+        self._commit()
+
+    def clear_dead_host(self, host: str) -> None:
+        self.conn.execute("DELETE FROM dead_hosts WHERE host = ?", (host,))
+        self._commit()
+
+    def get_dead_hosts(self, include_expired: bool = False) -> set[str]:
+        if include_expired:
+            rows = self.conn.execute("SELECT host FROM dead_hosts").fetchall()
+        else:
+            rows = self.conn.execute(
+                "SELECT host FROM dead_hosts WHERE retry_after > datetime('now')"
+            ).fetchall()
+        return {r[0] for r in rows}
+
+    # -------------------------
+    # robots.txt cache
+    # -------------------------
+    def get_robots(self, origin: str) -> Optional[Tuple[int, str, float]]:
+        """(status_code, body, seconds until expiry) for an unexpired entry, else None."""
+        row = self.conn.execute(
+            """
+            SELECT status_code, body, (julianday(expires_at) - julianday('now')) * 86400
+            FROM robots_cache
+            WHERE origin = ? AND expires_at > datetime('now')
+            """,
+            (origin,),
+        ).fetchone()
+        return (row[0], row[1] or "", float(row[2])) if row else None
+
+    def put_robots(self, origin: str, status_code: int, body: str, ttl_seconds: int) -> None:
+        self.conn.execute(
+            """
+            INSERT INTO robots_cache(origin, status_code, body, expires_at)
+            VALUES(?, ?, ?, datetime('now', ?))
+            ON CONFLICT(origin) DO UPDATE SET
+              status_code=excluded.status_code,
+              body=excluded.body,
+              fetched_at=datetime('now'),
+              expires_at=excluded.expires_at
+            """,
+            (origin, status_code, body, f"{int(ttl_seconds):+d} seconds"),
+        )
+        self._commit()
+
+    # -------------------------
+    # Discovery persistence
+    # -------------------------
+    # URLs are stored normalized; a URL whose canonical_key is already known is a duplicate.
+    _INSERT_DISCOVERED = """
+        INSERT OR IGNORE INTO discovered_urls(url, discovered_from, canonical_key, site_key)
+        SELECT ?, ?, ?, ?
+        WHERE NOT EXISTS (SELECT 1 FROM discovered_urls WHERE canonical_key = ?)
+    """
+
+    @staticmethod
+    def _discovered_params(url: str, discovered_from: Optional[str]) -> tuple:
+        key = canonical_key(url)
+        return (normalize_url(url), discovered_from, key, site_key(url), key)
+
+    def upsert_discovered(self, url: str, discovered_from: Optional[str]) -> None:
+        self.conn.execute(self._INSERT_DISCOVERED, self._discovered_params(url, discovered_from))
+        self._commit()
 
     def bulk_upsert_discovered(self, rows: Iterable[Tuple[str, Optional[str]]]) -> None:
         self.conn.executemany(
-            "INSERT OR IGNORE INTO discovered_urls(url, discovered_from) VALUES (?,?)",
-            rows,
+            self._INSERT_DISCOVERED,
+            (self._discovered_params(url, discovered_from) for url, discovered_from in rows),
+        )
+        self._commit()
+
+    def has_discovered(self, url: str) -> bool:
+        """Exact membership by canonical key (the check behind crawler.seen.SeenUrls)."""
+        return (
+            self.conn.execute(
+                "SELECT 1 FROM discovered_urls WHERE canonical_key = ? LIMIT 1",
+                (canonical_key(url),),
+            ).fetchone()
+            is not None
         )
-        self.conn.commit()
 
     def get_discovered_urls(self, limit: int = 500) -> list[str]:
         rows = self.conn.execute(
@@ -100,6 +687,234 @@ class Store:
         ).fetchall()
         return [r[0] for r in rows]
 
+    # -------------------------
+    # Selection for (re-)analysis
+    # -------------------------
+    # Each tier walks an index in priority order (unselected discoveries by date, analyses
+    # by score, expired backoffs by retry time) and stops once `limit` sites were found.
+    _SELECT_NEW = """
+        SELECT d.url, d.site_key FROM discovered_urls d
+        WHERE d.selected_at IS NULL
+          AND NOT EXISTS (
+                SELECT 1 FROM work_queue w WHERE w.site_key = d.site_key OR w.url = d.url)
+          AND NOT EXISTS (SELECT 1 FROM url_fetch_state f WHERE f.url = d.url)
+          AND NOT EXISTS (SELECT 1 FROM site_analysis a WHERE a.url = d.url)
+          AND NOT EXISTS (
+                SELECT 1 FROM discovered_urls d2 JOIN site_analysis a ON a.url = d2.url
+                WHERE d2.site_key = d.site_key)
+        ORDER BY d.discovered_at DESC
+    """
+    _SELECT_STALE = """
+        SELECT a.url, d.site_key FROM site_analysis a
+        LEFT JOIN discovered_urls d ON d.url = a.url
+        WHERE a.analyzed_at < datetime('now', ?)
+          AND NOT EXISTS (
+                SELECT 1 FROM url_fetch_state f
+                WHERE f.url = a.url AND f.failures > 0 AND f.retry_after > datetime('now'))
+          AND NOT EXISTS (
+                SELECT 1 FROM work_queue w
+                WHERE (w.url = a.url OR w.site_key = d.site_key) AND w.state IN ('pending', 'leased'))
+        ORDER BY a.score, a.analyzed_at
+    """
+    _SELECT_RETRY = """
+        SELECT f.url, d.site_key FROM url_fetch_state f
+        LEFT JOIN discovered_urls d ON d.url = f.url
+        WHERE f.failures > 0 AND f.retry_after <= datetime('now')
+          AND NOT EXISTS (SELECT 1 FROM site_analysis a WHERE a.url = f.url)
+          AND NOT EXISTS (
+                SELECT 1 FROM work_queue w
+                WHERE (w.url = f.url OR w.site_key = d.site_key) AND w.state IN ('pending', 'leased'))
+        ORDER BY f.retry_after
+    """
+
+    def select_for_analysis(
+        self,
+        limit: Optional[int] = None,
+        stale_after_days: float = STALE_AFTER_DAYS,
+    ) -> list[AnalysisCandidate]:
+        """
+        URLs to analyze next, at most one per site, in priority order:
+
+          1. "new"   sites never fetched, analyzed or queued; newest discovery first,
+                     represented by their shortest (usually homepage) URL
+          2. "stale" analyses older than `stale_after_days`; lowest (best lead) score first
+          3. "retry" URLs that failed and whose backoff expired; longest overdue first
+
+        Sites already pending/leased in the work queue, or inside a failure backoff, are skipped.
+        """
+        out: list[AnalysisCandidate] = []
+        seen: set[str] = set()
+        tiers = (
+            ("new", self._SELECT_NEW, ()),
+            ("stale", self._SELECT_STALE, (f"-{float(stale_after_days) * 86400:.0f} seconds",)),
+            ("retry", self._SELECT_RETRY, ()),
+        )
+        for reason, sql, params in tiers:
+            for url, key in self.conn.execute(sql, params):
+                if limit is not None and len(out) >= limit:
+                    return out
+                if (key or url) in seen:
+                    continue
+                seen.add(key or url)
+                if reason == "new" and key is not None:
+                    url = self._site_representative(key) or url
+                out.append(AnalysisCandidate(url, key, reason))
+        return out
+
+    def _mark_selected(self, url: str) -> None:
+        # Marks every URL of the site, so none of them is walked by the "new" tier again.
+        self.conn.execute(
+            """
+            UPDATE discovered_urls SET selected_at = datetime('now')
+            WHERE selected_at IS NULL
+              AND (url = ? OR site_key = (SELECT site_key FROM discovered_urls WHERE url = ?))
+            """,
+            (url, url),
+        )
+
+    def _site_representative(self, key: str) -> Optional[str]:
+        row = self.conn.execute(
+            """
+            SELECT url FROM discovered_urls WHERE site_key = ?
+            ORDER BY length(canonical_key), id LIMIT 1
+            """,
+            (key,),
+        ).fetchone()
+        return row[0] if row else None
+
+    # -------------------------
+    # Work queue (multi-worker analysis)
+    # -------------------------
+    def enqueue_discovered(
+        self,
+        requeue_done: bool = False,
+        limit: Optional[int] = None,
+        stale_after_days: float = STALE_AFTER_DAYS,
+    ) -> int:
+        """
+        Queue the next sites to analyze (see select_for_analysis): new sites are added,
+        stale and retry candidates already in the queue go back to pending.
+        Returns the number of URLs queued.
+        """
+        candidates = self.select_for_analysis(limit, stale_after_days)
+        added = 0
+        for c in candidates:
+            if c.reason == "new":
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO work_queue(url, site_key) VALUES(?, ?)",
+                    (c.url, c.site_key),
+                )
+                self._mark_selected(c.url)
+            else:
+                cur = self.conn.execute(
+                    """
+                    UPDATE work_queue
+                    SET state='pending', worker_id=NULL, lease_expires_at=NULL,
+                        attempts=0, enqueued_at=datetime('now'), updated_at=datetime('now')
+                    WHERE (url = ? OR site_key = ?) AND state IN ('done', 'failed')
+                    """,
+                    (c.url, c.site_key),
+                )
+                if cur.rowcount == 0:
+                    cur = self.conn.execute(
+                        "INSERT OR IGNORE INTO work_queue(url, site_key) VALUES(?, ?)",
+                        (c.url, c.site_key),
+                    )
+            added += cur.rowcount
+        if requeue_done:
+            self.conn.execute(
+                """
+                UPDATE work_queue
+                SET state='pending', worker_id=NULL, lease_expires_at=NULL,
+                    attempts=0, updated_at=datetime('now')
+                WHERE state IN ('done', 'failed')
+                """
+            )
+        self._commit()
+        return added
+
+    def claim_batch(
+        self,
+        worker_id: str,
+        batch_size: int,
+        lease_seconds: int = 300,
+        max_attempts: int = 3,
+    ) -> list[str]:
+        """
+        Atomically lease up to `batch_size` URLs: pending ones, or leases that expired
+        (their worker died). URLs whose lease expired `max_attempts` times are marked failed.
+        """
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.execute(
+                """
+                UPDATE work_queue SET state='failed', updated_at=datetime('now')
+                WHERE state='leased' AND lease_expires_at < datetime('now') AND attempts >= ?
+                """,
+                (max_attempts,),
+            )
+            rows = self.conn.execute(
+                """
+                UPDATE work_queue
+                SET state='leased', worker_id=?, lease_expires_at=datetime('now', ?),
+                    attempts=attempts + 1, updated_at=datetime('now')
+                WHERE url IN (
+                  SELECT url FROM work_queue
+                  WHERE state='pending'
+                     OR (state='leased' AND lease_expires_at < datetime('now'))
+                  ORDER BY enqueued_at, rowid
+                  LIMIT ?
+                )
+                RETURNING url
+                """,
+                (worker_id, f"{int(lease_seconds):+d} seconds", batch_size),
+            ).fetchall()
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        return [r[0] for r in rows]
+
+    def heartbeat(self, worker_id: str, lease_seconds: int = 300) -> None:
+        """Extend every lease held by `worker_id`."""
+        self.conn.execute(
+            """
+            UPDATE work_queue SET lease_expires_at=datetime('now', ?), updated_at=datetime('now')
+            WHERE worker_id=? AND state='leased'
+            """,
+            (f"{int(lease_seconds):+d} seconds", worker_id),
+        )
+        self._commit()
+
+    def complete_work(self, url: str, worker_id: str, ok: bool) -> None:
+        # Only the current lease holder may complete the item.
+        self.conn.execute(
+            """
+            UPDATE work_queue SET state=?, lease_expires_at=NULL, updated_at=datetime('now')
+            WHERE url=? AND worker_id=? AND state='leased'
+            """,
+            ("done" if ok else "failed", url, worker_id),
+        )
+        self._commit()
+
+    def is_site_analyzed(self, site_key: str) -> bool:
+        return (
+            self.conn.execute(
+                """
+                SELECT 1 FROM discovered_urls d
+                JOIN site_analysis a ON a.url = d.url
+                WHERE d.site_key = ?
+                LIMIT 1
+                """,
+                (site_key,),
+            ).fetchone()
+            is not None
+        )
+
+    def queue_counts(self) -> dict[str, int]:
+        rows = self.conn.execute("SELECT state, COUNT(*) FROM work_queue GROUP BY state").fetchall()
+        return {state: n for state, n in rows}
+
     # -------------------------
     # Analysis persistence
     # -------------------------
@@ -112,9 +927,9 @@ class Store:
         https: bool,
         title: Optional[str],
         has_viewport: bool,
-        has_email: bool,
-        has_phone: bool,
-        has_address: bool,
+        has_email: Optional[bool],
+        has_phone: Optional[bool],
+        has_address: Optional[bool],
         stack_hint: Optional[str],
         score: int,
         reasons: list[str],
@@ -147,12 +962,324 @@ class Store:
                 1 if https else 0,
                 title,
                 1 if has_viewport else 0,
-                1 if has_email else 0,
-                1 if has_phone else 0,
-                1 if has_address else 0,
+                _flag(has_email),
+                _flag(has_phone),
+                _flag(has_address),
                 stack_hint,
                 int(score),
                 json.dumps(reasons, ensure_ascii=False),
             ),
         )
-        self.conn.commit()
\ No newline at end of file
+        self._commit()
+
+    # -------------------------
+    # Leads
+    # -------------------------
+    def rebuild_leads(self) -> int:
+        """Recompute the leads table from discovered_urls, site_analysis and llm_insights."""
+        self.conn.execute("DELETE FROM leads")
+        n = self.conn.execute(
+            """
+            INSERT INTO leads(id, analysis_id, llm_id, score, https, has_viewport_meta, stack_hint, discovered_at)
+            SELECT d.id, a.id, l.rowid, a.score, a.https, a.has_viewport_meta, a.stack_hint, d.discovered_at
+            FROM discovered_urls d
+            LEFT JOIN site_analysis a ON a.url = d.url
+            LEFT JOIN llm_insights l ON l.url = d.url
+            """
+        ).rowcount
+        self._commit()
+        return n
+
+    # -------------------------
+    # Retention
+    # -------------------------
+    def _file_bytes(self) -> int:
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        return self.conn.execute("PRAGMA page_count").fetchone()[0] * page_size
+
+    def compact(self, keep_days: float = KEEP_LOG_DAYS, keep_runs: int = KEEP_RUNS) -> CompactionResult:
+        """
+        Roll the crawl_log rows of old runs up into crawl_summary (one row per URL),
+        delete them and their unreferenced error messages, then give the freed pages
+        back to the file system. Runs finished within `keep_days`, the latest
+        `keep_runs` runs and runs that have not finished keep their detail rows.
+        """
+        bytes_before = self._file_bytes()
+        cutoff = f"-{float(keep_days) * 86400:.0f} seconds"
+        with self.batch():
+            self.conn.execute("DROP TABLE IF EXISTS temp.compact_runs")
+            self.conn.execute(
+                """
+                CREATE TEMP TABLE compact_runs AS
+                SELECT id FROM runs
+                WHERE compacted_at IS NULL
+                  AND finished_at < datetime('now', ?)
+                  AND id NOT IN (SELECT id FROM runs ORDER BY id DESC LIMIT ?)
+                """,
+                (cutoff, keep_runs),
+            )
+            # Rows from before the runs table have no run id; they go by age alone.
+            where = """
+                (run_id IN (SELECT id FROM temp.compact_runs)
+                 OR (run_id IS NULL AND fetched_at < datetime('now', ?)))
+            """
+            urls = self.conn.execute(
+                f"""
+                INSERT INTO crawl_summary(
+                  url, fetches, errors, first_fetched_at, last_fetched_at, last_status_code, last_error
+                )
+                SELECT g.url, g.n, g.e, g.first, c.fetched_at, c.status_code, c.error
+                FROM (SELECT url, COUNT(*) AS n, COUNT(error) AS e, MIN(fetched_at) AS first,
+                             MAX(id) AS last_id
+                      FROM crawl_log WHERE {where} GROUP BY url) g
+                JOIN crawl_log c ON c.id = g.last_id
+                WHERE 1
+                ON CONFLICT(url) DO UPDATE SET
+                  fetches=fetches + excluded.fetches,
+                  errors=errors + excluded.errors,
+                  first_fetched_at=min(first_fetched_at, excluded.first_fetched_at),
+                  last_fetched_at=max(last_fetched_at, excluded.last_fetched_at),
+                  last_status_code=CASE WHEN excluded.last_fetched_at >= last_fetched_at
+                                        THEN excluded.last_status_code ELSE last_status_code END,
+                  last_error=CASE WHEN excluded.last_fetched_at >= last_fetched_at
+                                  THEN excluded.last_error ELSE last_error END
+                """,
+                (cutoff,),
+            ).rowcount
+            rows = self.conn.execute(f"DELETE FROM crawl_log WHERE {where}", (cutoff,)).rowcount
+            self.conn.execute(
+                """
+                DELETE FROM error_messages
+                WHERE id NOT IN (SELECT message_id FROM crawl_log WHERE message_id IS NOT NULL)
+                  AND id NOT IN (SELECT last_message_id FROM url_fetch_state WHERE last_message_id IS NOT NULL)
+                """
+            )
+            runs = self.conn.execute(
+                """
+                UPDATE runs SET compacted_at=datetime('now')
+                WHERE id IN (SELECT id FROM temp.compact_runs)
+                """
+            ).rowcount
+            self.conn.execute("DROP TABLE temp.compact_runs")
+        self.vacuum()
+        return CompactionResult(runs, rows, urls, bytes_before, self._file_bytes())
+
+    def vacuum(self) -> None:
+        """Release free pages. The first call on an older database rebuilds it once."""
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            # executescript steps it to completion; execute() frees a single page.
+            self.conn.executescript("PRAGMA incremental_vacuum;")
+        else:
+            # auto_vacuum can only be switched on by a full VACUUM.
+            self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            self.conn.execute("VACUUM")
+        self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    # -------------------------
+    # Shards
+    # -------------------------
+    # Each statement copies one table from the attached shard in bulk. Rows that exist on
+    # both sides are resolved by timestamp: the later analysis / fetch / failure wins.
+    # The main row a shard URL `d` ended up as: itself, or the row that already held its
+    # canonical key (the shard's row was then not inserted). Analyses and insights are
+    # moved onto it, so none is left without its discovered_urls row.
+    _MAIN_URL_ID = """
+        COALESCE((SELECT id FROM main.discovered_urls WHERE url = d.url),
+                 (SELECT MIN(id) FROM main.discovered_urls WHERE canonical_key = d.canonical_key))
+    """
+
+    _MERGE = (
+        (
+            "discovered_urls",
+            """
+            INSERT OR IGNORE INTO main.discovered_urls(
+              url, discovered_from, discovered_at, canonical_key, site_key, selected_at)
+            SELECT d.url, d.discovered_from, d.discovered_at, d.canonical_key, d.site_key, d.selected_at
+            FROM shard.discovered_urls d
+            WHERE NOT EXISTS (
+              SELECT 1 FROM main.discovered_urls m WHERE m.canonical_key = d.canonical_key)
+            """,
+        ),
+        (
+            "site_analysis",
+            f"""
+            INSERT INTO main.site_analysis(
+              url, final_url, status_code, https, title, has_viewport_meta,
+              has_email, has_phone, has_address, stack_hint, score, reasons_json, analyzed_at)
+            SELECT u.url, s.final_url, s.status_code, s.https, s.title, s.has_viewport_meta,
+                   s.has_email, s.has_phone, s.has_address, s.stack_hint, s.score, s.reasons_json,
+                   s.analyzed_at
+            FROM shard.site_analysis s
+            JOIN shard.discovered_urls d ON d.url = s.url
+            JOIN main.discovered_urls u ON u.id = ({_MAIN_URL_ID})
+            WHERE 1
+            ON CONFLICT(url) DO UPDATE SET
+              final_url=excluded.final_url,
+              status_code=excluded.status_code,
+              https=excluded.https,
+              title=excluded.title,
+              has_viewport_meta=excluded.has_viewport_meta,
+              has_email=excluded.has_email,
+              has_phone=excluded.has_phone,
+              has_address=excluded.has_address,
+              stack_hint=excluded.stack_hint,
+              score=excluded.score,
+              reasons_json=excluded.reasons_json,
+              analyzed_at=excluded.analyzed_at
+            WHERE excluded.analyzed_at > site_analysis.analyzed_at
+            """,
+        ),
+        # Message ids differ between databases; rows referencing them join on the text.
+        (
+            "error_messages",
+            "INSERT OR IGNORE INTO main.error_messages(message) SELECT message FROM shard.error_messages",
+        ),
+        (
+            "url_fetch_state",
+            """
+            INSERT INTO main.url_fetch_state(
+              url, failures, last_status_code, last_error, last_message_id, last_fetched_at, retry_after)
+            SELECT f.url, f.failures, f.last_status_code, f.last_error, m.id, f.last_fetched_at, f.retry_after
+            FROM shard.url_fetch_state f
+            LEFT JOIN shard.error_messages e ON e.id = f.last_message_id
+            LEFT JOIN main.error_messages m ON m.message = e.message
+            WHERE 1
+            ON CONFLICT(url) DO UPDATE SET
+              failures=excluded.failures,
+              last_status_code=excluded.last_status_code,
+              last_error=excluded.last_error,
+              last_message_id=excluded.last_message_id,
+              last_fetched_at=excluded.last_fetched_at,
+              retry_after=excluded.retry_after
+            WHERE excluded.last_fetched_at > url_fetch_state.last_fetched_at
+            """,
+        ),
+        (
+            "dead_hosts",
+            """
+            INSERT INTO main.dead_hosts(host, reason, failures, first_failed_at, last_failed_at, retry_after)
+            SELECT host, reason, failures, first_failed_at, last_failed_at, retry_after
+            FROM shard.dead_hosts WHERE 1
+            ON CONFLICT(host) DO UPDATE SET
+              reason=excluded.reason,
+              failures=excluded.failures,
+              first_failed_at=min(dead_hosts.first_failed_at, excluded.first_failed_at),
+              last_failed_at=excluded.last_failed_at,
+              retry_after=excluded.retry_after
+            WHERE excluded.last_failed_at > dead_hosts.last_failed_at
+            """,
+        ),
+        (
+            "robots_cache",
+            """
+            INSERT INTO main.robots_cache(origin, status_code, body, fetched_at, expires_at)
+            SELECT origin, status_code, body, fetched_at, expires_at FROM shard.robots_cache WHERE 1
+            ON CONFLICT(origin) DO UPDATE SET
+              status_code=excluded.status_code,
+              body=excluded.body,
+              fetched_at=excluded.fetched_at,
+              expires_at=excluded.expires_at
+            WHERE excluded.fetched_at > robots_cache.fetched_at
+            """,
+        ),
+        (
+            "llm_insights",
+            f"""
+            INSERT INTO main.llm_insights(url, bullets_json, email_opener, model, generated_at)
+            SELECT u.url, i.bullets_json, i.email_opener, i.model, i.generated_at
+            FROM shard.llm_insights i
+            JOIN shard.discovered_urls d ON d.url = i.url
+            JOIN main.discovered_urls u ON u.id = ({_MAIN_URL_ID})
+            WHERE 1
+            ON CONFLICT(url) DO UPDATE SET
+              bullets_json=excluded.bullets_json,
+              email_opener=excluded.email_opener,
+              model=excluded.model,
+              generated_at=excluded.generated_at
+            WHERE excluded.generated_at > llm_insights.generated_at
+            """,
+        ),
+        (
+            "crawl_summary",
+            """
+            INSERT INTO main.crawl_summary(
+              url, fetches, errors, first_fetched_at, last_fetched_at, last_status_code, last_error)
+            SELECT url, fetches, errors, first_fetched_at, last_fetched_at, last_status_code, last_error
+            FROM shard.crawl_summary WHERE 1
+            ON CONFLICT(url) DO UPDATE SET
+              fetches=fetches + excluded.fetches,
+              errors=errors + excluded.errors,
+              first_fetched_at=min(first_fetched_at, excluded.first_fetched_at),
+              last_fetched_at=max(last_fetched_at, excluded.last_fetched_at),
+              last_status_code=CASE WHEN excluded.last_fetched_at >= last_fetched_at
+                                    THEN excluded.last_status_code ELSE last_status_code END,
+              last_error=CASE WHEN excluded.last_fetched_at >= last_fetched_at
+                              THEN excluded.last_error ELSE last_error END
+            """,
+        ),
+        # Run ids are renumbered after the main database's; crawl_log follows the mapping.
+        (
+            "runs",
+            """
+            INSERT INTO main.runs(
+              id, command, status, started_at, finished_at, fetches, errors, compacted_at, merged_from)
+            SELECT id + ?, command, status, started_at, finished_at, fetches, errors, compacted_at, ?
+            FROM shard.runs
+            ORDER BY id
+            """,
+        ),
+        (
+            "crawl_log",
+            """
+            INSERT INTO main.crawl_log(
+              url, status_code, final_url, error, attempts, fetched_at, run_id, message_id)
+            SELECT c.url, c.status_code, c.final_url, c.error, c.attempts, c.fetched_at,
+                   c.run_id + ?, m.id
+            FROM shard.crawl_log c
+            LEFT JOIN shard.error_messages e ON e.id = c.message_id
+            LEFT JOIN main.error_messages m ON m.message = e.message
+            ORDER BY c.id
+            """,
+        ),
+    )
+
+    def merge_shard(self, shard_path: str) -> MergeResult:
+        """
+        Merge a shard database (written by `crawler discover|run --shard`) into this one
+        with one INSERT ... SELECT per table, in a single transaction. A shard merged
+        before (by db_id, so also when copied or renamed) is skipped.
+        """
+        shard_path = str(shard_path)
+        name = Path(shard_path).name
+        # Shards written before db ids existed can only be recognized by file name.
+        legacy = _db_id(shard_path) is None
+
+        # Bring the shard's schema up to date so every column read below exists.
+        Store(shard_path).close()
+
+        self.conn.execute("ATTACH DATABASE ? AS shard", (shard_path,))
+        try:
+            rows: dict[str, int] = {}
+            with self.batch():
+                shard_id = self.conn.execute("SELECT value FROM shard.meta WHERE key = 'db_id'").fetchone()[0]
+                own_id = self.conn.execute("SELECT value FROM main.meta WHERE key = 'db_id'").fetchone()[0]
+                if self.conn.execute("SELECT 1 FROM merged_shards WHERE shard_id = ?", (shard_id,)).fetchone():
+                    return MergeResult(name, {}, skipped=True, recorded=True)
+                if (
+                    shard_id == own_id
+                    or legacy
+                    and self.conn.execute("SELECT 1 FROM runs WHERE merged_from = ? LIMIT 1", (name,)).fetchone()
+                ):
+                    return MergeResult(name, {}, skipped=True)
+                self.conn.execute("INSERT INTO merged_shards(shard_id, name) VALUES(?, ?)", (shard_id, name))
+                run_offset = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM main.runs").fetchone()[0]
+                for table, sql in self._MERGE:
+                    params: tuple = ()
+                    if table == "runs":
+                        params = (run_offset, name)
+                    elif table == "crawl_log":
+                        params = (run_offset,)
+                    rows[table] = self.conn.execute(sql, params).rowcount
+        finally:
+            self.conn.execute("DETACH DATABASE shard")
+        return MergeResult(name, rows, recorded=True)
@@ -0,0 +1,103 @@
+"""
+URL canonicalization.
+
+Directories link the same business site in many spellings (`http://x.at`,
+`https://www.x.at/`, `https://x.at/?utm_source=herold`, `https://x.at/index.html`).
+We keep three views of a URL:
+
+- normalize_url:  still fetchable; lowercased scheme/host, no default port, fragment,
+                  tracking params or index file, sorted query
+- canonical_key:  identity of a page; additionally ignores scheme, `www.` and trailing slash
+- site_key:       registrable domain; analysis is scheduled once per site
+"""
+
+from __future__ import annotations
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import tldextract
+
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+TRACKING_PARAMS = {
+    "gclid",
+    "dclid",
+    "fbclid",
+    "msclkid",
+    "yclid",
+    "igshid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "ref",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+INDEX_FILES = {"index.html", "index.htm", "index.php", "default.htm", "default.html", "default.aspx"}
+
+# Private PSL entries (wixsite.com, jimdosite.com, ...) make each hosted site its own key.
+_site_extract = tldextract.TLDExtract(include_psl_private_domains=True)
+
+
+def _is_tracking_param(name: str) -> bool:
+    n = name.lower()
+    return n in TRACKING_PARAMS or n.startswith(TRACKING_PREFIXES)
+
+
+def registrable_domain(url: str) -> str:
+    ext = tldextract.extract(url)
+    if not ext.domain:
+        return ""
+    return ".".join(p for p in [ext.domain, ext.suffix] if p)
+
+
+def normalize_url(url: str) -> str:
+    url = url.strip()
+    try:
+        p = urlsplit(url)
+        port = p.port
+    except ValueError:
+        return url
+
+    scheme = p.scheme.lower()
+    host = (p.hostname or "").rstrip(".")
+    if not host:
+        return url
+    if ":" in host:  # IPv6 literal
+        host = f"[{host}]"
+
+    netloc = host if port is None or DEFAULT_PORTS.get(scheme) == port else f"{host}:{port}"
+
+    path = p.path or "/"
+    last = path.rsplit("/", 1)[-1]
+    if last.lower() in INDEX_FILES:
+        path = path[: -len(last)]
+
+    query = urlencode(
+        sorted(
+            (k, v)
+            for k, v in parse_qsl(p.query, keep_blank_values=True)
+            if not _is_tracking_param(k)
+        )
+    )
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+def canonical_key(url: str) -> str:
+    p = urlsplit(normalize_url(url))
+    netloc = p.netloc.lower()
+    if netloc.startswith("www."):
+        netloc = netloc[4:]
+    path = p.path.rstrip("/") or "/"
+    return f"{netloc}{path}" + (f"?{p.query}" if p.query else "")
+
+
+def site_key(url: str) -> str:
+    ext = _site_extract(url)
+    if not ext.domain:
+        # IPs and intranet names: fall back to the bare host
+        host = urlsplit(url).hostname or ""
+        return host[4:] if host.startswith("www.") else host
+    return ".".join(p for p in [ext.domain, ext.suffix] if p)
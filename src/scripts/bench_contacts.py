@@ -0,0 +1,100 @@
+"""
+Contact-extraction benchmark on pathological pages.
+
+Generates pages that used to make the contact regexes crawl (long digit runs, huge
+base64 images, giant inline JSON, letter runs with a stray `@`, an unclosed <script>)
+or html.parser crawl (runs of unfinished tags, comments or bare `<`), times
+`extract_contact_presence` on each, and exits non-zero if any page exceeds the time
+budget. Parsing stops after PARSE_BUDGET_SECONDS, so the default budget allows that
+plus the regexes. The legacy raw-HTML scan is timed on smaller copies of the same pages
+because some of them are quadratic for it.
+
+    python src/scripts/bench_contacts.py [--size 2000000] [--legacy-size 50000] [--budget-ms 1500]
+"""
+
+from __future__ import annotations
+
+import argparse
+import base64
+import json
+import re
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1]
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from crawler.analyze import extract_contact_presence  # noqa: E402
+
+# The patterns extract_contact_presence used before, run over the raw HTML.
+LEGACY_EMAIL_RE = re.compile(r"\b[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}\b", re.I)
+LEGACY_PHONE_RE = re.compile(r"(\+?\d[\d\s()./-]{6,}\d)")
+
+
+def _page(body: str, head: str = "") -> str:
+    return f"<!doctype html><html><head><title>x</title>{head}</head><body>{body}</body></html>"
+
+
+def pathological_pages(size: int) -> dict[str, str]:
+    blob = base64.b64encode(bytes(range(256)) * (size // 342 + 1)).decode()[: size]
+    state = json.dumps({"items": [{"id": i, "sku": "0" * 12, "name": "a" * 20} for i in range(size // 60)]})
+    return {
+        "digit_run": _page("1" * size),
+        "digits_and_separators": _page("1 2-3 " * (size // 6) + "x"),
+        "base64_image": _page(f'<img src="data:image/png;base64,{blob}">'),
+        "inline_json": _page("<p>Kontakt</p>", head=f"<script>window.__STATE__={state}</script>"),
+        "letter_run_at": _page("a" * size + "@" + "b" * 1000),
+        "dots_after_at": _page("x@" + "a." * (size // 2)),
+        "unclosed_script": _page("<script>var s = '" + "9" * size),
+        # html.parser re-scans an unfinished tag or comment once per "<" in it
+        "open_tags": _page("<a" * (size // 2)),
+        "open_tags_spaced": _page("<a " * (size // 3)),
+        "bare_lt": _page("<" * size),
+        "open_comment": _page("<!--" * (size // 4)),
+        "normal": _page(
+            '<p>Musterstraße 1, 1070 Wien</p><a href="tel:+4312345678">Anrufen</a>'
+            '<a href="mailto:office@example.at">office@example.at</a>' * 50
+        ),
+    }
+
+
+def _time_ms(fn, html: str) -> float:
+    t0 = time.perf_counter()
+    fn(html)
+    return (time.perf_counter() - t0) * 1000
+
+
+def _legacy(html: str) -> tuple[bool, bool]:
+    return bool(LEGACY_EMAIL_RE.search(html)), bool(LEGACY_PHONE_RE.search(html))
+
+
+def main(argv: list[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size", type=int, default=2_000_000, help="approximate payload size per page (chars)")
+    ap.add_argument("--budget-ms", type=float, default=1500.0, help="max time per page for the new extractor")
+    ap.add_argument("--legacy-size", type=int, default=50_000, help="payload size for the legacy patterns (0 = skip)")
+    args = ap.parse_args(argv)
+
+    small = pathological_pages(args.legacy_size) if args.legacy_size else {}
+    over = []
+    legacy_col = f"legacy@{args.legacy_size}" if small else "legacy"
+    print(f"{'page':<24} {'chars':>10} {legacy_col + ' ms':>16} {'new ms':>8}  result")
+    for name, html in pathological_pages(args.size).items():
+        legacy = f"{_time_ms(_legacy, small[name]):.1f}" if small else "-"
+        new = _time_ms(extract_contact_presence, html)
+        result = extract_contact_presence(html)
+        print(f"{name:<24} {len(html):>10} {legacy:>16} {new:>8.1f}  {result}")
+        if new > args.budget_ms:
+            over.append(name)
+
+    if over:
+        print(f"Over budget ({args.budget_ms:.0f} ms): {', '.join(over)}")
+        return 1
+    print(f"All pages within {args.budget_ms:.0f} ms.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
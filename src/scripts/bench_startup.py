@@ -0,0 +1,89 @@
+"""
+Startup-time benchmark for the `crawler` CLI.
+
+Runs light subcommands in fresh interpreters and reports wall time, plus which heavy
+dependencies each one imported. Light commands should stay well under 100 ms and must
+not import httpx / bs4 / tldextract / yaml.
+
+    python src/scripts/bench_startup.py [--runs 15]
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1]
+HEAVY = ("httpx", "bs4", "tldextract", "yaml")
+
+PROBE = (
+    "import sys, contextlib, io\n"
+    "from crawler.cli import main\n"
+    "with contextlib.redirect_stdout(io.StringIO()):\n"
+    "    try:\n"
+    "        main(sys.argv[1:])\n"
+    "    except SystemExit:\n"
+    "        pass\n"
+    f"print(','.join(m for m in {HEAVY!r} if m in sys.modules))\n"
+)
+
+
+def _time(argv: list[str], env: dict) -> tuple[float, str]:
+    t0 = time.perf_counter()
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE, *argv], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return (time.perf_counter() - t0) * 1000, out.strip().splitlines()[-1] if out.strip() else ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=15)
+    args = parser.parse_args()
+
+    tmp = Path(tempfile.mkdtemp())
+    db = tmp / "bench.sqlite"
+    con = sqlite3.connect(db)
+    con.executescript(
+        """
+        CREATE TABLE discovered_urls (url TEXT, discovered_from TEXT, discovered_at TEXT);
+        CREATE TABLE site_analysis (url TEXT, score INTEGER, stack_hint TEXT);
+        CREATE TABLE crawl_log (url TEXT, error TEXT);
+        """
+    )
+    con.close()
+
+    env = dict(os.environ, PYTHONPATH=str(SRC) + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    cases = {
+        "python (baseline)": None,
+        "crawler --help": ["--help"],
+        "crawler report": ["report", "--db", str(db)],
+        "crawler export": ["export", "--db", str(db), "--out", str(tmp / "out.csv")],
+    }
+
+    print(f"{'command':<22} {'median':>9} {'p90':>9}  heavy imports")
+    for name, argv in cases.items():
+        samples: list[float] = []
+        heavy = ""
+        for _ in range(args.runs):
+            if argv is None:
+                t0 = time.perf_counter()
+                subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+                samples.append((time.perf_counter() - t0) * 1000)
+            else:
+                ms, heavy = _time(argv, env)
+                samples.append(ms)
+        samples.sort()
+        p90 = samples[int(0.9 * (len(samples) - 1))]
+        print(f"{name:<22} {statistics.median(samples):>7.1f}ms {p90:>7.1f}ms  {heavy or '-'}")
+
+
+if __name__ == "__main__":
+    main()
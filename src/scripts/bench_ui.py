@@ -0,0 +1,142 @@
+"""
+UI query benchmark against a (large) leads database.
+
+Times the code paths the Streamlit pages run, through `ui.queries`: the Home page's
+slider bounds and stack options, count + first page (and a deep page) per sidebar
+filter, the Details page lookup for random URLs (with a new connection per call, and on
+the shared read connection the page keeps), `crawler report` and `crawler export`. Use `gen_leads_db.py` for databases at 100k / 1M / 10M leads.
+
+    python src/scripts/bench_ui.py --db /tmp/leads-1m.sqlite [--runs 5] [--lookups 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Callable
+
+SRC = Path(__file__).resolve().parents[1]
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from crawler import report  # noqa: E402
+from crawler.export import export_discovered  # noqa: E402
+from crawler.store import Store  # noqa: E402
+from ui.queries import (  # noqa: E402
+    LeadFilters,
+    ReadConnection,
+    count_leads,
+    lead_details,
+    lead_page,
+    score_stats,
+    stack_options,
+)
+
+PAGE_SIZE = 50
+
+
+def _timed(fn: Callable[[], object], runs: int) -> list[float]:
+    samples = []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000)
+    return sorted(samples)
+
+
+def _row(name: str, samples: list[float], note: str = "") -> None:
+    p90 = samples[round(0.9 * (len(samples) - 1))]
+    print(f"{name:<28} {statistics.median(samples):>10.2f}ms {p90:>10.2f}ms  {note}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", type=Path, required=True)
+    parser.add_argument("--runs", type=int, default=5, help="repetitions per query / report / export")
+    parser.add_argument("--lookups", type=int, default=200, help="random Details lookups")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    # Adds the leads table to databases from an older crawler (the UI never migrates).
+    Store(str(args.db)).close()
+    con = sqlite3.connect(args.db)
+    leads = con.execute("SELECT COUNT(*) FROM discovered_urls").fetchone()[0]
+    print(f"{args.db}: {leads:,d} leads, {args.db.stat().st_size / 1e6:.1f} MB")
+    print(f"{'case':<28} {'median':>12} {'p90':>12}")
+
+    stats = []
+    _row("score_stats", _timed(lambda: stats.append(score_stats(con)), args.runs))
+    if not stats[-1]:
+        print("no analyzed leads")
+        return
+    score_range = (stats[-1].lo, stats[-1].median)
+    stacks = []
+    _row("stack_options", _timed(lambda: stacks.append(stack_options(con, score_range)), args.runs))
+
+    # As the Home page queries them: the slider's default range plus one more filter.
+    base = LeadFilters(score_range=score_range)
+    cases = {
+        "defaults": base,
+        "stack": replace(base, stacks=tuple(stacks[-1][:1])),
+        "HTTP only": replace(base, https="HTTP only"),
+        "search": replace(base, search="tischlerei"),
+        "sort best first": replace(base, sort_by="score (best first)"),
+        "sort by date": replace(base, sort_by="discovered_at"),
+        "all leads by date": LeadFilters(analyzed_only=False, sort_by="discovered_at"),
+    }
+    for name, f in cases.items():
+        counts = []
+        _row(f"count: {name}", _timed(lambda: counts.append(count_leads(con, f)), args.runs), f"{counts[-1]:,d} rows")
+        _row("  first page", _timed(lambda: lead_page(con, f, PAGE_SIZE), args.runs))
+        deep = max(0, counts[-1] // 2 // PAGE_SIZE * PAGE_SIZE)
+        _row("  middle page", _timed(lambda: lead_page(con, f, PAGE_SIZE, deep), args.runs), f"offset {deep:,d}")
+
+    rng = random.Random(args.seed)
+    max_id = con.execute("SELECT MAX(id) FROM discovered_urls").fetchone()[0] or 0
+    urls = []
+    for _ in range(args.lookups if max_id else 0):
+        row = con.execute("SELECT url FROM discovered_urls WHERE id >= ? LIMIT 1", (rng.randint(1, max_id),)).fetchone()
+        if row:
+            urls.append(row[0])
+    if urls:
+        it = iter(urls)
+        _row("lead_details", _timed(lambda: lead_details(con, next(it)), len(urls)), f"{len(urls)} random URLs")
+
+        def fresh_connection(url: str) -> None:
+            c = sqlite3.connect(args.db)
+            lead_details(c, url)
+            c.close()
+
+        it = iter(urls)
+        _row("  new connection per call", _timed(lambda: fresh_connection(next(it)), len(urls)))
+
+        # What the Details page does per render: change token + lookup on the shared connection.
+        shared = ReadConnection(str(args.db))
+        it = iter(urls)
+        samples = _timed(lambda: (shared.change_token(), shared.call(lead_details, next(it))), len(urls))
+        _row("  shared read connection", samples)
+        shared.con.close()
+    con.close()
+
+    def run_report() -> None:
+        with contextlib.redirect_stdout(io.StringIO()):
+            report.main(args.db)
+
+    _row("crawler report", _timed(run_report, args.runs))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = Path(tmp) / "discovered.csv"
+        _row("crawler export", _timed(lambda: export_discovered(args.db, out), args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,13 @@
-import csv
-import sqlite3
+import sys
 from pathlib import Path
 
-DB = "src/data/leads.sqlite"
-OUT = "src/data/discovered.csv"
-
-Path("src/data").mkdir(exist_ok=True)
+# Allow running as a plain script from a checkout: make src/ importable.
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-con = sqlite3.connect(DB)
-rows = con.execute(
-    "select url, discovered_from, discovered_at from discovered_urls order by discovered_at desc"
-).fetchall()
+from crawler.export import export_discovered  # noqa: E402
 
-with open(OUT, "w", newline="", encoding="utf-8") as f:
-    w = csv.writer(f)
-    w.writerow(["url", "discovered_from", "discovered_at"])
-    w.writerows(rows)
+DB = "src/data/leads.sqlite"
+OUT = "src/data/discovered.csv"
 
-print(f"Wrote {len(rows)} rows to {OUT}")
+n = export_discovered(Path(DB), Path(OUT))
+print(f"Wrote {n} rows to {OUT}")
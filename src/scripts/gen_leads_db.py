@@ -0,0 +1,298 @@
+"""
+Synthetic leads database at a chosen scale, for UI / schema benchmarks.
+
+Fills discovered_urls, site_analysis, crawl_log (with runs and error_messages),
+url_fetch_state and llm_insights with plausible Austrian small-business leads. Rows are
+generated inside SQLite (one recursive-CTE `INSERT ... SELECT` per table), so a million
+leads take about a minute. Store's triggers fill the `leads` table as rows go in.
+Scores and reasons come from the real `score_site`, so every row is one the crawler
+could have written. The same --seed gives the same database.
+
+    python src/scripts/gen_leads_db.py --leads 1000000 --out /tmp/leads-1m.sqlite
+    python src/scripts/bench_ui.py --db /tmp/leads-1m.sqlite
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+SRC = Path(__file__).resolve().parents[1]
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
+
+from crawler.score import score_site  # noqa: E402
+from crawler.store import Store  # noqa: E402
+
+TRADES = [
+    "tischlerei", "installateur", "elektro", "friseur", "baeckerei", "malerei",
+    "dachdecker", "gaertnerei", "fliesenleger", "schlosserei", "zahnarzt", "fahrschule",
+]
+CITIES = [
+    "wien", "graz", "linz", "salzburg", "innsbruck", "klagenfurt",
+    "villach", "wels", "st-poelten", "dornbirn", "steyr", "leoben",
+]
+NAMES = [
+    "huber", "gruber", "wagner", "bauer", "mayer", "pichler", "moser", "steiner",
+    "hofer", "berger", "eder", "fuchs", "leitner", "schwarz", "winkler", "weber",
+]
+# (stack_hint, share in percent); None = no generator detected
+STACKS = [(None, 45), ("wordpress", 30), ("joomla", 8), ("wix", 7), ("jimdo", 6), ("typo3", 4)]
+ERRORS = [
+    ("ConnectError", "[Errno -2] Name or service not known"),
+    ("ConnectError", "[Errno 111] Connection refused"),
+    ("ConnectTimeout", "timed out"),
+    ("ReadTimeout", "The read operation timed out"),
+    ("SSLError", "[SSL: CERTIFICATE_VERIFY_FAILED] certificate verify failed"),
+    ("TooManyRedirects", "Exceeded maximum allowed redirects."),
+    ("skipped", "robots.txt disallows this URL"),
+    ("skipped", "host marked dead"),
+]
+START = "2025-01-01"
+
+
+class _Hash:
+    """
+    SQL expressions for deterministic pseudo-random integers per row id: a Lehmer step
+    with a different multiplier per salt, so columns drawn with different salts are
+    independent of each other.
+    """
+
+    P = 2147483647
+
+    def __init__(self, seed: int):
+        self.seed = seed
+
+    def __call__(self, col: str, salt: int, mod: int) -> str:
+        m = pow(48271, salt + 1, self.P)
+        return f"(((({col}) + {self.seed}) * {m}) % {self.P} % {mod})"
+
+
+def _score_lookup(con: sqlite3.Connection) -> None:
+    """Every flag combination, keyed like the generator's `combo` column."""
+    rows = []
+    for combo in itertools.product((0, 1), (0, 1), (0, 1), (0, 1), (0, 1), (0, 1), range(len(STACKS))):
+        https, viewport, title, email, phone, address, stack = combo
+        score, reasons = score_site(
+            https=bool(https),
+            has_viewport=bool(viewport),
+            title="x" if title else None,
+            has_email=bool(email),
+            has_phone=bool(phone),
+            has_address=bool(address),
+            stack_hint=STACKS[stack][0],
+        )
+        key = https | viewport << 1 | title << 2 | email << 3 | phone << 4 | address << 5 | stack << 6
+        rows.append((key, STACKS[stack][0], score, json.dumps(reasons, ensure_ascii=False)))
+    con.execute("CREATE TEMP TABLE scores(combo INTEGER PRIMARY KEY, stack_hint TEXT, score INTEGER, reasons_json TEXT)")
+    con.executemany("INSERT INTO scores VALUES (?, ?, ?, ?)", rows)
+
+
+def _stack_case(h: str) -> str:
+    parts, upto = [], 0
+    for i, (_, share) in enumerate(STACKS[:-1]):
+        upto += share
+        parts.append(f"WHEN {h} < {upto} THEN {i}")
+    return f"CASE {' '.join(parts)} ELSE {len(STACKS) - 1} END"
+
+
+def generate(
+    out: Path,
+    leads: int,
+    analyzed: float = 0.8,
+    llm: float = 0.05,
+    fetches: float = 2.0,
+    runs: int = 30,
+    seed: int = 1,
+) -> dict[str, int]:
+    Store(str(out)).close()  # schema, indexes and migrations as the crawler creates them
+    con = sqlite3.connect(out)
+    con.execute("PRAGMA synchronous=OFF")
+    con.execute("PRAGMA cache_size=-200000")
+    h = _Hash(seed)
+    words = {"trades": json.dumps(TRADES), "cities": json.dumps(CITIES), "names": json.dumps(NAMES)}
+
+    def word(kind: str, lst: list[str], salt: int) -> str:
+        return f"json_extract(:{kind}, '$[' || {h('i', salt, len(lst))} || ']')"
+
+    days = 365
+    with con:
+        _score_lookup(con)
+
+        # Leads: https://[www.]<trade>-<name><i>.at/, found on herold.at category pages.
+        con.execute(
+            f"""
+            CREATE TEMP TABLE gen AS
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < :n)
+            SELECT i,
+                   {word('trades', TRADES, 1)} || '-' || {word('names', NAMES, 2)} || i || '.at' AS site,
+                   {word('cities', CITIES, 3)} AS city,
+                   {h('i', 4, 100)} < 60 AS www,
+                   {h('i', 5, 1000)} < :analyzed AS analyzed,
+                   {h('i', 6, 1000)} < :llm AS llm,
+                   {h('i', 0, days * 86400)} AS discovered_s
+            FROM seq
+            """,
+            {"n": leads, "analyzed": int(analyzed * 1000), "llm": int(llm * 1000), **words},
+        )
+        con.execute(
+            f"""
+            INSERT INTO discovered_urls(id, url, discovered_from, discovered_at, canonical_key, site_key, selected_at)
+            SELECT i,
+                   'https://' || CASE WHEN www THEN 'www.' ELSE '' END || site || '/',
+                   'https://www.herold.at/gelbe-seiten/' || city || '/'
+                     || substr(site, 1, instr(site, '-') - 1) || '/seite/' || (1 + {h('i', 7, 40)}) || '/',
+                   datetime(:start, '+' || discovered_s || ' seconds'),
+                   site || '/',
+                   site,
+                   CASE WHEN analyzed THEN datetime(:start, '+' || (discovered_s + 3600) || ' seconds') END
+            FROM gen
+            """,
+            {"start": START},
+        )
+
+        # Analyses: flag rates roughly as seen on real directory listings.
+        con.execute(
+            f"""
+            INSERT INTO site_analysis(
+              id, url, final_url, status_code, https, title, has_viewport_meta,
+              has_email, has_phone, has_address, stack_hint, score, reasons_json, analyzed_at)
+            SELECT f.i, d.url, d.url, 200, f.https,
+                   CASE WHEN f.title THEN
+                     upper(substr(d.site_key, 1, 1)) || substr(d.site_key, 2, instr(d.site_key, '-') - 2)
+                     || ' ' || f.city
+                   END,
+                   f.viewport, f.email, f.phone, f.address, s.stack_hint, s.score, s.reasons_json,
+                   datetime(d.selected_at, '+' || {h('f.i', 18, 7200)} || ' seconds')
+            FROM (
+              SELECT i, city,
+                     {h('i', 11, 100)} < 85 AS https,
+                     {h('i', 12, 100)} < 75 AS viewport,
+                     {h('i', 13, 100)} < 95 AS title,
+                     {h('i', 14, 100)} < 55 AS email,
+                     {h('i', 15, 100)} < 80 AS phone,
+                     {h('i', 16, 100)} < 60 AS address,
+                     {_stack_case(h('i', 17, 100))} AS stack
+              FROM gen WHERE analyzed
+            ) f
+            JOIN discovered_urls d ON d.id = f.i
+            JOIN scores s ON s.combo = f.https + (f.viewport << 1) + (f.title << 2) + (f.email << 3)
+                                       + (f.phone << 4) + (f.address << 5) + (f.stack << 6)
+            """
+        )
+        con.execute(
+            """
+            INSERT INTO url_fetch_state(url, failures, last_status_code, last_fetched_at)
+            SELECT url, 0, 200, analyzed_at FROM site_analysis
+            """
+        )
+
+        # Runs spread evenly over the year; fetches go to the run whose slot they fall in.
+        run_count = max(1, runs)
+        con.execute(
+            f"""
+            INSERT INTO runs(id, command, status, started_at, finished_at)
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < {run_count})
+            SELECT i, CASE WHEN i % 3 = 0 THEN 'discover' WHEN i % 3 = 1 THEN 'analyze' ELSE 'run' END,
+                   'done',
+                   datetime(:start, '+' || ((i - 1) * {days * 86400 // run_count}) || ' seconds'),
+                   datetime(:start, '+' || ((i - 1) * {days * 86400 // run_count} + 5400) || ' seconds')
+            FROM seq
+            """,
+            {"start": START},
+        )
+        con.executemany(
+            "INSERT OR IGNORE INTO error_messages(message) VALUES (?)", [(m,) for _, m in ERRORS]
+        )
+        con.execute("CREATE TEMP TABLE errors(n INTEGER PRIMARY KEY, class TEXT, message_id INTEGER)")
+        con.executemany(
+            "INSERT INTO errors SELECT ?, ?, id FROM error_messages WHERE message = ?",
+            [(n, c, m) for n, (c, m) in enumerate(ERRORS)],
+        )
+
+        # About `fetches` log rows per lead; one in eight fails.
+        con.execute(
+            f"""
+            INSERT INTO crawl_log(url, status_code, final_url, error, attempts, fetched_at, run_id, message_id)
+            WITH RECURSIVE seq(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM seq WHERE i < :rows)
+            SELECT d.url,
+                   CASE WHEN e.n IS NULL THEN 200 END,
+                   CASE WHEN e.n IS NULL THEN d.url END,
+                   e.class,
+                   1 + {h('seq.i', 3, 3)},
+                   datetime(r.started_at, '+' || {h('seq.i', 4, 5400)} || ' seconds'),
+                   r.id,
+                   e.message_id
+            FROM seq
+            JOIN discovered_urls d ON d.id = 1 + {h('seq.i', 1, leads)}
+            JOIN runs r ON r.id = 1 + (seq.i - 1) * {run_count} / :rows
+            LEFT JOIN errors e ON {h('seq.i', 2, 8)} = 0 AND e.n = {h('seq.i', 5, len(ERRORS))}
+            """,
+            {"rows": max(1, int(leads * fetches))},
+        )
+        con.execute(
+            """
+            UPDATE runs SET
+              fetches = (SELECT COUNT(*) FROM crawl_log c WHERE c.run_id = runs.id),
+              errors = (SELECT COUNT(*) FROM crawl_log c WHERE c.run_id = runs.id AND c.error IS NOT NULL)
+            """
+        )
+
+        con.execute(
+            """
+            INSERT INTO llm_insights(url, bullets_json, email_opener, model, generated_at)
+            SELECT a.url,
+                   json_array('Mobile visitors see a desktop layout.', 'Phone number is hard to find.'),
+                   'Servus! Wir haben uns die Website von ' || coalesce(a.title, a.url)
+                     || ' angesehen und ein paar schnelle Verbesserungen gefunden.',
+                   'synthetic',
+                   datetime(a.analyzed_at, '+1 day')
+            FROM gen g JOIN site_analysis a ON a.id = g.i
+            WHERE g.llm
+            """
+        )
+
+    counts = {
+        t: con.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0]
+        for t in ("discovered_urls", "site_analysis", "crawl_log", "llm_insights", "runs")
+    }
+    con.execute("ANALYZE")
+    con.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    con.close()
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--leads", type=int, default=100_000, help="discovered URLs to generate")
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--analyzed", type=float, default=0.8, help="share of leads with an analysis")
+    parser.add_argument("--llm", type=float, default=0.05, help="share of leads with LLM insights")
+    parser.add_argument("--fetches", type=float, default=2.0, help="crawl_log rows per lead")
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--force", action="store_true", help="replace --out if it exists")
+    args = parser.parse_args()
+
+    if args.out.exists():
+        if not args.force:
+            parser.error(f"{args.out} exists (use --force to replace it)")
+        for suffix in ("", "-wal", "-shm"):
+            Path(str(args.out) + suffix).unlink(missing_ok=True)
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    counts = generate(args.out, args.leads, args.analyzed, args.llm, args.fetches, args.runs, args.seed)
+    elapsed = time.perf_counter() - t0
+    for table, n in counts.items():
+        print(f"{table:<16} {n:>12,d}")
+    print(f"{args.out}: {args.out.stat().st_size / 1e6:.1f} MB in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,17 @@
 import json
-import sqlite3
+import sys
 from pathlib import Path
+from typing import Optional
 
 import pandas as pd
 import streamlit as st
 
+SRC = Path(__file__).resolve().parents[2]
+if str(SRC) not in sys.path:
+    sys.path.insert(0, str(SRC))
 
-def pick_db(root: Path) -> Path:
-    candidates = [root / "src" / "data" / "leads.sqlite", root / "data" / "leads.sqlite"]
-    existing = [p for p in candidates if p.exists()]
-    if not existing:
-        raise FileNotFoundError("No leads.sqlite found")
-    return sorted(existing, key=lambda p: p.stat().st_size, reverse=True)[0]
+from ui.queries import lead_details  # noqa: E402
+from ui.resources import database, reader, require_leads  # noqa: E402
 
 
 def json_list(x):
@@ -24,100 +24,44 @@ def json_list(x):
         return []
 
 
+@st.cache_data(max_entries=2048)
+def load_lead(db_path: str, url: str, change_token: int) -> Optional[dict]:
+    # change_token is only part of the cache key: any commit to the database starts a new entry.
+    return reader(db_path).call(lead_details, url)
+
+
 st.set_page_config(page_title="Lead Details", layout="wide")
 
-root = Path(__file__).resolve().parents[3]  # pages/Details.py → ui → src → repo
-db = pick_db(root)
+db = database()
 
 params = st.query_params
 url = params.get("url")
 
 st.title("Lead details")
+require_leads(db)
 
 if not url:
     st.warning("No url provided. Go back to Home and click 'View'.")
     st.stop()
 
-con = sqlite3.connect(db)
-
-tables = {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
-has_llm = "llm_insights" in tables
-
-if has_llm:
-    row = con.execute(
-        """
-        SELECT
-          d.url, d.discovered_from, d.discovered_at,
-          a.final_url, a.status_code, a.https, a.title, a.has_viewport_meta,
-          a.has_email, a.has_phone, a.has_address, a.stack_hint, a.score, a.reasons_json,
-          l.bullets_json, l.email_opener, l.generated_at
-        FROM discovered_urls d
-        LEFT JOIN site_analysis a ON a.url = d.url
-        LEFT JOIN llm_insights l ON l.url = d.url
-        WHERE d.url = ?
-        """,
-        (url,),
-    ).fetchone()
-else:
-    row = con.execute(
-        """
-        SELECT
-          d.url, d.discovered_from, d.discovered_at,
-          a.final_url, a.status_code, a.https, a.title, a.has_viewport_meta,
-          a.has_email, a.has_phone, a.has_address, a.stack_hint, a.score, a.reasons_json
-        FROM discovered_urls d
-        LEFT JOIN site_analysis a ON a.url = d.url
-        WHERE d.url = ?
-        """,
-        (url,),
-    ).fetchone()
-
-con.close()
-
-if not row:
+lead = load_lead(db, url, reader(db).change_token())
+
+if lead is None:
     st.error("URL not found in database.")
     st.stop()
 
-if has_llm:
-    (
-        url,
-        discovered_from,
-        discovered_at,
-        final_url,
-        status_code,
-        https,
-        title,
-        has_viewport,
-        has_email,
-        has_phone,
-        has_address,
-        stack_hint,
-        score,
-        reasons_json,
-        bullets_json,
-        email_opener,
-        llm_generated_at,
-    ) = row
-else:
-    (
-        url,
-        discovered_from,
-        discovered_at,
-        final_url,
-        status_code,
-        https,
-        title,
-        has_viewport,
-        has_email,
-        has_phone,
-        has_address,
-        stack_hint,
-        score,
-        reasons_json,
-    ) = row
-    bullets_json = None
-    email_opener = None
-    llm_generated_at = None
+url = lead["url"]
+discovered_from = lead["discovered_from"]
+final_url = lead["final_url"]
+status_code = lead["status_code"]
+https = lead["https"]
+title = lead["title"]
+stack_hint = lead["stack_hint"]
+score = lead["score"]
+reasons_json = lead["reasons_json"]
+bullets_json = lead["bullets_json"]
+email_opener = lead["email_opener"]
+llm_generated_at = lead["llm_generated_at"]
 
 st.subheader(f"{score if score is not None else '-'} | {'HTTPS' if https else 'HTTP'} | {url}")
 
@@ -0,0 +1,198 @@
+"""
+Lead queries shared by the Streamlit pages and `src/scripts/bench_ui.py`.
+
+Everything reads the `leads` table (see crawler.store): filters, sorting, counts and
+paging run in SQLite on its covering indexes, and only the rows of the page on screen
+are joined to discovered_urls / site_analysis, by integer id. sqlite3 and pandas only
+(no streamlit), so the same code paths the UI runs can be timed against large databases
+outside the app.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, TypeVar
+
+import pandas as pd
+
+SORT_OPTIONS = ["score (worst first)", "score (best first)", "discovered_at"]
+HTTPS_OPTIONS = ["Any", "HTTPS only", "HTTP only"]
+
+_ORDER_BY = {
+    "score (worst first)": "l.score",
+    "score (best first)": "l.score DESC",
+    "discovered_at": "l.discovered_at DESC",
+}
+
+T = TypeVar("T")
+
+
+def table_names(con: sqlite3.Connection) -> set[str]:
+    return {r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()}
+
+
+def leads_ready(con: sqlite3.Connection) -> bool:
+    """
+    Databases last opened by an older crawler lack the leads table. The UI never
+    migrates (it only reads, also while a crawl is writing): the crawler's Store adds
+    and fills it on open.
+    """
+    return "leads" in table_names(con)
+
+
+class ReadConnection:
+    """
+    One query-only connection, shared by every session (thread) of the Streamlit
+    process; `call` serializes access. It stays in autocommit mode, so no read snapshot
+    is held between queries and, under WAL, reads never wait for a crawl that is writing.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self.con = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False, isolation_level=None)
+        self.con.execute("PRAGMA query_only=ON")
+        self._lock = threading.Lock()
+
+    def call(self, fn: Callable[..., T], *args: Any) -> T:
+        """`fn(con, *args)` under the connection's lock."""
+        with self._lock:
+            return fn(self.con, *args)
+
+    def change_token(self) -> int:
+        """Changes whenever another connection commits (PRAGMA data_version); a cache key."""
+        with self._lock:
+            return self.con.execute("PRAGMA data_version").fetchone()[0]
+
+
+# ----------------------------
+# Home page (sidebar filters, paging)
+# ----------------------------
+@dataclass(frozen=True)
+class LeadFilters:
+    analyzed_only: bool = True
+    score_range: Optional[tuple[int, int]] = None
+    stacks: tuple[str, ...] = ()
+    https: str = "Any"
+    search: str = ""
+    sort_by: str = SORT_OPTIONS[0]
+
+
+def _where(f: LeadFilters) -> tuple[str, str, list]:
+    """(joins, WHERE clause, params) for the filters; joins only when searching."""
+    clauses: list[str] = []
+    params: list = []
+    joins = ""
+    # Sorted by date, the score conditions are checked while walking idx_leads_discovered;
+    # unary + keeps SQLite from picking idx_leads_score and sorting every match instead.
+    score = "+l.score" if _ORDER_BY.get(f.sort_by) == _ORDER_BY["discovered_at"] else "l.score"
+    if f.analyzed_only:
+        clauses.append(f"{score} IS NOT NULL")
+    if f.score_range is not None:
+        clauses.append(f"{score} BETWEEN ? AND ?")
+        params += list(f.score_range)
+    if f.stacks:
+        clauses.append(f"l.stack_hint IN ({', '.join('?' * len(f.stacks))})")
+        params += list(f.stacks)
+    if f.https == "HTTPS only":
+        clauses.append("l.https = 1")
+    elif f.https == "HTTP only":
+        clauses.append("l.https = 0")
+    text = f.search.strip().lower()
+    if text:
+        joins = """
+            JOIN discovered_urls d ON d.id = l.id
+            LEFT JOIN site_analysis a ON a.id = l.analysis_id
+        """
+        clauses.append("(instr(lower(d.url), ?) > 0 OR instr(lower(coalesce(a.title, '')), ?) > 0)")
+        params += [text, text]
+    return joins, (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def count_leads(con: sqlite3.Connection, f: LeadFilters) -> int:
+    joins, where, params = _where(f)
+    return con.execute(f"SELECT COUNT(*) FROM leads l {joins}{where}", params).fetchone()[0]
+
+
+def lead_page(con: sqlite3.Connection, f: LeadFilters, limit: int, offset: int = 0) -> pd.DataFrame:
+    """One page of leads, sorted as `f.sort_by` says."""
+    joins, where, params = _where(f)
+    order = _ORDER_BY.get(f.sort_by, _ORDER_BY["discovered_at"])
+    # Page through leads' indexes alone; only the rows on the page are joined.
+    return pd.read_sql_query(
+        f"""
+        SELECT l.id, l.score, d.url, a.title, l.https, l.has_viewport_meta, l.stack_hint, l.discovered_at
+        FROM (SELECT l.id FROM leads l {joins}{where} ORDER BY {order} LIMIT ? OFFSET ?) p
+        JOIN leads l ON l.id = p.id
+        JOIN discovered_urls d ON d.id = l.id
+        LEFT JOIN site_analysis a ON a.id = l.analysis_id
+        ORDER BY {order}
+        """,
+        con,
+        params=[*params, limit, offset],
+    )
+
+
+@dataclass(frozen=True)
+class ScoreStats:
+    lo: int
+    hi: int
+    median: int
+
+
+def score_stats(con: sqlite3.Connection) -> Optional[ScoreStats]:
+    """Min, max and median score of analyzed leads (the score slider), or None."""
+    lo, hi, n = con.execute("SELECT MIN(score), MAX(score), COUNT(score) FROM leads").fetchone()
+    if not n:
+        return None
+    middle = [
+        r[0]
+        for r in con.execute(
+            "SELECT score FROM leads WHERE score IS NOT NULL ORDER BY score LIMIT ? OFFSET ?",
+            (2 - n % 2, (n - 1) // 2),
+        )
+    ]
+    return ScoreStats(lo, hi, int(sum(middle) / len(middle)))
+
+
+def stack_options(con: sqlite3.Connection, score_range: tuple[int, int]) -> list[str]:
+    rows = con.execute(
+        """
+        SELECT DISTINCT stack_hint FROM leads
+        WHERE score BETWEEN ? AND ? AND stack_hint IS NOT NULL AND stack_hint != ''
+        ORDER BY stack_hint
+        """,
+        score_range,
+    ).fetchall()
+    return [r[0] for r in rows]
+
+
+def has_leads(con: sqlite3.Connection) -> bool:
+    return con.execute("SELECT 1 FROM leads LIMIT 1").fetchone() is not None
+
+
+# ----------------------------
+# Details page
+# ----------------------------
+def lead_details(con: sqlite3.Connection, url: str) -> Optional[dict]:
+    """One lead as a dict (LLM fields are None until generated), or None if unknown."""
+    cur = con.execute(
+        """
+        SELECT d.url, d.discovered_from, d.discovered_at,
+               a.final_url, a.status_code, a.https, a.title,
+               a.has_viewport_meta, a.has_email, a.has_phone, a.has_address,
+               a.stack_hint, a.score, a.reasons_json,
+               i.bullets_json, i.email_opener, i.generated_at AS llm_generated_at
+        FROM discovered_urls d
+        JOIN leads l ON l.id = d.id
+        LEFT JOIN site_analysis a ON a.id = l.analysis_id
+        LEFT JOIN llm_insights i ON i.rowid = l.llm_id
+        WHERE d.url = ?
+        """,
+        (url,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip([c[0] for c in cur.description], row))
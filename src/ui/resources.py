@@ -0,0 +1,36 @@
+"""
+Per-process Streamlit resources shared by the pages: the database and one query-only
+connection to it (see ui.queries.ReadConnection). The UI never writes to the database.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+
+import streamlit as st
+
+from crawler.report import pick_db
+from ui.queries import ReadConnection, leads_ready
+
+
+@st.cache_resource
+def database() -> str:
+    """The leads database, picked once per process."""
+    root = Path(__file__).resolve().parents[2]  # ui → src → repo
+    return str(pick_db(root))
+
+
+@st.cache_resource
+def reader(db_path: str) -> ReadConnection:
+    return ReadConnection(db_path)
+
+
+def require_leads(db_path: str) -> None:
+    """Stop the page with a hint if the database predates the leads table."""
+    if not reader(db_path).call(leads_ready):
+        st.error(
+            f"{db_path} was written by an older crawler and has no leads table yet. "
+            "Run the crawler against it once (e.g. `crawler analyze`) to upgrade it, "
+            "then reload this page."
+        )
+        st.stop()